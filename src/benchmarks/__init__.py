@@ -0,0 +1,88 @@
+'''
+Бенчмарки запросов к базе данных.
+
+Запускаются из папки src как модули, например:
+    python -m benchmarks.history_success_rate
+
+Каждый бенчмарк создает отдельную тестовую базу (test_<POSTGRES_NAME>),
+наполняет ее данными и удаляет после замеров, рабочая база не трогается.
+'''
+import os
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+import django
+
+
+def setup_django() -> None:
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    django.setup()
+
+
+@contextmanager
+def benchmark_database() -> Iterator[None]:
+    from django.db import connection
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def measure(
+        call: Callable,
+        repeat: int = 20,
+        warmup: int = 3,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> dict[str, float]:
+    '''
+    Возвращает медиану и 95-й перцентиль времени вызова в миллисекундах.
+    С clock=time.process_time меряется процессорное время этого процесса
+    без ожидания ответа базы.
+    '''
+    for _ in range(warmup):
+        call()
+    timings = []
+    for _ in range(repeat):
+        started_at = clock()
+        call()
+        timings.append((clock() - started_at) * 1000)
+    timings.sort()
+    return {
+        'median_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+    }
+
+
+def measure_allocations(call: Callable) -> dict[str, float]:
+    '''
+    Возвращает пиковый объем памяти, выделенной за вызов, в КиБ
+    и количество блоков, оставшихся выделенными к концу вызова
+    (вместе с результатом вызова)
+    '''
+    tracemalloc.start()
+    try:
+        result = call()
+        current_snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    blocks = sum(stat.count for stat in current_snapshot.statistics('filename'))
+    return {'peak_kib': round(peak / 1024, 1), 'blocks': blocks}
+
+
+def print_comparison(title: str, results: dict[str, dict[str, dict[str, float]]]) -> None:
+    print(title)
+    for name, variants in results.items():
+        old, new = variants['old'], variants['new']
+        speedup = old['median_ms'] / new['median_ms'] if new['median_ms'] else float('inf')
+        print(
+            f'  {name:<40} old {old["median_ms"]:>9} ms (p95 {old["p95_ms"]:>9})'
+            f'  new {new["median_ms"]:>9} ms (p95 {new["p95_ms"]:>9})  x{speedup:.1f}'
+        )
@@ -0,0 +1,181 @@
+'''
+Нагрузочный тест асинхронного чтения главной страницы задач и статистики
+истории при одинаковом числе воркеров.
+
+old - синхронные репозитории: каждый воркер (поток, как sync-воркер
+gunicorn) обрабатывает запросы по одному и ждет базу.
+new - асинхронные репозитории: каждый воркер (поток со своим циклом
+событий, как воркер uvicorn) держит --concurrency запросов одновременно.
+
+Соединение идет через TCP-прокси с задержкой --latency-ms в каждую
+сторону (см. benchmarks.query_pipeline), поэтому время запроса в основном
+уходит на ожидание базы. Соединения открываются заранее и переиспользуются,
+время подключения в замеры не входит (его сравнивает benchmarks.connection_pool).
+
+    python -m benchmarks.async_read_path [--workers 4] [--concurrency 16] [--requests 800]
+'''
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+from datetime import date, timedelta
+
+from benchmarks import setup_django, benchmark_database
+from benchmarks.query_pipeline import LatencyProxy, seed
+
+
+def summarize(timings: list[float], elapsed: float) -> dict[str, float]:
+    timings.sort()
+    return {
+        'median_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+        'rps': round(len(timings) / elapsed, 1),
+    }
+
+
+def run_sync(handle, workers: int, requests: int) -> dict[str, float]:
+    from django.db import connections
+
+    timings = []
+    timings_lock = threading.Lock()
+    barrier = threading.Barrier(workers + 1)
+
+    def worker():
+        handle()  # открывает соединение потока
+        barrier.wait()
+        local_timings = []
+        for _ in range(requests // workers):
+            started_at = time.perf_counter()
+            handle()
+            local_timings.append((time.perf_counter() - started_at) * 1000)
+        with timings_lock:
+            timings.extend(local_timings)
+        connections.close_all()
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started_at = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return summarize(timings, time.perf_counter() - started_at)
+
+
+def run_async(handle, workers: int, concurrency: int, requests: int) -> dict[str, float]:
+    from core.container import AsyncScopedConnection
+
+    timings = []
+    timings_lock = threading.Lock()
+    barrier = threading.Barrier(workers + 1)
+
+    async def client(connection, count: int, local_timings: list[float]):
+        for _ in range(count):
+            started_at = time.perf_counter()
+            await handle(connection)
+            local_timings.append((time.perf_counter() - started_at) * 1000)
+
+    async def worker_loop():
+        connections = [AsyncScopedConnection('default') for _ in range(concurrency)]
+        for connection in connections:
+            await connection.get()
+            await connection.uses_django_connection()
+        await asyncio.get_running_loop().run_in_executor(None, barrier.wait)
+        local_timings = []
+        count = requests // workers // concurrency
+        await asyncio.gather(*(client(connection, count, local_timings) for connection in connections))
+        for connection in connections:
+            await connection.close()
+        with timings_lock:
+            timings.extend(local_timings)
+
+    threads = [threading.Thread(target=asyncio.run, args=(worker_loop(),)) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started_at = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return summarize(timings, time.perf_counter() - started_at)
+
+
+def run(latency_ms: float, workers: int, concurrency: int, requests: int) -> None:
+    from django.db import connection
+    from django.contrib.auth import get_user_model
+    from task.models import Task
+    from task.infrastructure import TaskRepository, AsyncTaskRepository
+    from history.models import History
+    from history.infrastructure import HistoryRepository, AsyncHistoryRepository
+
+    with benchmark_database():
+        user = get_user_model().objects.create_user(
+            username='benchmark', email='benchmark@example.com', password='benchmark'
+        )
+        seed(user)
+
+        settings_dict = connection.settings_dict
+        old_host, old_port = settings_dict['HOST'], settings_dict['PORT']
+        # соединения держатся воркерами все время замера, пул не нужен
+        old_pool, settings_dict['OPTIONS']['pool'] = settings_dict['OPTIONS'].get('pool'), False
+        proxy = LatencyProxy(old_host or 'localhost', int(old_port or 5432), latency_ms / 1000)
+        proxy.start()
+        connection.close()
+        settings_dict['HOST'], settings_dict['PORT'] = '127.0.0.1', proxy.port
+        from_date, to_date = str(date.today() - timedelta(days=30)), str(date.today())
+        try:
+            def dashboard_sync():
+                repository = TaskRepository(Task, connection, json_passthrough=True)
+                with repository.batch():
+                    repository.get_count_user_tasks_in_categories(user.id)
+                    repository.get_ordered_user_tasks_json(user.id)
+
+            async def dashboard_async(async_connection):
+                repository = AsyncTaskRepository(Task, async_connection, json_passthrough=True)
+                async with repository.abatch():
+                    await repository.aget_count_user_tasks_in_categories(user.id)
+                    await repository.aget_ordered_user_tasks_json(user.id)
+
+            def history_sync():
+                HistoryRepository(History, connection).get_history_statistics(user.id, from_date, to_date)
+
+            async def history_async(async_connection):
+                await AsyncHistoryRepository(History, async_connection).aget_history_statistics(user.id, from_date, to_date)
+
+            results = {
+                '/api/tasks/': {
+                    'old': run_sync(dashboard_sync, workers, requests),
+                    'new': run_async(dashboard_async, workers, concurrency, requests),
+                },
+                '/api/history/ (без кеша)': {
+                    'old': run_sync(history_sync, workers, requests),
+                    'new': run_async(history_async, workers, concurrency, requests),
+                },
+            }
+        finally:
+            connection.close()
+            settings_dict['OPTIONS']['pool'] = old_pool
+            settings_dict['HOST'], settings_dict['PORT'] = old_host, old_port
+
+        print(
+            f'{workers} воркеров, {concurrency} одновременных запросов на асинхронный воркер, '
+            f'задержка сети {latency_ms} мс'
+        )
+        for name, variants in results.items():
+            old, new = variants['old'], variants['new']
+            print(
+                f'  {name:<28} old {old["rps"]:>8} req/s (median {old["median_ms"]:>7} ms, p95 {old["p95_ms"]:>7})'
+                f'  new {new["rps"]:>8} req/s (median {new["median_ms"]:>7} ms, p95 {new["p95_ms"]:>7})'
+                f'  x{new["rps"] / old["rps"]:.1f}'
+            )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--latency-ms', type=float, default=2.0)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=800)
+    arguments = parser.parse_args()
+    setup_django()
+    run(arguments.latency_ms, arguments.workers, arguments.concurrency, arguments.requests)
@@ -0,0 +1,87 @@
+'''
+Время запроса главной страницы задач с новым соединением с базой на
+каждый запрос и с соединением из пула (core.pool), для соединений Django
+(WSGI) и асинхронных соединений (ASGI).
+
+Соединение идет через TCP-прокси с задержкой --latency-ms в каждую
+сторону (см. benchmarks.query_pipeline), поэтому подключение, которому
+нужно несколько обменов с базой, стоит заметно дороже самих запросов.
+
+    python -m benchmarks.connection_pool [--latency-ms 2] [--repeat 50]
+'''
+import argparse
+import asyncio
+
+from benchmarks import setup_django, benchmark_database, measure, print_comparison
+from benchmarks.query_pipeline import LatencyProxy, seed
+
+
+def run(latency_ms: float, repeat: int) -> None:
+    from django.db import connection
+    from django.contrib.auth import get_user_model
+    from core.container import RequestContainer
+    from core.pool import enable_async_pools, close_async_pools, close_pool
+    from task.models import Task
+    from task.infrastructure import TaskRepository, AsyncTaskRepository
+
+    with benchmark_database():
+        user = get_user_model().objects.create_user(
+            username='benchmark', email='benchmark@example.com', password='benchmark'
+        )
+        seed(user)
+
+        settings_dict = connection.settings_dict
+        old_host, old_port = settings_dict['HOST'], settings_dict['PORT']
+        old_pool = settings_dict['OPTIONS'].get('pool')
+        proxy = LatencyProxy(old_host or 'localhost', int(old_port or 5432), latency_ms / 1000)
+        proxy.start()
+        connection.close()
+        close_pool(connection.alias)
+        settings_dict['HOST'], settings_dict['PORT'] = '127.0.0.1', proxy.port
+        loop = asyncio.new_event_loop()
+        try:
+            def request_sync():
+                # как запрос WSGI: соединение закрывается (возвращается в пул) в конце
+                repository = TaskRepository(Task, connection, json_passthrough=True)
+                with repository.batch():
+                    repository.get_count_user_tasks_in_categories(user.id)
+                    repository.get_ordered_user_tasks_json(user.id)
+                connection.close()
+
+            async def handle_async():
+                async with RequestContainer() as container:
+                    repository = AsyncTaskRepository(Task, container.async_connection, json_passthrough=True)
+                    async with repository.abatch():
+                        await repository.aget_count_user_tasks_in_categories(user.id)
+                        await repository.aget_ordered_user_tasks_json(user.id)
+
+            def request_async():
+                loop.run_until_complete(handle_async())
+
+            results = {}
+            settings_dict['OPTIONS']['pool'] = False
+            results['WSGI /api/tasks/'] = {'old': measure(request_sync, repeat)}
+            results['ASGI /api/tasks/'] = {'old': measure(request_async, repeat)}
+
+            settings_dict['OPTIONS']['pool'] = old_pool or True
+            enable_async_pools()
+            results['WSGI /api/tasks/']['new'] = measure(request_sync, repeat)
+            results['ASGI /api/tasks/']['new'] = measure(request_async, repeat)
+            print_comparison(f'Задержка сети {latency_ms} мс в каждую сторону', results)
+        finally:
+            enable_async_pools(False)
+            loop.run_until_complete(close_async_pools())
+            loop.close()
+            connection.close()
+            close_pool(connection.alias)
+            settings_dict['OPTIONS']['pool'] = old_pool
+            settings_dict['HOST'], settings_dict['PORT'] = old_host, old_port
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--latency-ms', type=float, default=2.0)
+    parser.add_argument('--repeat', type=int, default=50)
+    arguments = parser.parse_args()
+    setup_django()
+    run(arguments.latency_ms, arguments.repeat)
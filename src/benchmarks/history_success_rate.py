@@ -0,0 +1,175 @@
+'''
+Сравнение старых запросов процента успешных задач и успешного планирования
+(с коррелированными подзапросами) с однопроходными count(*) FILTER.
+
+    python -m benchmarks.history_success_rate [--rows 100000]
+'''
+import argparse
+from datetime import date, timedelta
+
+from benchmarks import setup_django, benchmark_database, measure, print_comparison
+
+
+OLD_COMMON_SUCCESS_RATE = '''
+    SELECT count(*)-(
+            SELECT count(*) FROM history_history hh2
+            WHERE hh2.status=%s
+            AND hh2.user_id = %s
+            AND execution_date BETWEEN %s AND %s
+        ) AS successful_tasks,
+        count(*) AS total_tasks
+    FROM history_history hh
+    WHERE hh.user_id = %s AND execution_date BETWEEN %s AND %s;
+'''
+
+OLD_SUCCESS_RATE_BY_CATEGORIES = '''
+    SELECT json_build_object(
+        'labels', array_agg(subquery.name),
+        'colors', array_agg(subquery.color),
+        'data', array_agg(subquery.successful_tasks)
+    )
+    FROM (
+        SELECT
+        tc."name", tc.color,
+        count(*)-(
+            SELECT
+                count(*)
+            FROM
+                history_history hh2
+            WHERE
+                hh2.status= %s
+                AND hh2.category_id=hh.category_id
+                AND hh2.user_id = %s AND execution_date BETWEEN %s AND %s
+            ) AS successful_tasks
+        FROM history_history hh
+        join task_category tc
+        ON hh.category_id = tc.id
+        WHERE hh.user_id = %s AND
+        execution_date BETWEEN %s AND %s
+        GROUP BY category_id, tc."name", tc.color
+    ) AS subquery;
+'''
+
+OLD_COMMON_SUCCESSFUL_PLANNING_RATE = '''
+    SELECT (
+        SELECT count(hh2.id)
+        FROM history_history hh2
+        WHERE hh2.user_id = %s AND hh2.planned_time = hh2.execution_time
+        AND execution_date BETWEEN %s AND %s
+    ) AS successfully_planned,
+    count(hh.id) AS total_planned
+    FROM history_history hh
+    WHERE hh.user_id = %s AND execution_date BETWEEN %s AND %s;
+'''
+
+OLD_COUNT_TASKS_BY_WEEKDAYS = '''
+    SELECT json_build_object(
+        'labels', array_agg(day_name),
+        'data', array_agg(task_count)
+    )
+    FROM (
+        SELECT day_name, count(hh.id) AS task_count FROM (VALUES
+            (1, 'Понедельник'),
+            (2, 'Вторник'),
+            (3, 'Среда'),
+            (4, 'Четверг'),
+            (5, 'Пятница'),
+            (6, 'Суббота'),
+            (7, 'Воскресенье')
+        ) weekdays(day_index, day_name)
+        LEFT join
+            history_history hh
+        ON
+            day_index=extract(isodow FROM hh.execution_date)
+        WHERE hh.user_id = %s AND
+        execution_date BETWEEN %s AND %s
+        GROUP BY day_index, day_name
+        ORDER BY day_index) AS subquery;
+'''
+
+
+def seed_history(rows: int):
+    from django.db import connection
+    from django.contrib.auth import get_user_model
+    from task.models import Category
+
+    user = get_user_model().objects.create_user(
+        username='benchmark', email='benchmark@example.com', password='benchmark'
+    )
+    Category.objects.bulk_create([
+        Category(name=f'Benchmark {index}', color='rgba(0, 0, 0, 0.4)', user=user, is_custom=True)
+        for index in range(12)
+    ])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            '''
+            INSERT INTO history_history (
+                name, category_id, user_id, planned_time, execution_time,
+                execution_date, status
+            )
+            SELECT
+                'Benchmark task ' || series.index,
+                (SELECT id FROM task_category WHERE user_id = %s ORDER BY id
+                 OFFSET series.index %% 12 LIMIT 1),
+                %s,
+                make_interval(mins => 30 + series.index %% 5 * 30),
+                make_interval(mins => 30 + series.index %% 7 * 30),
+                CURRENT_DATE - (series.index %% 1500),
+                (ARRAY['SUCCESSFUL', 'OUT_OF_DEADLINE', 'FAILED'])[series.index %% 3 + 1]
+            FROM generate_series(1, %s) AS series(index);
+            ''',
+            [user.id, user.id, rows]
+        )
+        cursor.execute('VACUUM ANALYZE history_history')
+    return user
+
+
+def run(rows: int, repeat: int) -> None:
+    from django.db import connection
+    from history.models import History
+    from history.infrastructure import HistoryRepository
+    from history.constants.choices import HistoryTaskStatusChoices
+
+    with benchmark_database():
+        user = seed_history(rows)
+        repository = HistoryRepository(History, connection)
+        failed = HistoryTaskStatusChoices.FAILED
+        from_date = str(date.today() - timedelta(days=1500))
+        to_date = str(date.today())
+        period = [user.id, from_date, to_date]
+
+        def run_old(sql, params):
+            def call():
+                with connection.cursor() as cursor:
+                    cursor.execute(sql, params)
+                    cursor.fetchall()
+            return call
+
+        results = {
+            'get_common_success_rate': {
+                'old': measure(run_old(OLD_COMMON_SUCCESS_RATE, [failed, *period, *period]), repeat),
+                'new': measure(lambda: repository.get_common_success_rate(*period), repeat),
+            },
+            'get_success_rate_by_categories': {
+                'old': measure(run_old(OLD_SUCCESS_RATE_BY_CATEGORIES, [failed, *period, *period]), repeat),
+                'new': measure(lambda: repository.get_success_rate_by_categories(*period), repeat),
+            },
+            'get_common_successful_planning_rate': {
+                'old': measure(run_old(OLD_COMMON_SUCCESSFUL_PLANNING_RATE, [*period, *period]), repeat),
+                'new': measure(lambda: repository.get_common_successful_planning_rate(*period), repeat),
+            },
+            'get_count_tasks_by_weekdays': {
+                'old': measure(run_old(OLD_COUNT_TASKS_BY_WEEKDAYS, period), repeat),
+                'new': measure(lambda: repository.get_count_tasks_by_weekdays(*period), repeat),
+            },
+        }
+        print_comparison(f'История из {rows} строк, период 1500 дней', results)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    arguments = parser.parse_args()
+    setup_django()
+    run(arguments.rows, arguments.repeat)
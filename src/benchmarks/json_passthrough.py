@@ -0,0 +1,115 @@
+'''
+Сравнение ответов со списком задач и календарем, собранных через разбор
+JSON из Postgres в объекты Python и JsonResponse, с передачей текста JSON
+в тело ответа как есть (json_passthrough и RawJsonResponse).
+
+Время меряется как процессорное время процесса (time.process_time),
+поэтому ожидание базы в него не входит.
+
+    python -m benchmarks.json_passthrough [--tasks 20000]
+'''
+import argparse
+import time
+
+from benchmarks import setup_django, benchmark_database, measure, measure_allocations, print_comparison
+
+
+def seed_tasks(tasks: int):
+    from django.db import connection
+    from django.contrib.auth import get_user_model
+    from task.models import Category
+
+    user = get_user_model().objects.create_user(
+        username='benchmark', email='benchmark@example.com', password='benchmark'
+    )
+    Category.objects.bulk_create([
+        Category(name=f'Benchmark {index}', color='rgba(0, 0, 0, 0.4)', user=user, is_custom=True)
+        for index in range(12)
+    ])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            '''
+            INSERT INTO task_task (
+                name, description, category_id, user_id, planned_time,
+                deadline, "order"
+            )
+            SELECT
+                'Benchmark task "' || series.index || '"',
+                '',
+                (SELECT id FROM task_category WHERE user_id = %s ORDER BY id
+                 OFFSET series.index %% 12 LIMIT 1),
+                %s,
+                make_interval(mins => 30 + series.index %% 5 * 30),
+                CURRENT_DATE + (series.index %% 365),
+                series.index
+            FROM generate_series(1, %s) AS series(index);
+            ''',
+            [user.id, user.id, tasks]
+        )
+        cursor.execute('VACUUM ANALYZE task_task')
+    return user
+
+
+def run(tasks: int, repeat: int) -> None:
+    from django.db import connection
+    from django.http import JsonResponse
+    from core.http import RawJsonResponse
+    from task.models import Task
+    from task.infrastructure import TaskRepository
+
+    with benchmark_database():
+        user = seed_tasks(tasks)
+        parsed_repository = TaskRepository(Task, connection)
+        raw_repository = TaskRepository(Task, connection, json_passthrough=True)
+
+        def tasks_response(repository, response_class):
+            def call():
+                return response_class({
+                    'chart_data': repository.get_count_user_tasks_in_categories(user.id),
+                    'tasks': repository.get_ordered_user_tasks_json(user.id),
+                })
+            return call
+
+        def calendar_response(repository, response_class):
+            def call():
+                return response_class({
+                    'calendar_data': repository.get_user_tasks_by_deadlines(user.id),
+                })
+            return call
+
+        calls = {
+            '/api/tasks/': {
+                'old': tasks_response(parsed_repository, JsonResponse),
+                'new': tasks_response(raw_repository, RawJsonResponse),
+            },
+            '/api/deadlines/': {
+                'old': calendar_response(parsed_repository, JsonResponse),
+                'new': calendar_response(raw_repository, RawJsonResponse),
+            },
+        }
+        results = {
+            name: {
+                variant: measure(call, repeat, clock=time.process_time)
+                for variant, call in variants.items()
+            }
+            for name, variants in calls.items()
+        }
+        print_comparison(f'{tasks} задач, процессорное время', results)
+
+        print('Память за один ответ')
+        for name, variants in calls.items():
+            old = measure_allocations(variants['old'])
+            new = measure_allocations(variants['new'])
+            print(
+                f'  {name:<40} old {old["peak_kib"]:>9} KiB ({old["blocks"]:>7} blocks)'
+                f'  new {new["peak_kib"]:>9} KiB ({new["blocks"]:>7} blocks)'
+            )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=20_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    arguments = parser.parse_args()
+    setup_django()
+    run(arguments.tasks, arguments.repeat)
@@ -0,0 +1,69 @@
+'''
+Накладные расходы замеров SQL (core.instrumentation) на запросы
+главной страницы задач и истории: без обертки выполнения запросов
+и с оберткой, которая пишет замеры активного RequestQueries.
+
+Меряется процессорное время этого процесса (time.process_time),
+ожидание ответа базы в замеры не входит.
+
+    python -m benchmarks.query_instrumentation [--repeat 200]
+'''
+import argparse
+import time
+from datetime import date, timedelta
+
+from benchmarks import setup_django, benchmark_database, measure, print_comparison
+from benchmarks.query_pipeline import seed
+
+
+def run(repeat: int) -> None:
+    from django.db import connection
+    from django.contrib.auth import get_user_model
+    from core.instrumentation import RequestQueries, install_query_recorder, _record_execute
+    from task.models import Task
+    from task.infrastructure import TaskRepository
+    from history.models import History
+    from history.infrastructure import HistoryRepository
+
+    with benchmark_database():
+        user = get_user_model().objects.create_user(
+            username='benchmark', email='benchmark@example.com', password='benchmark'
+        )
+        seed(user)
+        task_repository = TaskRepository(Task, connection, json_passthrough=True)
+        history_repository = HistoryRepository(History, connection)
+        from_date, to_date = str(date.today() - timedelta(days=30)), str(date.today())
+
+        def dashboard():
+            task_repository.get_count_user_tasks_in_categories(user.id)
+            task_repository.get_ordered_user_tasks_json(user.id)
+
+        def history_list():
+            history_repository.get_history_page(user.id, from_date, to_date, None, 50)
+
+        def instrumented(call):
+            def wrapper():
+                with RequestQueries():
+                    call()
+            return wrapper
+
+        connection.ensure_connection()
+        results = {
+            'TaskDashboardUseCase': {'old': measure(dashboard, repeat, clock=time.process_time)},
+            'GetUserHistoryPageUseCase': {'old': measure(history_list, repeat, clock=time.process_time)},
+        }
+        install_query_recorder()
+        try:
+            results['TaskDashboardUseCase']['new'] = measure(instrumented(dashboard), repeat, clock=time.process_time)
+            results['GetUserHistoryPageUseCase']['new'] = measure(instrumented(history_list), repeat, clock=time.process_time)
+        finally:
+            connection.execute_wrappers.remove(_record_execute)
+        print_comparison('Процессорное время запросов, old - без замеров, new - с замерами', results)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=200)
+    arguments = parser.parse_args()
+    setup_django()
+    run(arguments.repeat)
@@ -0,0 +1,159 @@
+'''
+Сравнение независимых запросов главной страницы задач и статистики
+истории на сегодня, выполненных по одному, с отправкой тех же запросов
+одним пайплайном psycopg (QueryBatch).
+
+Выигрыш пайплайна - в числе ожиданий сети, поэтому соединение идет
+через локальный TCP-прокси, который задерживает каждый пакет данных
+в обе стороны на --latency-ms, как если бы база стояла в другой зоне.
+
+    python -m benchmarks.query_pipeline [--latency-ms 2] [--repeat 50]
+'''
+import argparse
+import socket
+import threading
+import time
+from datetime import date, timedelta
+
+from benchmarks import setup_django, benchmark_database, measure, print_comparison
+
+
+class LatencyProxy:
+    '''
+    TCP-прокси, который пересылает данные между клиентом и базой
+    с задержкой на каждую порцию данных в каждом направлении
+    '''
+
+    def __init__(self, target_host: str, target_port: int, latency: float) -> None:
+        self._target = (target_host, target_port)
+        self._latency = latency
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(('127.0.0.1', 0))
+        self._server.listen()
+        self.port = self._server.getsockname()[1]
+
+    def start(self) -> None:
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self) -> None:
+        while True:
+            client, _ = self._server.accept()
+            upstream = socket.create_connection(self._target)
+            for source, destination in [(client, upstream), (upstream, client)]:
+                source.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                threading.Thread(target=self._forward, args=(source, destination), daemon=True).start()
+
+    def _forward(self, source: socket.socket, destination: socket.socket) -> None:
+        try:
+            while data := source.recv(65536):
+                time.sleep(self._latency)
+                destination.sendall(data)
+        except OSError:
+            pass
+        finally:
+            destination.close()
+
+
+def seed(user):
+    from task.models import Task, Category
+    from history.models import History
+    from history.constants.choices import HistoryTaskStatusChoices
+
+    categories = Category.objects.bulk_create([
+        Category(name=f'Benchmark {index}', color='rgba(0, 0, 0, 0.4)', user=user, is_custom=True)
+        for index in range(6)
+    ])
+    Task.objects.bulk_create([
+        Task(
+            name=f'Benchmark task {index}',
+            category=categories[index % 6],
+            user=user,
+            planned_time=timedelta(hours=1),
+            deadline=date.today(),
+            order=index,
+        )
+        for index in range(50)
+    ])
+    History.objects.bulk_create([
+        History(
+            name=f'Benchmark history {index}',
+            category=categories[index % 6],
+            user=user,
+            planned_time=timedelta(hours=1),
+            execution_time=timedelta(minutes=50),
+            execution_date=date.today(),
+            status=HistoryTaskStatusChoices.SUCCESSFUL,
+        )
+        for index in range(20)
+    ])
+
+
+def run(latency_ms: float, repeat: int) -> None:
+    from django.db import connection
+    from django.contrib.auth import get_user_model
+    from task.models import Task
+    from task.infrastructure import TaskRepository
+    from history.models import History
+    from history.infrastructure import HistoryRepository
+
+    with benchmark_database():
+        user = get_user_model().objects.create_user(
+            username='benchmark', email='benchmark@example.com', password='benchmark'
+        )
+        seed(user)
+
+        settings_dict = connection.settings_dict
+        old_host, old_port = settings_dict['HOST'], settings_dict['PORT']
+        proxy = LatencyProxy(old_host or 'localhost', int(old_port or 5432), latency_ms / 1000)
+        proxy.start()
+        connection.close()
+        settings_dict['HOST'], settings_dict['PORT'] = '127.0.0.1', proxy.port
+        try:
+            task_repository = TaskRepository(Task, connection, json_passthrough=True)
+            history_repository = HistoryRepository(History, connection)
+            today = date.today()
+
+            def dashboard_sequential():
+                task_repository.get_count_user_tasks_in_categories(user.id)
+                task_repository.get_ordered_user_tasks_json(user.id)
+
+            def dashboard_batched():
+                with task_repository.batch():
+                    chart_data = task_repository.get_count_user_tasks_in_categories(user.id)
+                    tasks = task_repository.get_ordered_user_tasks_json(user.id)
+                chart_data.result, tasks.result
+
+            def history_today_sequential():
+                history_repository.get_user_tasks_for_today_json(user.id, today)
+                history_repository.get_count_user_tasks_in_categories_for_today(user.id, today)
+
+            def history_today_batched():
+                with history_repository.batch():
+                    tasks = history_repository.get_user_tasks_for_today_json(user.id, today)
+                    categories = history_repository.get_count_user_tasks_in_categories_for_today(user.id, today)
+                tasks.result, categories.result
+
+            results = {
+                'TaskDashboardUseCase': {
+                    'old': measure(dashboard_sequential, repeat),
+                    'new': measure(dashboard_batched, repeat),
+                },
+                'get_user_history_statistics_for_today': {
+                    'old': measure(history_today_sequential, repeat),
+                    'new': measure(history_today_batched, repeat),
+                },
+            }
+            print_comparison(f'Задержка сети {latency_ms} мс в каждую сторону', results)
+        finally:
+            connection.close()
+            settings_dict['HOST'], settings_dict['PORT'] = old_host, old_port
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--latency-ms', type=float, default=2.0)
+    parser.add_argument('--repeat', type=int, default=50)
+    arguments = parser.parse_args()
+    setup_django()
+    run(arguments.latency_ms, arguments.repeat)
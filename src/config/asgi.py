@@ -11,6 +11,8 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from core.pool import ConnectionPoolLifespan
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+application = ConnectionPoolLifespan(get_asgi_application())
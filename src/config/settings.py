@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 import os
 from pathlib import Path
 from django.urls import reverse_lazy
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -31,7 +32,7 @@ SECRET_KEY = os.getenv('DJANGO_KEY')
 APP_ID = os.getenv('APP_ID')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.getenv('DJANGO_DEBUG', '1') == '1'
 
 ALLOWED_HOSTS = ['127.0.0.1', 'localhost', '192.168.1.166']
 
@@ -60,11 +61,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.UserTimezoneMiddleware',
+    'core.middleware.RequestContainerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 
@@ -96,17 +100,96 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Соединения берутся из пула psycopg_pool (см. core.pool) и возвращаются
+# в него в конце запроса, поэтому CONN_MAX_AGE остается 0. Пул свой у каждого
+# процесса, под ASGI к нему добавляется такой же пул асинхронных соединений.
+# POSTGRES_POOL_MAX_SIZE должен покрывать число потоков воркера, а сумма по
+# всем процессам - укладываться в max_connections базы.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.backends.postgresql',
         'NAME': os.getenv('POSTGRES_NAME'),
         'USER': os.getenv('POSTGRES_USER'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('POSTGRES_HOST'),
         'PORT': os.getenv('POSTGRES_PORT'),
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {
+            'pool': os.getenv('POSTGRES_POOL', '1') == '1' and {
+                'min_size': int(os.getenv('POSTGRES_POOL_MIN_SIZE', '2')),
+                'max_size': int(os.getenv('POSTGRES_POOL_MAX_SIZE', '10')),
+                # закрывать лишние сверх min_size соединения после простоя, сек
+                'max_idle': float(os.getenv('POSTGRES_POOL_MAX_IDLE', '600')),
+                # сколько запрос ждет свободного соединения, сек
+                'timeout': float(os.getenv('POSTGRES_POOL_TIMEOUT', '30')),
+                # проверять соединение перед выдачей из пула
+                'check': True,
+            },
+        },
     }
 }
 
+# Реплика для чтения статистики, календаря и списков (см. core.routers).
+# В тестах соединение реплики читает тестовую базу default, поэтому для
+# прогона тестов реплика должна быть второй базой на том же сервере.
+if os.getenv('POSTGRES_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('POSTGRES_REPLICA_NAME', DATABASES['default']['NAME']),
+        'HOST': os.getenv('POSTGRES_REPLICA_HOST'),
+        'PORT': os.getenv('POSTGRES_REPLICA_PORT', DATABASES['default']['PORT']),
+        'OPTIONS': {**DATABASES['default']['OPTIONS']},
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICA = 'replica' if 'replica' in DATABASES else None
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# сколько секунд после записи пользователя его чтение идет на основную базу,
+# должно быть больше обычного отставания реплики
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '5'))
+
+# Замеры SQL по запросам: заголовок Server-Timing, лог запросов дольше
+# SLOW_REQUEST_THRESHOLD_MS и сводка по эндпоинтам (см. core.instrumentation)
+SQL_INSTRUMENTATION = os.getenv('SQL_INSTRUMENTATION', '1') == '1'
+SLOW_REQUEST_THRESHOLD_MS = float(os.getenv('SLOW_REQUEST_THRESHOLD_MS', '500'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core': {
+            'handlers': ['console'],
+            'level': os.getenv('CORE_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
+# Кеш ответов версионируется по пользователю (см. core.cache), версии
+# хранятся без срока жизни. Локальный кеш процесса годится только для
+# разработки: у каждого воркера были бы свои версии, и записи в одном
+# процессе не сбрасывали бы кеш других. Без DEBUG нужен общий бэкенд,
+# например django.core.cache.backends.redis.RedisCache
+# или django.core.cache.backends.memcached.PyMemcacheCache.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+if not DEBUG and CACHES['default']['BACKEND'] == 'django.core.cache.backends.locmem.LocMemCache':
+    raise ImproperlyConfigured(
+        'LocMemCache не разделяется между процессами, без DEBUG задайте общий '
+        'бэкенд кеша в CACHE_BACKEND и CACHE_LOCATION (Redis или Memcached)'
+    )
+
 
 
 # Password validation
@@ -0,0 +1,57 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db import NO_DB_ALIAS
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from django.utils.asyncio import async_unsafe
+
+from core.pool import get_pool
+from .creation import DatabaseCreation
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    '''
+    Бэкенд PostgreSQL, который берет соединения из пула psycopg_pool
+    (core.pool), если в OPTIONS базы задан pool, и возвращает их в пул
+    вместо закрытия. Соединение Django закрывается в конце запроса
+    (CONN_MAX_AGE = 0), поэтому запрос держит соединение из пула только
+    пока выполняется. Перед выдачей пул проверяет соединение.
+    '''
+
+    creation_class = DatabaseCreation
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    @property
+    def pool(self):
+        if self.alias == NO_DB_ALIAS:
+            return None
+        return get_pool(self.alias, self.settings_dict, self.get_connection_params())
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = IsolationLevel(options.get('isolation_level', IsolationLevel.READ_COMMITTED))
+        except ValueError:
+            raise ImproperlyConfigured(
+                f"Invalid transaction isolation level {options['isolation_level']} specified. Use one of the "
+                f"psycopg.IsolationLevel values."
+            )
+        connection = pool.getconn()
+        if 'isolation_level' in options:
+            connection.isolation_level = self.isolation_level
+        return connection
+
+    def _close(self):
+        pool = getattr(self.connection, '_pool', None)
+        if pool is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            pool.putconn(self.connection)
+            self.connection = None
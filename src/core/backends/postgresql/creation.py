@@ -0,0 +1,12 @@
+from django.db.backends.postgresql import creation
+
+from core.pool import close_pools
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # соединения пулов, в том числе пула реплики-зеркала, держат
+        # тестовую базу и не дают ее удалить
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
@@ -0,0 +1,351 @@
+import time
+import asyncio
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, NamedTuple, Optional
+from uuid import UUID
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction, connections
+
+from .routers import recent_writes
+
+
+class UserVersion:
+    '''
+    Счетчик версии данных пользователя в пространстве имен.
+    Версия входит в ключи закешированных ответов, поэтому после увеличения
+    версии старые записи просто перестают читаться и со временем вытесняются.
+    Отсутствующая версия заполняется текущим временем в наносекундах, чтобы
+    после вытеснения счетчика из кеша версии не повторялись.
+    '''
+
+    def __init__(self, namespace: str) -> None:
+        self._namespace = namespace
+
+    def _get_key(self, user_id: UUID) -> str:
+        return f'version:{self._namespace}:{user_id}'
+
+    def get(self, user_id: UUID) -> int:
+        key = self._get_key(user_id)
+        version = cache.get(key)
+        if version is None:
+            version = time.time_ns()
+            if not cache.add(key, version, timeout=None):
+                version = cache.get(key, version)
+        return version
+
+    def bump(self, user_id: UUID) -> None:
+        '''
+        Увеличивает версию сразу и еще раз после фиксации транзакции.
+        Второе увеличение нужно, чтобы запись, закешированная параллельным
+        запросом до фиксации по еще не измененным данным, не читалась.
+        После фиксации чтение пользователя на время переходит с реплики
+        на основную базу (см. core.routers.ReplicaRouter).
+        '''
+        self._increment(user_id)
+        transaction.on_commit(lambda: self._increment(user_id))
+        transaction.on_commit(lambda: recent_writes.record(user_id))
+
+    def _increment(self, user_id: UUID) -> None:
+        key = self._get_key(user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+class CacheMetrics:
+    '''
+    Счетчики попаданий и промахов кеша. Хранятся в самом кеше, поэтому
+    при общем бэкенде видны из всех процессов приложения.
+    '''
+
+    registry: dict[str, 'CacheMetrics'] = {}
+    counters: tuple[str, ...] = ('hits', 'misses')
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+        CacheMetrics.registry[name] = self
+
+    def _get_key(self, counter: str) -> str:
+        return f'cache-metrics:{self._name}:{counter}'
+
+    def increment(self, counter: str, amount: int = 1) -> None:
+        key = self._get_key(counter)
+        if not cache.add(key, amount, timeout=None):
+            try:
+                cache.incr(key, amount)
+            except ValueError:
+                cache.set(key, amount, timeout=None)
+
+    def snapshot(self) -> dict[str, int]:
+        values = cache.get_many([self._get_key(counter) for counter in self.counters])
+        return {counter: values.get(self._get_key(counter), 0) for counter in self.counters}
+
+    @classmethod
+    def snapshot_all(cls) -> dict[str, dict[str, int]]:
+        return {name: metrics.snapshot() for name, metrics in cls.registry.items()}
+
+
+class VersionedUserCache:
+    '''
+    Кеш данных пользователя, ключ которого зависит от версии пользователя
+    в пространстве имен. Запись читается, пока версия не увеличится.
+    '''
+
+    def __init__(
+            self,
+            name: str,
+            version: UserVersion,
+            timeout: Optional[int] = 60 * 60,
+        ) -> None:
+        self._name = name
+        self._version = version
+        self._timeout = timeout
+        self.metrics = CacheMetrics(name)
+
+    def get_or_set(self, user_id: UUID, get_value: Callable[[], Any]) -> tuple[Any, bool]:
+        '''
+        Возвращает значение и признак попадания в кеш
+        '''
+        key = f'{self._name}:{user_id}:{self._version.get(user_id)}'
+        value = cache.get(key)
+        if value is not None:
+            self.metrics.increment('hits')
+            return value, True
+        self.metrics.increment('misses')
+        value = get_value()
+        cache.set(key, value, timeout=self._timeout)
+        return value, False
+
+    async def aget_or_set(self, user_id: UUID, get_value: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        '''
+        get_or_set для асинхронных представлений, значение считается корутиной
+        get_value. Обращения к кешу короткие, поэтому выполняются без
+        переключения в поток.
+        '''
+        key = f'{self._name}:{user_id}:{self._version.get(user_id)}'
+        value = cache.get(key)
+        if value is not None:
+            self.metrics.increment('hits')
+            return value, True
+        self.metrics.increment('misses')
+        value = await get_value()
+        cache.set(key, value, timeout=self._timeout)
+        return value, False
+
+
+class StaleWhileRevalidateMetrics(CacheMetrics):
+    '''
+    Счетчики кеша с фоновым пересчетом: кроме попаданий и промахов
+    считаются отданные устаревшие значения, запросы, дождавшиеся чужого
+    пересчета, и суммарное время пересчетов
+    '''
+
+    counters = ('hits', 'stale_hits', 'misses', 'coalesced', 'recomputes', 'recompute_ms')
+
+    def snapshot(self) -> dict[str, float]:
+        values = super().snapshot()
+        requests = values['hits'] + values['stale_hits'] + values['misses'] + values['coalesced']
+        values['hit_ratio'] = round((values['hits'] + values['stale_hits']) / requests, 4) if requests else 0
+        values['recompute_avg_ms'] = round(values['recompute_ms'] / values['recomputes'], 2) if values['recomputes'] else 0
+        return values
+
+
+class CachedValue(NamedTuple):
+    value: Any
+    # hit, stale или miss
+    status: str
+
+    @property
+    def is_stale(self) -> bool:
+        return self.status == 'stale'
+
+
+class StaleWhileRevalidateCache:
+    '''
+    Кеш дорогих результатов по пользователю и параметрам запроса.
+    В отличие от VersionedUserCache версия пользователя не входит в ключ,
+    а хранится вместе со значением, поэтому после записи пользователя
+    старое значение остается доступным:
+    - версия совпадает - значение отдается из кеша;
+    - версия устарела - старое значение отдается сразу, а пересчет
+      ставится в фоновый поток (один на процесс);
+    - значения нет - оно считается в запросе.
+    Пересчет одного ключа выполняется одним исполнителем: его захватывает
+    блокировка в кеше (cache.add), остальные запросы без значения ждут
+    его результата, а с устаревшим значением - отдают его.
+    '''
+
+    _executor: Optional[Executor] = None
+
+    def __init__(
+            self,
+            name: str,
+            version: UserVersion,
+            timeout: Optional[int] = 60 * 60 * 24,
+            lock_timeout: int = 30,
+            wait_timeout: float = 10,
+            executor: Optional[Executor] = None,
+        ) -> None:
+        self._name = name
+        self._version = version
+        self._timeout = timeout
+        self._lock_timeout = lock_timeout
+        self._wait_timeout = wait_timeout
+        self._own_executor = executor
+        self.metrics = StaleWhileRevalidateMetrics(name)
+
+    def get_or_compute(self, user_id: UUID, params: str, compute: Callable[[], Any]) -> CachedValue:
+        key = f'{self._name}:{user_id}:{params}'
+        version = self._version.get(user_id)
+        cached = self._get_cached(key, version)
+        if cached is not None:
+            if cached.is_stale:
+                self._schedule_revalidation(key, version, compute)
+            return cached
+
+        lock_key = f'{key}:lock'
+        is_locked = cache.add(lock_key, version, timeout=self._lock_timeout)
+        if not is_locked:
+            value = self._wait_for_value(key, version)
+            if value is not None:
+                self.metrics.increment('coalesced')
+                return CachedValue(value, 'hit')
+            # исполнитель не успел или упал, считаем сами
+        self.metrics.increment('misses')
+        try:
+            started = time.perf_counter()
+            value = compute()
+            self._store(key, version, value, started)
+        finally:
+            # блокировку снимает только ее владелец, а не запрос,
+            # который не дождался чужого пересчета
+            if is_locked:
+                cache.delete(lock_key)
+        return CachedValue(value, 'miss')
+
+    async def aget_or_compute(
+            self,
+            user_id: UUID,
+            params: str,
+            acompute: Callable[[], Awaitable[Any]],
+            compute: Callable[[], Any],
+        ) -> CachedValue:
+        '''
+        get_or_compute для асинхронных представлений: при промахе значение
+        считается корутиной acompute, а ожидание чужого пересчета не занимает
+        поток. Устаревшее значение, как и в get_or_compute, пересчитывается
+        в фоновом потоке синхронной функцией compute.
+        '''
+        key = f'{self._name}:{user_id}:{params}'
+        version = self._version.get(user_id)
+        cached = self._get_cached(key, version)
+        if cached is not None:
+            if cached.is_stale:
+                # исполнитель может выполнить пересчет сразу, а синхронные
+                # запросы к БД в цикле событий запрещены
+                await sync_to_async(self._schedule_revalidation)(key, version, compute)
+            return cached
+
+        lock_key = f'{key}:lock'
+        is_locked = cache.add(lock_key, version, timeout=self._lock_timeout)
+        if not is_locked:
+            value = await self._await_value(key, version)
+            if value is not None:
+                self.metrics.increment('coalesced')
+                return CachedValue(value, 'hit')
+        self.metrics.increment('misses')
+        try:
+            started = time.perf_counter()
+            value = await acompute()
+            self._store(key, version, value, started)
+        finally:
+            if is_locked:
+                cache.delete(lock_key)
+        return CachedValue(value, 'miss')
+
+    def _get_cached(self, key: str, version: int) -> Optional[CachedValue]:
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        if entry['version'] == version:
+            self.metrics.increment('hits')
+            return CachedValue(entry['value'], 'hit')
+        self.metrics.increment('stale_hits')
+        return CachedValue(entry['value'], 'stale')
+
+    def _schedule_revalidation(self, key: str, version: int, compute: Callable[[], Any]) -> None:
+        '''
+        Ставит пересчет устаревшего значения в фоновый поток,
+        если его еще никто не взял
+        '''
+        lock_key = f'{key}:lock'
+        if cache.add(lock_key, version, timeout=self._lock_timeout):
+            self._get_executor().submit(
+                self._revalidate, key, lock_key, version, compute, threading.get_ident()
+            )
+
+    def _get_executor(self) -> Executor:
+        if self._own_executor is not None:
+            return self._own_executor
+        if StaleWhileRevalidateCache._executor is None:
+            StaleWhileRevalidateCache._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix='cache-revalidate'
+            )
+        return StaleWhileRevalidateCache._executor
+
+    def _store(self, key: str, version: int, value: Any, started: float) -> None:
+        self.metrics.increment('recomputes')
+        self.metrics.increment('recompute_ms', round((time.perf_counter() - started) * 1000))
+        cache.set(key, {'version': version, 'value': value}, timeout=self._timeout)
+
+    def _revalidate(
+            self,
+            key: str,
+            lock_key: str,
+            version: int,
+            compute: Callable[[], Any],
+            caller_thread_id: int,
+        ) -> None:
+        try:
+            started = time.perf_counter()
+            self._store(key, version, compute(), started)
+        finally:
+            cache.delete(lock_key)
+            if threading.get_ident() != caller_thread_id:
+                # у потока пересчета свое соединение с базой, которое
+                # не закрывается по окончании запроса
+                connections.close_all()
+
+    def _wait_for_value(self, key: str, version: int) -> Optional[Any]:
+        deadline = time.monotonic() + self._wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            value = self._get_computed(key, version)
+            if value is not None:
+                return value
+        return None
+
+    async def _await_value(self, key: str, version: int) -> Optional[Any]:
+        deadline = time.monotonic() + self._wait_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            value = self._get_computed(key, version)
+            if value is not None:
+                return value
+        return None
+
+    def _get_computed(self, key: str, version: int) -> Optional[Any]:
+        entry = cache.get(key)
+        if entry is not None and entry['version'] >= version:
+            return entry['value']
+        return None
+
+
+# версии данных, от которых зависят закешированные ответы
+tasks_version = UserVersion('tasks')
+categories_version = UserVersion('categories')
+history_version = UserVersion('history')
@@ -0,0 +1,222 @@
+import asyncio
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+
+import psycopg
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+from psycopg_pool import AsyncConnectionPool
+
+from .db import DeferredCursor, connect_async
+from .pool import async_pools_enabled, get_async_pool, get_pool_options
+from .routers import get_read_alias
+
+
+# контейнер запроса, который обрабатывается в текущем контексте. В потоки
+# ThreadPoolExecutor контекст не передается, поэтому фоновые задачи,
+# начатые в запросе, видят здесь None
+_active_container: ContextVar[Optional['RequestContainer']] = ContextVar('active_request_container', default=None)
+
+
+class ScopedConnection:
+    '''
+    Соединение Django для репозиториев одного запроса. Курсоры, открытые
+    через него в контексте запроса, закрываются вместе с контейнером,
+    а курсоры фоновых задач (пересчет StaleWhileRevalidateCache) остаются
+    им. Остальные атрибуты берутся у соединения connections[alias].
+    Соединение чтения (replica_read) выбирает базу роутером
+    (core.routers.ReplicaRouter) при первом обращении.
+    '''
+
+    def __init__(self, container: 'RequestContainer', alias: str, replica_read: bool = False) -> None:
+        self._alias = alias
+        self._replica_read = replica_read
+        self._container = container
+        self._cursors = []
+
+    @property
+    def alias(self) -> str:
+        if self._replica_read:
+            self._alias = get_read_alias(self._alias, self._container.user)
+            self._replica_read = False
+        return self._alias
+
+    def cursor(self):
+        cursor = connections[self.alias].cursor()
+        if _active_container.get() is self._container:
+            self._cursors.append(cursor)
+        return cursor
+
+    def close_cursors(self) -> None:
+        cursors, self._cursors = self._cursors, []
+        for cursor in cursors:
+            cursor.close()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(connections[self.alias], name)
+
+
+class AsyncScopedConnection:
+    '''
+    Асинхронное соединение psycopg с базой alias для репозиториев одного
+    запроса (см. core.db.AsyncRepositoryMixin). Берется при первом запросе
+    к базе из пула асинхронных соединений (core.pool) или открывается,
+    если пул выключен, и возвращается в пул (закрывается) вместе
+    с контейнером запроса. Соединение чтения (replica_read) выбирает базу
+    роутером (core.routers.ReplicaRouter) перед первым запросом.
+    '''
+
+    def __init__(self, alias: str, replica_read: bool = False, user: Any = None) -> None:
+        self.alias = alias
+        self._replica_read = replica_read
+        self._user = user
+        self._connection: Optional[psycopg.AsyncConnection] = None
+        self._pool: Optional[AsyncConnectionPool] = None
+        self._lock = asyncio.Lock()
+        self._uses_django_connection: Optional[bool] = None
+
+    async def uses_django_connection(self) -> bool:
+        '''
+        Выполнять ли запросы в соединении Django: внутри его транзакции
+        (например, транзакции TestCase), чтобы видеть незафиксированные
+        записи, и под WSGI с пулом соединений, чтобы взять соединение из
+        пула, а не подключаться на каждый запрос. Соединения Django
+        привязаны к потоку, поэтому это проверяется один раз на запрос
+        в потоке sync_to_async.
+        '''
+        if self._uses_django_connection is None:
+            self._uses_django_connection = await sync_to_async(self._check_django_connection)()
+        return self._uses_django_connection
+
+    def _check_django_connection(self) -> bool:
+        if self._replica_read:
+            self.alias = get_read_alias(self.alias, self._user)
+            self._replica_read = False
+        connection = connections[self.alias]
+        if connection.in_atomic_block:
+            return True
+        return not async_pools_enabled() and get_pool_options(connection.settings_dict) is not None
+
+    @property
+    def is_open(self) -> bool:
+        return self._connection is not None
+
+    def cursor(self) -> DeferredCursor:
+        return DeferredCursor()
+
+    async def get(self) -> psycopg.AsyncConnection:
+        # выбирает базу соединения чтения
+        await self.uses_django_connection()
+        async with self._lock:
+            if self._connection is None:
+                self._pool = await get_async_pool(self.alias)
+                if self._pool is None:
+                    self._connection = await connect_async(self.alias)
+                else:
+                    self._connection = await self._pool.getconn()
+        return self._connection
+
+    async def close(self) -> None:
+        connection, self._connection = self._connection, None
+        if connection is None:
+            return
+        if self._pool is None:
+            await connection.close()
+        else:
+            await self._pool.putconn(connection)
+
+
+class RequestContainer:
+    '''
+    Контейнер зависимостей одного запроса. Use case'ы и репозитории
+    собираются лениво при первом обращении и живут до конца запроса.
+    Запрос обрабатывается внутри with (async with) контейнера, на выходе
+    из которого курсоры и соединения запроса закрываются.
+    Репозитории запросов только на чтение (статистика, календарь, списки)
+    собираются на read_connection и async_read_connection, которые могут
+    уйти на реплику базы alias, остальные - на connection и async_connection.
+    '''
+
+    def __init__(self, alias: str = DEFAULT_DB_ALIAS, user: Any = None) -> None:
+        self.user = user
+        self.connection = ScopedConnection(self, alias)
+        self.read_connection = ScopedConnection(self, alias, replica_read=True)
+        self.async_connection = AsyncScopedConnection(alias)
+        self.async_read_connection = AsyncScopedConnection(alias, replica_read=True, user=user)
+        self._instances: dict['RequestScoped', Any] = {}
+        self._token = None
+
+    def __enter__(self) -> 'RequestContainer':
+        self._token = _active_container.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        _active_container.reset(self._token)
+        self.close()
+
+    async def __aenter__(self) -> 'RequestContainer':
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        _active_container.reset(self._token)
+        await self.aclose()
+
+    @property
+    def alias(self) -> str:
+        return self.connection.alias
+
+    def resolve(self, provider: 'RequestScoped') -> Any:
+        if provider not in self._instances:
+            self._instances[provider] = provider.factory(self)
+        return self._instances[provider]
+
+    def close(self) -> None:
+        self._instances.clear()
+        self.connection.close_cursors()
+        self.read_connection.close_cursors()
+        for async_connection in (self.async_connection, self.async_read_connection):
+            if async_connection.is_open:
+                # асинхронное представление под WSGI без пула соединений
+                async_to_sync(async_connection.close)()
+
+    async def aclose(self) -> None:
+        self._instances.clear()
+        self.connection.close_cursors()
+        self.read_connection.close_cursors()
+        await self.async_connection.close()
+        await self.async_read_connection.close()
+
+
+class RequestScoped:
+    '''
+    Зависимость, которая создается один раз на запрос функцией factory
+    от контейнера запроса. Внутри factory другие зависимости получаются
+    через .resolve(container). Как атрибут класса представления
+    возвращает экземпляр для self.request:
+
+        task_repository = RequestScoped(lambda container: TaskRepository(Task, container.connection))
+
+        class TaskView(View):
+            use_case = RequestScoped(lambda container: TaskUseCase(task_repository.resolve(container)))
+    '''
+
+    def __init__(self, factory: Callable[[RequestContainer], Any]) -> None:
+        self.factory = factory
+
+    def resolve(self, container: RequestContainer) -> Any:
+        return container.resolve(self)
+
+    def __get__(self, view, owner=None) -> Any:
+        if view is None:
+            return self
+        return self.resolve(get_request_container(view.request))
+
+
+def get_request_container(request) -> RequestContainer:
+    try:
+        return request.container
+    except AttributeError:
+        raise ImproperlyConfigured(
+            'Зависимости запроса требуют core.middleware.RequestContainerMiddleware в MIDDLEWARE'
+        )
@@ -0,0 +1,363 @@
+import json
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+
+import psycopg
+from psycopg.types.string import TextLoader
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.utils.connection import ConnectionProxy
+
+from .instrumentation import record_query
+
+
+class RawJson(str):
+    '''
+    JSON, собранный в Postgres, в виде исходного текста. Такое значение
+    не разбирается в объекты Python, а вставляется в тело ответа как есть
+    (см. core.http.RawJsonResponse).
+    '''
+
+
+class JsonPassthroughRepositoryMixin:
+    '''
+    Примесь для репозиториев, которые собирают JSON в Postgres.
+    При json_passthrough курсор читает колонки json как текст, и методы
+    возвращают RawJson вместо разобранных словарей и списков.
+    Ожидает self._connection и self._json_passthrough.
+    '''
+
+    _connection: ConnectionProxy
+    _json_passthrough: bool = False
+
+    def _get_json_cursor(self):
+        cursor = self._connection.cursor()
+        if self._json_passthrough:
+            # cursor.cursor - курсор psycopg под оберткой Django
+            cursor.cursor.adapters.register_loader('json', TextLoader)
+        return cursor
+
+    def _fetch_json(self, cursor, default: Any = None) -> Any:
+        value = cursor.fetchone()[0]
+        if not self._json_passthrough:
+            return default if value is None else value
+        if value is None:
+            return RawJson(json.dumps(default))
+        return RawJson(value)
+
+    def _fetch_json_columns(self, cursor, names: tuple[str, ...]) -> dict[str, Any]:
+        '''
+        Строка из нескольких колонок json в виде словаря по именам names.
+        Колонки не должны быть NULL.
+        '''
+        row = cursor.fetchone()
+        if not self._json_passthrough:
+            return dict(zip(names, row))
+        return {name: RawJson(value) for name, value in zip(names, row)}
+
+
+# курсор, SQL, параметры и функция чтения результата запроса репозитория
+RepositoryQuery = tuple[Any, str, Any, Callable[[Any], Any]]
+
+
+def _get_pipeline_sql(sqls: list[str]) -> str:
+    # запись синхронизации пайплайна в замерах SQL: число и текст запросов пакета
+    return f'-- pipeline sync, {len(sqls)} queries\n' + '\n'.join(sqls)
+
+
+class PendingResult:
+    '''
+    Результат запроса, отправленного в QueryBatch или AsyncQueryBatch.
+    Читается после синхронизации пайплайна, то есть после выхода из блока with.
+    '''
+
+    def __init__(self, cursor, sql: str, fetch: Callable[[Any], Any]) -> None:
+        self._cursor = cursor
+        self.sql = sql
+        self._fetch = fetch
+        self._is_resolved = False
+        self._value = None
+
+    @property
+    def result(self) -> Any:
+        if not self._is_resolved:
+            raise RuntimeError('Результат запроса доступен после выхода из QueryBatch')
+        return self._value
+
+    def _resolve(self) -> None:
+        self._set_result(self._fetch(self._cursor))
+
+    def _set_result(self, value: Any) -> None:
+        self._value = value
+        self._is_resolved = True
+
+
+class QueryBatch:
+    '''
+    Пакет независимых запросов, которые отправляются на сервер одним
+    пайплайном psycopg и ждут ответа один раз на весь пакет:
+
+        with repository.batch():
+            chart_data = repository.get_count_user_tasks_in_categories(user_id)
+            tasks = repository.get_ordered_user_tasks_json(user_id)
+        chart_data.result, tasks.result
+
+    Внутри пакета методы репозиториев с QueryBatchRepositoryMixin
+    возвращают PendingResult вместо результата. Запросы пакета не должны
+    зависеть от результатов друг друга. Пакеты не вкладываются.
+    Запросы пакета попадают в замеры SQL (core.instrumentation) при отправке
+    почти без времени, а ожидание ответов на них записывается при выходе
+    из пакета одним замером синхронизации пайплайна.
+    '''
+
+    _active: ContextVar[Optional['QueryBatch']] = ContextVar('active_query_batch', default=None)
+
+    def __init__(self, connection: ConnectionProxy) -> None:
+        self._connection = connection
+        self._pending: list[PendingResult] = []
+
+    @classmethod
+    def get_active(cls, connection: ConnectionProxy) -> Optional['QueryBatch']:
+        batch = cls._active.get()
+        if batch is not None and batch._connection.alias == connection.alias:
+            return batch
+        return None
+
+    def defer(self, cursor, sql: str, fetch: Callable[[Any], Any]) -> PendingResult:
+        pending = PendingResult(cursor, sql, fetch)
+        self._pending.append(pending)
+        return pending
+
+    def __enter__(self) -> 'QueryBatch':
+        if QueryBatch._active.get() is not None:
+            raise RuntimeError('QueryBatch не вкладываются')
+        self._connection.ensure_connection()
+        # self._connection.connection - соединение psycopg под оберткой Django
+        self._pipeline = self._connection.connection.pipeline()
+        with self._connection.wrap_database_errors:
+            self._pipeline.__enter__()
+        self._token = QueryBatch._active.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        QueryBatch._active.reset(self._token)
+        # выход из пайплайна отправляет Sync и ждет ответы на все запросы
+        started_at = time.perf_counter()
+        with self._connection.wrap_database_errors:
+            self._pipeline.__exit__(exc_type, exc_value, traceback)
+        record_query(self._get_sync_sql(), time.perf_counter() - started_at, count=0)
+        if exc_type is None:
+            for pending in self._pending:
+                pending._resolve()
+
+    def _get_sync_sql(self) -> str:
+        return _get_pipeline_sql([pending.sql for pending in self._pending])
+
+
+class QueryBatchRepositoryMixin:
+    '''
+    Примесь для репозиториев, чьи запросы можно отправлять пакетом.
+    Метод выполняет запрос через _execute и передает функцию чтения
+    результата из курсора: вне пакета она вызывается сразу, внутри
+    QueryBatch - после синхронизации пайплайна.
+    Ожидает self._connection.
+    '''
+
+    _connection: ConnectionProxy
+
+    def batch(self) -> QueryBatch:
+        return QueryBatch(self._connection)
+
+    def _execute(self, cursor, sql: str, params, fetch: Callable[[Any], Any]) -> Any:
+        cursor.execute(sql, params)
+        batch = QueryBatch.get_active(self._connection)
+        if batch is None:
+            return fetch(cursor)
+        return batch.defer(cursor, sql, fetch)
+
+
+def get_async_connection_kwargs(alias: str) -> dict[str, Any]:
+    '''
+    Параметры асинхронного соединения psycopg с базой alias с параметрами
+    соединения Django. Курсоры, как и у Django, подставляют параметры на
+    клиенте, поэтому запросы репозиториев выполняются без изменений.
+    '''
+    params = connections[alias].get_connection_params()
+    params.pop('cursor_factory', None)
+    return {**params, 'autocommit': True, 'cursor_factory': psycopg.AsyncClientCursor}
+
+
+async def connect_async(alias: str) -> psycopg.AsyncConnection:
+    return await psycopg.AsyncConnection.connect(**get_async_connection_kwargs(alias))
+
+
+class DeferredCursor:
+    '''
+    Курсор асинхронного репозитория. Методы репозитория получают его
+    синхронно, а курсор psycopg открывается в _aexecute, когда есть соединение.
+    '''
+
+    def __init__(self, json_as_text: bool = False) -> None:
+        self.json_as_text = json_as_text
+
+
+class FetchedRows:
+    '''
+    Прочитанные строки результата с методами чтения курсора, чтобы функции
+    чтения результата репозиториев работали и с асинхронными курсорами
+    '''
+
+    def __init__(self, rows: list[tuple]) -> None:
+        self._rows = rows
+        self._position = 0
+
+    def fetchone(self) -> Optional[tuple]:
+        if self._position >= len(self._rows):
+            return None
+        self._position += 1
+        return self._rows[self._position - 1]
+
+    def fetchall(self) -> list[tuple]:
+        rows = self._rows[self._position:]
+        self._position = len(self._rows)
+        return rows
+
+
+class AsyncQueryBatch:
+    '''
+    QueryBatch для асинхронных репозиториев: независимые запросы
+    отправляются одним пайплайном асинхронного соединения psycopg запроса:
+
+        async with repository.abatch():
+            chart_data = await repository.aget_count_user_tasks_in_categories(user_id)
+            tasks = await repository.aget_ordered_user_tasks_json(user_id)
+        chart_data.result, tasks.result
+
+    Внутри пакета методы репозиториев с AsyncRepositoryMixin сразу
+    возвращают PendingResult, а запросы отправляются при выходе из пакета.
+    Если запросы выполняются в соединении Django
+    (AsyncScopedConnection.uses_django_connection), пакет отправляется
+    синхронным QueryBatch в потоке sync_to_async. Пакеты не вкладываются.
+    '''
+
+    _active: ContextVar[Optional['AsyncQueryBatch']] = ContextVar('active_async_query_batch', default=None)
+
+    def __init__(self, connection: Any) -> None:
+        # core.container.AsyncScopedConnection
+        self._connection = connection
+        self._queries: list[tuple[DeferredCursor, str, Any, PendingResult]] = []
+
+    @classmethod
+    def get_active(cls, connection: Any) -> Optional['AsyncQueryBatch']:
+        batch = cls._active.get()
+        if batch is not None and batch._connection is connection:
+            return batch
+        return None
+
+    def defer(self, cursor: DeferredCursor, sql: str, params, fetch: Callable[[Any], Any]) -> PendingResult:
+        pending = PendingResult(None, sql, fetch)
+        self._queries.append((cursor, sql, params, pending))
+        return pending
+
+    async def __aenter__(self) -> 'AsyncQueryBatch':
+        if AsyncQueryBatch._active.get() is not None:
+            raise RuntimeError('AsyncQueryBatch не вкладываются')
+        self._token = AsyncQueryBatch._active.set(self)
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        AsyncQueryBatch._active.reset(self._token)
+        if exc_type is not None or not self._queries:
+            return
+        if await self._connection.uses_django_connection():
+            await sync_to_async(self._execute_in_django_connection)()
+        else:
+            await self._execute_in_pipeline()
+
+    async def _execute_in_pipeline(self) -> None:
+        connection = await self._connection.get()
+        async_cursors = []
+        try:
+            started_at = time.perf_counter()
+            # внутри пайплайна execute только ставит запрос в очередь,
+            # выход из него отправляет Sync и ждет ответы на все запросы
+            async with connection.pipeline():
+                for cursor, sql, params, _ in self._queries:
+                    async_cursor = connection.cursor()
+                    async_cursors.append(async_cursor)
+                    if cursor.json_as_text:
+                        async_cursor.adapters.register_loader('json', TextLoader)
+                    await async_cursor.execute(sql, params)
+            record_query(
+                _get_pipeline_sql([sql for _, sql, _, _ in self._queries]),
+                time.perf_counter() - started_at,
+                count=len(self._queries),
+            )
+            for async_cursor, (_, _, _, pending) in zip(async_cursors, self._queries):
+                pending._set_result(pending._fetch(FetchedRows(await async_cursor.fetchall())))
+        finally:
+            for async_cursor in async_cursors:
+                await async_cursor.close()
+
+    def _execute_in_django_connection(self) -> None:
+        connection = connections[self._connection.alias]
+        with ExitStack() as django_cursors:
+            with QueryBatch(connection) as batch:
+                results = []
+                for cursor, sql, params, pending in self._queries:
+                    django_cursor = django_cursors.enter_context(connection.cursor())
+                    if cursor.json_as_text:
+                        django_cursor.cursor.adapters.register_loader('json', TextLoader)
+                    django_cursor.execute(sql, params)
+                    results.append(batch.defer(django_cursor, sql, pending._fetch))
+            for result, (_, _, _, pending) in zip(results, self._queries):
+                pending._set_result(result.result)
+
+
+class AsyncRepositoryMixin:
+    '''
+    Примесь асинхронных репозиториев чтения: _aexecute выполняет запрос
+    на асинхронном соединении psycopg запроса
+    (core.container.AsyncScopedConnection) и возвращает результат функции
+    чтения, как _execute у QueryBatchRepositoryMixin. SQL запросов
+    репозиторий берет у синхронного репозитория через общие методы
+    _get_*_query, сами асинхронные методы объявляются явно (aget_*).
+    Внутри AsyncQueryBatch (abatch) запрос откладывается до отправки пакета.
+    Внутри транзакции Django и под WSGI с пулом соединений запрос
+    выполняется в соединении Django через sync_to_async (см.
+    AsyncScopedConnection.uses_django_connection).
+    Ожидает self._connection.
+    '''
+
+    _json_passthrough: bool = False
+
+    def abatch(self) -> AsyncQueryBatch:
+        return AsyncQueryBatch(self._connection)
+
+    def _get_json_cursor(self) -> DeferredCursor:
+        return DeferredCursor(json_as_text=self._json_passthrough)
+
+    async def _aexecute(self, cursor: DeferredCursor, sql: str, params, fetch: Callable[[Any], Any]) -> Any:
+        batch = AsyncQueryBatch.get_active(self._connection)
+        if batch is not None:
+            return batch.defer(cursor, sql, params, fetch)
+        if await self._connection.uses_django_connection():
+            return await sync_to_async(self._execute_in_django_connection)(cursor, sql, params, fetch)
+        connection = await self._connection.get()
+        async with connection.cursor() as async_cursor:
+            if cursor.json_as_text:
+                async_cursor.adapters.register_loader('json', TextLoader)
+            started_at = time.perf_counter()
+            await async_cursor.execute(sql, params)
+            rows = await async_cursor.fetchall()
+            record_query(sql, time.perf_counter() - started_at)
+        return fetch(FetchedRows(rows))
+
+    def _execute_in_django_connection(self, cursor: DeferredCursor, sql: str, params, fetch: Callable[[Any], Any]) -> Any:
+        with connections[self._connection.alias].cursor() as django_cursor:
+            if cursor.json_as_text:
+                django_cursor.cursor.adapters.register_loader('json', TextLoader)
+            django_cursor.execute(sql, params)
+            return fetch(django_cursor)
@@ -1,10 +1,14 @@
+import json
 from typing import Union, Any
 
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
+from django.core.serializers.json import DjangoJSONEncoder
 from django.template.response import TemplateResponse
 from django.forms import ModelChoiceField, FileField, ModelForm
 from django.db.models.fields.files import FieldFile
 
+from .db import RawJson
+
 
 class FormJsonResponse(TemplateResponse):
     '''
@@ -63,3 +67,23 @@ class FormJsonResponse(TemplateResponse):
     def _get_form_null_fields(self, form: ModelForm) -> dict[str, None]:
         return {field_name: field_value for field_name, field_value in form.initial.items() if field_value is None}
 
+
+class RawJsonResponse(HttpResponse):
+    '''
+    JSON ответ, в тело которого значения RawJson вставляются как есть,
+    без разбора в объекты Python и повторной сериализации.
+    Остальные значения сериализуются так же, как в JsonResponse.
+    '''
+    def __init__(self, data: dict[str, Any], encoder=DjangoJSONEncoder, status=None, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=self._build_content(data, encoder), status=status, **kwargs)
+
+    def _build_content(self, data: dict[str, Any], encoder) -> str:
+        items = []
+        for key, value in data.items():
+            if isinstance(value, RawJson):
+                serialized_value = value
+            else:
+                serialized_value = json.dumps(value, cls=encoder)
+            items.append(f'{json.dumps(key)}: {serialized_value}')
+        return '{' + ', '.join(items) + '}'
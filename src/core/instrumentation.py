@@ -0,0 +1,161 @@
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+
+class RequestQueries:
+    '''
+    Число, суммарное время и самый долгий SQL-запрос одного HTTP-запроса.
+    Запросы записываются, пока объект активен (with), в том числе из
+    sync_to_async и async_to_sync: контекст переходит в их потоки.
+    Запросы фоновых задач (пересчет StaleWhileRevalidateCache) не входят.
+    '''
+
+    _active: ContextVar[Optional['RequestQueries']] = ContextVar('active_request_queries', default=None)
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.duration = 0.0
+        self.slowest_sql: Optional[str] = None
+        self.slowest_duration = 0.0
+
+    @classmethod
+    def get_active(cls) -> Optional['RequestQueries']:
+        return cls._active.get()
+
+    def record(self, sql: str, duration: float, count: int = 1) -> None:
+        self.count += count
+        self.duration += duration
+        if duration >= self.slowest_duration:
+            self.slowest_sql = sql
+            self.slowest_duration = duration
+
+    def __enter__(self) -> 'RequestQueries':
+        self._token = RequestQueries._active.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        RequestQueries._active.reset(self._token)
+
+
+def record_query(sql: str, duration: float, count: int = 1) -> None:
+    '''
+    Записывает запрос, выполненный мимо курсоров Django (асинхронные
+    соединения psycopg), в замеры текущего HTTP-запроса. Ожидание,
+    которое не добавляет запросов (синхронизация пайплайна QueryBatch,
+    чьи запросы уже записаны при отправке), записывается с count=0.
+    '''
+    queries = RequestQueries.get_active()
+    if queries is not None:
+        queries.record(sql, duration, count)
+
+
+def _record_execute(execute, sql, params, many, context):
+    queries = RequestQueries.get_active()
+    if queries is None:
+        return execute(sql, params, many, context)
+    started_at = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        queries.record(sql, time.perf_counter() - started_at)
+
+
+def _install_execute_wrapper(sender, connection, **kwargs) -> None:
+    # первым в списке, чтобы connection.execute_wrapper() снимал свою
+    # обертку с конца и не задевал эту
+    if _record_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _record_execute)
+
+
+def install_query_recorder() -> None:
+    '''
+    Ставит обертку выполнения запросов на соединения Django, уже открытые
+    и открываемые позже (в каждом потоке соединения свои)
+    '''
+    connection_created.connect(_install_execute_wrapper, dispatch_uid='core.instrumentation')
+    for connection in connections.all(initialized_only=True):
+        _install_execute_wrapper(None, connection)
+
+
+class EndpointQueryMetrics:
+    '''
+    Сводка замеров SQL по эндпоинтам (метод и шаблон URL). Хранится
+    в памяти процесса, чтобы не добавлять обращений к кешу в каждый
+    запрос, поэтому видна только в своем процессе.
+    '''
+
+    _endpoints: dict[str, dict[str, float]] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def add(cls, endpoint: str, queries: RequestQueries, is_slow: bool) -> None:
+        db_ms = queries.duration * 1000
+        with cls._lock:
+            metrics = cls._endpoints.setdefault(endpoint, {
+                'requests': 0,
+                'queries': 0,
+                'db_ms': 0.0,
+                'max_queries': 0,
+                'max_db_ms': 0.0,
+                'slow_requests': 0,
+            })
+            metrics['requests'] += 1
+            metrics['queries'] += queries.count
+            metrics['db_ms'] += db_ms
+            metrics['max_queries'] = max(metrics['max_queries'], queries.count)
+            metrics['max_db_ms'] = max(metrics['max_db_ms'], db_ms)
+            metrics['slow_requests'] += is_slow
+
+    @classmethod
+    def snapshot_all(cls) -> dict[str, dict[str, Any]]:
+        with cls._lock:
+            endpoints = {endpoint: dict(metrics) for endpoint, metrics in cls._endpoints.items()}
+        for metrics in endpoints.values():
+            metrics['avg_queries'] = round(metrics['queries'] / metrics['requests'], 2)
+            metrics['avg_db_ms'] = round(metrics['db_ms'] / metrics['requests'], 3)
+            metrics['db_ms'] = round(metrics['db_ms'], 3)
+            metrics['max_db_ms'] = round(metrics['max_db_ms'], 3)
+        return endpoints
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls._endpoints.clear()
+
+
+def get_endpoint(request) -> str:
+    resolver_match = getattr(request, 'resolver_match', None)
+    route = f'/{resolver_match.route}' if resolver_match is not None else '<unresolved>'
+    return f'{request.method} {route}'
+
+
+def get_server_timing(queries: RequestQueries, duration: float) -> str:
+    return (
+        f'db;dur={queries.duration * 1000:.2f};desc="{queries.count} queries", '
+        f'db-slowest;dur={queries.slowest_duration * 1000:.2f}, '
+        f'total;dur={duration * 1000:.2f}'
+    )
+
+
+def log_slow_request(request, response, endpoint: str, queries: RequestQueries, duration: float) -> None:
+    logger.warning(json.dumps({
+        'event': 'slow_request',
+        'method': request.method,
+        'path': request.path,
+        'endpoint': endpoint,
+        'status': response.status_code,
+        'duration_ms': round(duration * 1000, 2),
+        'db_ms': round(queries.duration * 1000, 2),
+        'queries': queries.count,
+        'slowest_query_ms': round(queries.slowest_duration * 1000, 2),
+        'slowest_query': (queries.slowest_sql or '')[:2000],
+    }, ensure_ascii=False))
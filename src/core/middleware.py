@@ -0,0 +1,124 @@
+import time
+from zoneinfo import ZoneInfo
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+
+from .container import RequestContainer
+from .instrumentation import (
+    RequestQueries, EndpointQueryMetrics, install_query_recorder, get_endpoint, get_server_timing, log_slow_request,
+)
+
+
+class HybridMiddlewareMixin:
+    '''
+    Middleware, которое работает и в синхронной, и в асинхронной цепочке:
+    под ASGI с асинхронными представлениями запрос не переключается
+    в поток ради этого middleware. Наследник реализует __call__ и __acall__.
+    '''
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+
+class UserTimezoneMiddleware(HybridMiddlewareMixin):
+    '''
+    Включает часовой пояс пользователя на время запроса. После этого
+    timezone.localdate() возвращает сегодняшний день по календарю
+    пользователя, и сервисы передают его в запросы к БД вместо CURRENT_DATE.
+    Пояс читается из строки пользователя, которую уже загрузил
+    AuthenticationMiddleware, поэтому отдельного запроса на него нет.
+    Ставится после AuthenticationMiddleware.
+    '''
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self._activate(request)
+        try:
+            return self.get_response(request)
+        finally:
+            timezone.deactivate()
+
+    async def __acall__(self, request):
+        # пользователь загружается из сессии синхронными запросами к БД
+        await sync_to_async(self._activate)(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            timezone.deactivate()
+
+    def _activate(self, request) -> None:
+        if request.user.is_authenticated:
+            timezone.activate(ZoneInfo(request.user.timezone))
+
+
+class RequestContainerMiddleware(HybridMiddlewareMixin):
+    '''
+    Создает контейнер зависимостей запроса (request.container), из которого
+    представления получают use case'ы и репозитории, и закрывает его после
+    ответа вместе с открытыми курсорами и соединениями.
+    '''
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with RequestContainer(user=getattr(request, 'user', None)) as container:
+            request.container = container
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        async with RequestContainer(user=getattr(request, 'user', None)) as container:
+            request.container = container
+            return await self.get_response(request)
+
+
+class QueryInstrumentationMiddleware(HybridMiddlewareMixin):
+    '''
+    Считает SQL-запросы каждого запроса: число, суммарное время и самый
+    долгий запрос. Отдает их в заголовке Server-Timing, пишет в лог
+    core.instrumentation запросы дольше SLOW_REQUEST_THRESHOLD_MS
+    и копит сводку по эндпоинтам (EndpointQueryMetrics).
+    При SQL_INSTRUMENTATION = False не подключается к цепочке совсем.
+    Ставится первым, чтобы учитывать запросы остальных middleware.
+    '''
+
+    def __init__(self, get_response):
+        if not settings.SQL_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        install_query_recorder()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started_at = time.perf_counter()
+        with RequestQueries() as queries:
+            response = self.get_response(request)
+        self._report(request, response, queries, time.perf_counter() - started_at)
+        return response
+
+    async def __acall__(self, request):
+        started_at = time.perf_counter()
+        with RequestQueries() as queries:
+            response = await self.get_response(request)
+        self._report(request, response, queries, time.perf_counter() - started_at)
+        return response
+
+    def _report(self, request, response, queries: RequestQueries, duration: float) -> None:
+        endpoint = get_endpoint(request)
+        is_slow = duration * 1000 >= settings.SLOW_REQUEST_THRESHOLD_MS
+        EndpointQueryMetrics.add(endpoint, queries, is_slow)
+        server_timing = get_server_timing(queries, duration)
+        if response.has_header('Server-Timing'):
+            server_timing = f"{response['Server-Timing']}, {server_timing}"
+        response['Server-Timing'] = server_timing
+        if is_slow:
+            log_slow_request(request, response, endpoint, queries, duration)
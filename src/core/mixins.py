@@ -1,10 +1,73 @@
+from typing import Optional
+
+from asgiref.sync import sync_to_async
 from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.views.decorators.http import condition
+
+from .cache import UserVersion
 
 
 class ApiLoginRequiredMixin:
 
     def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self._async_dispatch(request, *args, **kwargs)
         if not request.user.is_authenticated:
             return JsonResponse({}, status=401)
         return super().dispatch(request, *args, **kwargs)
 
+    async def _async_dispatch(self, request, *args, **kwargs):
+        # пользователь загружается из сессии синхронными запросами к БД
+        if not await sync_to_async(lambda: request.user.is_authenticated)():
+            return JsonResponse({}, status=401)
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class UserVersionETagMixin:
+    '''
+    Слабый ETag для GET ответов из версий данных пользователя (etag_versions).
+    Если If-None-Match совпадает с ним, ответ 304 Not Modified отдается
+    до вызова обработчика, то есть без запросов к репозиториям.
+    Версии читаются до данных, поэтому запись между ними приведет
+    только к лишнему запросу клиента, а не к устаревшему ответу.
+    Ставится после ApiLoginRequiredMixin.
+    '''
+
+    etag_versions: tuple[UserVersion, ...] = ()
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self._async_dispatch(request, *args, **kwargs)
+        return condition(etag_func=self._get_etag)(super().dispatch)(request, *args, **kwargs)
+
+    async def _async_dispatch(self, request, *args, **kwargs):
+        # то же, что condition, который в Django 4.2 не поддерживает
+        # асинхронные представления; версии читаются из кеша без запросов к БД
+        etag = self._get_etag(request, *args, **kwargs)
+        if etag is not None:
+            etag = quote_etag(etag)
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            return response
+        response = await super().dispatch(request, *args, **kwargs)
+        if etag is not None:
+            response.headers.setdefault('ETag', etag)
+        return response
+
+    def get_etag_extra(self) -> Optional[str]:
+        '''
+        Дополнительная часть ETag для ответов, которые зависят не только
+        от данных пользователя, например от текущей даты
+        '''
+        return None
+
+    def _get_etag(self, request, *args, **kwargs) -> Optional[str]:
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        parts = [str(version.get(request.user.id)) for version in self.etag_versions]
+        extra = self.get_etag_extra()
+        if extra is not None:
+            parts.append(extra)
+        return 'W/"' + '-'.join(parts) + '"'
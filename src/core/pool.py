@@ -0,0 +1,202 @@
+import asyncio
+import atexit
+import threading
+import weakref
+from typing import Any, Optional
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from psycopg_pool import ConnectionPool, AsyncConnectionPool
+
+from .db import get_async_connection_kwargs
+
+
+# значения по умолчанию для OPTIONS['pool'] = True, остальные аргументы
+# ConnectionPool (max_lifetime, num_workers...) передаются как есть
+POOL_DEFAULTS: dict[str, Any] = {
+    'min_size': 2,
+    'max_size': 10,
+    'max_idle': 10 * 60.0,
+    'timeout': 30.0,
+    'check': True,
+}
+
+_pools: dict[str, tuple[tuple, ConnectionPool]] = {}
+_pools_lock = threading.Lock()
+# пулы асинхронных соединений привязаны к циклу событий, в котором открыты
+_async_pools: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, AsyncConnectionPool]]' = (
+    weakref.WeakKeyDictionary()
+)
+_async_pools_enabled = False
+
+
+def get_pool_options(settings_dict: dict[str, Any]) -> Optional[dict[str, Any]]:
+    '''
+    Параметры пула из DATABASES[alias]['OPTIONS']['pool'] (True или словарь
+    аргументов ConnectionPool) или None, если пул для базы выключен
+    '''
+    pool = settings_dict['OPTIONS'].get('pool')
+    if not pool:
+        return None
+    if settings_dict['CONN_MAX_AGE'] != 0:
+        raise ImproperlyConfigured(
+            'Пул соединений требует CONN_MAX_AGE = 0: соединение возвращается в пул в конце запроса'
+        )
+    return {**POOL_DEFAULTS, **(pool if isinstance(pool, dict) else {})}
+
+
+def _create_pool(pool_class: type, name: str, options: dict[str, Any], kwargs: dict[str, Any]):
+    options = dict(options)
+    check = pool_class.check_connection if options.pop('check') else None
+    return pool_class(kwargs=kwargs, name=name, check=check, open=False, **options)
+
+
+def _get_params_key(params: dict[str, Any]) -> tuple:
+    return tuple(params.get(name) for name in ('host', 'port', 'dbname', 'user'))
+
+
+def get_pool(alias: str, settings_dict: dict[str, Any], params: dict[str, Any]) -> Optional[ConnectionPool]:
+    '''
+    Пул соединений базы alias для соединений Django, открывается при первом
+    соединении в процессе (после fork воркера WSGI-сервера). Если параметры
+    соединения изменились (тестовая база), старый пул закрывается.
+    '''
+    options = get_pool_options(settings_dict)
+    if options is None:
+        return None
+    key = _get_params_key(params)
+    with _pools_lock:
+        old_key, pool = _pools.get(alias, (None, None))
+        if old_key != key:
+            if pool is not None:
+                pool.close()
+            pool = _create_pool(ConnectionPool, alias, options, params)
+            pool.open()
+            _pools[alias] = (key, pool)
+    return pool
+
+
+def close_pool(alias: str) -> None:
+    with _pools_lock:
+        _, pool = _pools.pop(alias, (None, None))
+    if pool is not None:
+        pool.close()
+
+
+@atexit.register
+def close_pools() -> None:
+    for alias in list(_pools):
+        close_pool(alias)
+
+
+def enable_async_pools(enabled: bool = True) -> None:
+    '''
+    Включает пулы асинхронных соединений. Их включает точка входа ASGI
+    (ConnectionPoolLifespan): там цикл событий один на процесс. Под WSGI
+    цикл событий создается на каждый запрос асинхронного представления,
+    поэтому его запросы выполняются в соединении Django из пула get_pool.
+    '''
+    global _async_pools_enabled
+    _async_pools_enabled = enabled
+
+
+def async_pools_enabled() -> bool:
+    return _async_pools_enabled
+
+
+async def get_async_pool(alias: str) -> Optional[AsyncConnectionPool]:
+    '''
+    Пул асинхронных соединений базы alias для текущего цикла событий или
+    None, если пулы асинхронных соединений выключены или пул для базы
+    выключен в настройках
+    '''
+    options = get_pool_options(connections[alias].settings_dict)
+    if not _async_pools_enabled or options is None:
+        return None
+    pools = _async_pools.setdefault(asyncio.get_running_loop(), {})
+    if alias not in pools:
+        pool = _create_pool(AsyncConnectionPool, f'{alias}-async', options, get_async_connection_kwargs(alias))
+        await pool.open()
+        if alias in pools:
+            # пул открыл параллельный запрос
+            await pool.close()
+        else:
+            pools[alias] = pool
+    return pools[alias]
+
+
+async def open_async_pools() -> None:
+    for alias in settings.DATABASES:
+        await get_async_pool(alias)
+
+
+async def close_async_pools() -> None:
+    pools = _async_pools.pop(asyncio.get_running_loop(), {})
+    for pool in pools.values():
+        await pool.close()
+
+
+class PoolMetrics:
+    '''
+    Состояние пулов соединений процесса и время ожидания соединения из
+    пула. Счетчики psycopg_pool накапливаются с открытия пула и видны
+    только в своем процессе.
+    '''
+
+    counters: tuple[str, ...] = (
+        'pool_min',
+        'pool_max',
+        'pool_size',
+        'pool_available',
+        'requests_waiting',
+        'requests_num',
+        'requests_queued',
+        'requests_wait_ms',
+        'requests_errors',
+        'connections_num',
+        'connections_errors',
+        'connections_lost',
+    )
+
+    @classmethod
+    def snapshot(cls, pool) -> dict[str, Any]:
+        stats = pool.get_stats()
+        snapshot = {counter: stats.get(counter, 0) for counter in cls.counters}
+        snapshot['requests_wait_ms_avg'] = round(
+            snapshot['requests_wait_ms'] / snapshot['requests_num'], 3
+        ) if snapshot['requests_num'] else 0
+        return snapshot
+
+    @classmethod
+    def snapshot_all(cls) -> dict[str, dict[str, Any]]:
+        pools = [pool for _, pool in list(_pools.values())]
+        for loop_pools in list(_async_pools.values()):
+            pools.extend(loop_pools.values())
+        return {pool.name: cls.snapshot(pool) for pool in pools}
+
+
+class ConnectionPoolLifespan:
+    '''
+    Обертка ASGI-приложения, которая включает пулы асинхронных соединений,
+    открывает их при старте сервера (lifespan.startup) и закрывает при
+    остановке. Если сервер не поддерживает lifespan, пулы открываются при
+    первом запросе к базе.
+    '''
+
+    def __init__(self, application) -> None:
+        self._application = application
+        enable_async_pools()
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] != 'lifespan':
+            return await self._application(scope, receive, send)
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await open_async_pools()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await close_async_pools()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
@@ -0,0 +1,65 @@
+from typing import Any, Optional
+from uuid import UUID
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, router
+
+
+class RecentWrites:
+    '''
+    Отметки о недавней записи данных пользователя. Хранятся в кеше
+    REPLICA_STICKY_SECONDS секунд, поэтому при общем бэкенде видны из всех
+    процессов приложения.
+    '''
+
+    def _get_key(self, user_id: UUID) -> str:
+        return f'recent-write:{user_id}'
+
+    def record(self, user_id: UUID) -> None:
+        cache.set(self._get_key(user_id), True, timeout=settings.REPLICA_STICKY_SECONDS)
+
+    def contains(self, user_id: UUID) -> bool:
+        return cache.get(self._get_key(user_id)) is not None
+
+
+recent_writes = RecentWrites()
+
+
+class ReplicaRouter:
+    '''
+    Роутер баз для реплики чтения settings.DATABASE_REPLICA. На реплику
+    уходят только запросы с подсказкой replica_read: репозитории статистики,
+    календаря и списков, собранные на соединениях чтения контейнера запроса
+    (container.read_connection). Остальные запросы, в том числе все запросы
+    ORM, идут на основную базу. Чтение остается на основной базе внутри ее
+    транзакции и REPLICA_STICKY_SECONDS секунд после записи пользователя,
+    пока реплика догоняет основную базу.
+    '''
+
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        if not hints.get('replica_read'):
+            return None
+        primary = hints.get('primary', DEFAULT_DB_ALIAS)
+        replica = settings.DATABASE_REPLICA
+        if replica is None or connections[primary].in_atomic_block:
+            return primary
+        user = hints.get('user')
+        if user is not None and user.is_authenticated and recent_writes.contains(user.id):
+            return primary
+        return replica
+
+    def allow_migrate(self, db: str, app_label: str, model_name: Optional[str] = None, **hints) -> Optional[bool]:
+        # схема на реплику приходит репликацией с основной базы
+        if db == settings.DATABASE_REPLICA:
+            return False
+        return None
+
+
+def get_read_alias(primary: str, user: Any = None) -> str:
+    '''
+    База для запросов чтения, которые можно выполнить на реплике базы
+    primary, для пользователя user. Проверяет транзакцию соединения
+    Django, поэтому вызывается в синхронном коде.
+    '''
+    return router.db_for_read(None, replica_read=True, primary=primary, user=user)
@@ -0,0 +1,57 @@
+import json
+from typing import Callable
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryPlanAssertionsMixin:
+    '''
+    Примесь для TestCase, которая прогоняет через EXPLAIN все запросы,
+    выполненные внутри вызова, и падает, если план для одной из таблиц
+    приложения откатывается к последовательному сканированию.
+    Seq scan отключается для планировщика, поэтому он появится в плане
+    только если для запроса нет подходящего индекса вообще. Полный проход
+    по чужому индексу с фильтрацией строк (Filter без Index Cond)
+    считается тем же самым.
+    '''
+
+    checked_tables = ('task_task', 'task_category', 'history_history', 'history_daily_rollup')
+
+    def assertNoSequentialScans(self, call: Callable) -> None:
+        with CaptureQueriesContext(connection) as context:
+            call()
+        self.assertTrue(context.captured_queries, 'Вызов не выполнил ни одного запроса')
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            for query in context.captured_queries:
+                cursor.execute('EXPLAIN (FORMAT JSON) ' + query['sql'])
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                scanned_tables = self._get_sequentially_scanned_tables(plan[0]['Plan'])
+                self.assertEqual(
+                    scanned_tables, [],
+                    f'Последовательное сканирование в запросе:\n{query["sql"]}'
+                )
+            cursor.execute('RESET enable_seqscan')
+
+    def _get_sequentially_scanned_tables(self, plan: dict) -> list[str]:
+        scanned_tables = []
+        if plan.get('Relation Name') in self.checked_tables and self._is_full_scan(plan):
+            scanned_tables.append(plan['Relation Name'])
+        for child_plan in plan.get('Plans', []):
+            scanned_tables.extend(self._get_sequentially_scanned_tables(child_plan))
+        return scanned_tables
+
+    def _is_full_scan(self, plan: dict) -> bool:
+        if plan['Node Type'] == 'Seq Scan':
+            return True
+        if plan['Node Type'] in ('Index Scan', 'Index Only Scan'):
+            return 'Filter' in plan and 'Index Cond' not in plan
+        return False
+
+    def analyze_tables(self) -> None:
+        with connection.cursor() as cursor:
+            for table in self.checked_tables:
+                cursor.execute(f'ANALYZE {table}')
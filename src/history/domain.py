@@ -3,6 +3,8 @@ from datetime import timedelta, date
 from typing import NoReturn, Optional, Union
 from uuid import UUID
 
+from django.utils import timezone
+
 from task.domain import TaskEntityProtocol
 from .constants.choices import HistoryTaskStatusChoices
 
@@ -44,6 +46,8 @@ class HistoryEntity:
 
     @classmethod
     def from_task(cls, task: TaskEntityProtocol, execution_time: timedelta, is_successful: bool) -> "HistoryEntity":
+        # день выполнения - сегодня по часовому поясу пользователя
+        execution_date = timezone.localdate()
         return cls(
             id=None,
             name=task.name,
@@ -51,7 +55,8 @@ class HistoryEntity:
             user_id=task.user_id,
             planned_time=task.planned_time,
             execution_time=execution_time,
-            status=cls._get_status(is_successful, task.deadline, date.today()),
+            execution_date=execution_date,
+            status=cls._get_status(is_successful, task.deadline, execution_date),
             planned_deadline=task.deadline
         )
 
@@ -1,10 +1,15 @@
 from abc import ABC, abstractmethod
+from datetime import date, timedelta
 from decimal import Decimal
-from typing import Type, Union, NoReturn
+from typing import Optional, Type, Union, NoReturn
 from uuid import UUID
 
+from django.core.exceptions import ValidationError
 from django.utils.connection import ConnectionProxy
 
+from core.cache import history_version, tasks_version
+from core.db import QueryBatchRepositoryMixin, QueryBatch, AsyncRepositoryMixin, RepositoryQuery
+
 from .models import History, SharedHistory
 from .domain import SharedHistoryEntity, HistoryEntity
 from .constants.choices import HistoryTaskStatusChoices
@@ -12,6 +17,10 @@ from .constants.choices import HistoryTaskStatusChoices
 
 class HistoryRepositoryInterface(ABC):
 
+    @abstractmethod
+    def batch(self) -> QueryBatch:
+        pass
+
     @abstractmethod
     def get_history_by_id(
             self, 
@@ -89,17 +98,39 @@ class HistoryRepositoryInterface(ABC):
         ) -> list:
         pass
 
+    @abstractmethod
+    def get_history_page(
+            self,
+            user_id: UUID,
+            from_date: str,
+            to_date: str,
+            after: Optional[tuple[date, int]],
+            limit: int,
+        ) -> list[dict[str, Union[str, int, date]]]:
+        pass
+
+    @abstractmethod
+    def get_history_statistics(
+            self,
+            user_id: UUID,
+            from_date: str,
+            to_date: str
+        ) -> dict:
+        pass
+
     @abstractmethod
     def get_count_user_tasks_in_categories_for_today(
             self, 
-            user_id: UUID
+            user_id: UUID,
+            today: date,
         ) -> list[dict[str, Union[str, int]]]:
         pass
 
     @abstractmethod
     def get_user_tasks_for_today_json(
             self, 
-            user_id: UUID
+            user_id: UUID,
+            today: date,
         ) -> list[dict[str, Union[str, int]]]:
         pass
 
@@ -110,6 +141,48 @@ class HistoryRepositoryInterface(ABC):
         ) -> Union[None, NoReturn]:
         pass
 
+    @abstractmethod
+    def move_user_tasks_to_history(
+            self,
+            user_id: UUID,
+            task_ids: list[int],
+            execution_times: list[timedelta],
+            successful: list[bool],
+            execution_date: date,
+        ) -> list[dict]:
+        pass
+
+    @abstractmethod
+    def move_user_task_to_history(
+            self,
+            user_id: UUID,
+            task_id: int,
+            execution_time: Union[timedelta, str],
+            successful: bool,
+            execution_date: date,
+        ) -> Union[dict, NoReturn]:
+        pass
+
+    @abstractmethod
+    def rebuild_daily_rollup(self) -> None:
+        pass
+
+    @abstractmethod
+    def get_daily_rollup_mismatches_count(self) -> int:
+        pass
+
+
+class AsyncHistoryReadRepositoryInterface(ABC):
+
+    @abstractmethod
+    async def aget_history_statistics(
+            self,
+            user_id: UUID,
+            from_date: str,
+            to_date: str
+        ) -> dict:
+        pass
+
 
 class SharedHistoryRepositoryInterface(ABC):
 
@@ -149,7 +222,142 @@ class SharedHistoryRepositoryInterface(ABC):
         pass
 
 
-class HistoryRepository(HistoryRepositoryInterface):
+class HistoryStatisticsQueryMixin:
+    '''
+    Запрос статистики истории, общий для HistoryRepository
+    и AsyncHistoryRepository. Ожидает self._connection.
+    '''
+
+    def _get_history_statistics_query(
+            self,
+            user_id: UUID,
+            from_date: str,
+            to_date: str
+        ) -> RepositoryQuery:
+        '''
+        Все блоки статистики за период одним запросом.
+        Показатели считаются по дневным агрегатам history_daily_rollup,
+        а не по сырым строкам истории: общие показатели, показатели по
+        категориям и по дням недели - одной группировкой через GROUPING SETS.
+        Список задач сюда не входит, он читается постранично
+        (get_history_page). Ключи ответа совпадают с названиями отдельных
+        методов репозитория, а значения - с тем, что эти методы возвращают.
+        '''
+        return (
+            self._connection.cursor(),
+            '''
+            WITH period_rollup AS (
+                SELECT
+                    hdr.category_id,
+                    extract(isodow FROM hdr.execution_date)::int AS day_index,
+                    hdr.task_count,
+                    CASE WHEN hdr.status <> %s THEN hdr.task_count ELSE 0 END AS successful_tasks,
+                    hdr.exact_plan_count,
+                    hdr.accuracy_sum
+                FROM history_daily_rollup hdr
+                WHERE hdr.user_id = %s AND
+                hdr.execution_date BETWEEN %s AND %s
+            ),
+            grouped_statistics AS (
+                SELECT
+                    GROUPING(pr.category_id) AS category_grouping,
+                    GROUPING(pr.day_index) AS weekday_grouping,
+                    pr.category_id,
+                    pr.day_index,
+                    coalesce(sum(pr.task_count), 0) AS task_count,
+                    coalesce(sum(pr.successful_tasks), 0) AS successful_tasks,
+                    coalesce(sum(pr.exact_plan_count), 0) AS successful_planning,
+                    round(sum(pr.accuracy_sum) / nullif(sum(pr.task_count), 0), 2) AS accuracy
+                FROM period_rollup pr
+                GROUP BY GROUPING SETS ((), (pr.category_id), (pr.day_index))
+            ),
+            common_statistics AS (
+                SELECT gs.* 
+                FROM grouped_statistics gs
+                WHERE gs.category_grouping = 1 AND gs.weekday_grouping = 1
+            ),
+            category_statistics AS (
+                SELECT gs.*, tc.name, tc.color
+                FROM grouped_statistics gs
+                JOIN task_category tc
+                ON tc.id = gs.category_id
+                WHERE gs.category_grouping = 0
+            ),
+            weekday_statistics AS (
+                SELECT 
+                    weekdays.day_index,
+                    weekdays.day_name,
+                    coalesce(gs.task_count, 0) AS task_count
+                FROM (VALUES
+                    (1, 'Понедельник'),
+                    (2, 'Вторник'),
+                    (3, 'Среда'),
+                    (4, 'Четверг'),
+                    (5, 'Пятница'),
+                    (6, 'Суббота'),
+                    (7, 'Воскресенье')
+                ) weekdays(day_index, day_name)
+                LEFT JOIN grouped_statistics gs
+                ON gs.day_index = weekdays.day_index AND gs.weekday_grouping = 0
+            )
+            SELECT json_build_object(
+                'count_tasks_in_categories', (
+                    SELECT json_build_object(
+                        'labels', array_agg(cs.name ORDER BY cs.task_count),
+                        'colors', array_agg(cs.color ORDER BY cs.task_count),
+                        'data', array_agg(cs.task_count ORDER BY cs.task_count)
+                    )
+                    FROM category_statistics cs
+                ),
+                'common_accuracy', (SELECT cs.accuracy FROM common_statistics cs),
+                'accuracy_by_categories', (
+                    SELECT json_build_object(
+                        'labels', array_agg(cs.name ORDER BY cs.accuracy),
+                        'colors', array_agg(cs.color ORDER BY cs.accuracy),
+                        'data', array_agg(cs.accuracy ORDER BY cs.accuracy)
+                    )
+                    FROM category_statistics cs
+                ),
+                'common_success_rate', (
+                    SELECT json_build_array(cs.successful_tasks, cs.task_count) 
+                    FROM common_statistics cs
+                ),
+                'success_rate_by_categories', (
+                    SELECT json_build_object(
+                        'labels', array_agg(cs.name ORDER BY cs.category_id),
+                        'colors', array_agg(cs.color ORDER BY cs.category_id),
+                        'data', array_agg(cs.successful_tasks ORDER BY cs.category_id)
+                    )
+                    FROM category_statistics cs
+                ),
+                'count_tasks_by_weekdays', (
+                    SELECT json_build_object(
+                        'labels', array_agg(ws.day_name ORDER BY ws.day_index),
+                        'data', array_agg(ws.task_count ORDER BY ws.day_index)
+                    )
+                    FROM weekday_statistics ws
+                ),
+                'common_successful_planning_rate', (
+                    SELECT json_build_array(cs.successful_planning, cs.task_count) 
+                    FROM common_statistics cs
+                ),
+                'count_successful_planned_tasks_by_categories', (
+                    SELECT json_build_object(
+                        'labels', array_agg(cs.name ORDER BY cs.category_id),
+                        'colors', array_agg(cs.color ORDER BY cs.category_id),
+                        'data', array_agg(cs.successful_planning ORDER BY cs.category_id)
+                    )
+                    FROM category_statistics cs
+                    WHERE cs.successful_planning > 0
+                )
+            );
+            ''',
+            [HistoryTaskStatusChoices.FAILED, user_id, from_date, to_date],
+            lambda cursor: cursor.fetchall()[0][0]
+        )
+
+
+class HistoryRepository(HistoryStatisticsQueryMixin, QueryBatchRepositoryMixin, HistoryRepositoryInterface):
 
     def __init__(
             self, 
@@ -166,12 +374,114 @@ class HistoryRepository(HistoryRepositoryInterface):
         history_task = self._history_model.from_domain(history_task_entity)
         history_task.full_clean()
         history_task.save()
+        history_version.bump(history_task.user_id)
+
+    def move_user_tasks_to_history(
+            self,
+            user_id: UUID,
+            task_ids: list[int],
+            execution_times: list[timedelta],
+            successful: list[bool],
+            execution_date: date,
+        ) -> list[dict]:
+        '''
+        Переносит задачи пользователя в историю одним запросом: удаленные
+        строки задач сразу вставляются в history_history, поэтому триггер
+        дневных агрегатов срабатывает один раз на весь пакет.
+        Возвращает результат по каждой задаче в порядке task_ids:
+        {'task_id', 'moved': True, 'status'} для перенесенной задачи и
+        {'task_id', 'moved': False, 'error'} с ошибкой forbidden или not_found.
+        '''
+        cursor = self._connection.cursor()
+        cursor.execute(
+            '''
+            WITH batch AS (
+                SELECT *
+                FROM unnest(%(task_ids)s::int[], %(execution_times)s::interval[], %(successful)s::boolean[])
+                WITH ORDINALITY AS batch(task_id, execution_time, successful, position)
+            ), moved AS (
+                DELETE FROM task_task tt
+                USING batch
+                WHERE tt.id = batch.task_id AND tt.user_id = %(user_id)s
+                RETURNING
+                    tt.id AS task_id, tt.name, tt.category_id, tt.user_id,
+                    tt.planned_time, tt.deadline, batch.execution_time,
+                    -- те же правила, что и в HistoryEntity._get_status
+                    CASE
+                        WHEN NOT batch.successful THEN %(failed)s
+                        WHEN tt.deadline < %(execution_date)s THEN %(out_of_deadline)s
+                        ELSE %(successful_status)s
+                    END AS status
+            ), saved AS (
+                INSERT INTO history_history (
+                    name, category_id, user_id, planned_time, execution_time,
+                    execution_date, status, planned_deadline
+                )
+                SELECT
+                    moved.name, moved.category_id, moved.user_id, moved.planned_time,
+                    moved.execution_time, %(execution_date)s, moved.status, moved.deadline
+                FROM moved
+            )
+            SELECT batch.task_id, moved.status, foreign_task.id IS NOT NULL
+            FROM batch
+            LEFT JOIN moved
+            ON moved.task_id = batch.task_id
+            -- снимок основного запроса еще видит удаленные задачи,
+            -- поэтому чужие ищутся только среди не перенесенных
+            LEFT JOIN task_task foreign_task
+            ON foreign_task.id = batch.task_id AND moved.task_id IS NULL
+            ORDER BY batch.position;
+            ''',
+            {
+                'user_id': user_id,
+                'task_ids': task_ids,
+                'execution_times': execution_times,
+                'successful': successful,
+                'execution_date': execution_date,
+                'failed': HistoryTaskStatusChoices.FAILED,
+                'out_of_deadline': HistoryTaskStatusChoices.OUT_OF_DEADLINE,
+                'successful_status': HistoryTaskStatusChoices.SUCCESSFUL,
+            }
+        )
+        results = []
+        for task_id, status, is_foreign in cursor.fetchall():
+            if status is not None:
+                results.append({'task_id': task_id, 'moved': True, 'status': status})
+            else:
+                results.append({'task_id': task_id, 'moved': False, 'error': 'forbidden' if is_foreign else 'not_found'})
+        if any(result['moved'] for result in results):
+            tasks_version.bump(user_id)
+            history_version.bump(user_id)
+        return results
+
+    def move_user_task_to_history(
+            self,
+            user_id: UUID,
+            task_id: int,
+            execution_time: Union[timedelta, str],
+            successful: bool,
+            execution_date: date,
+        ) -> Union[dict, NoReturn]:
+        '''
+        Перенос одной задачи тем же запросом, что и пакетный. Время выполнения
+        проверяется полем модели, как раньше в full_clean, остальные поля
+        берутся из строки задачи и уже проверены при ее сохранении.
+        '''
+        try:
+            execution_time = self._history_model._meta.get_field('execution_time').clean(execution_time, None)
+        except ValidationError as error:
+            raise ValidationError({'execution_time': error.messages})
+        [result] = self.move_user_tasks_to_history(
+            user_id, [task_id], [execution_time], [successful], execution_date
+        )
+        return result
 
     def get_history_by_id(self, id: int) -> HistoryEntity:
         return self._history_model.objects.get(id=id).to_domain()
 
     def delete_history(self, history_entity: HistoryEntity) -> None:
         self._history_model.from_domain(history_entity).delete()
+        history_version.bump(history_entity.user_id)
 
     def get_count_tasks_in_categories(
             self, 
@@ -286,17 +596,13 @@ class HistoryRepository(HistoryRepositoryInterface):
         cursor = self._connection.cursor()
         cursor.execute(
             '''
-            SELECT count(*)-(
-                    SELECT count(*) FROM history_history hh2 
-                    WHERE hh2.status=%s
-                    AND hh2.user_id = %s 
-                    AND execution_date BETWEEN %s AND %s
-                ) AS successful_tasks,
+            SELECT 
+                count(*) FILTER (WHERE hh.status <> %s) AS successful_tasks,
                 count(*) AS total_tasks
             FROM history_history hh
             WHERE hh.user_id = %s AND execution_date BETWEEN %s AND %s;
             ''',
-            [HistoryTaskStatusChoices.FAILED, user_id, from_date, to_date, user_id, from_date, to_date]
+            [HistoryTaskStatusChoices.FAILED, user_id, from_date, to_date]
         )
         return cursor.fetchall()[0]
 
@@ -317,25 +623,16 @@ class HistoryRepository(HistoryRepositoryInterface):
             FROM (
                 SELECT
                 tc."name", tc.color,
-                count(*)-(
-                    SELECT 
-                        count(*) 
-                    FROM 
-                        history_history hh2 
-                    WHERE 
-                        hh2.status= %s
-                        AND hh2.category_id=hh.category_id 
-                        AND hh2.user_id = %s AND execution_date BETWEEN %s AND %s
-                    ) AS successful_tasks
+                count(*) FILTER (WHERE hh.status <> %s) AS successful_tasks
                 FROM history_history hh 
-                join task_category tc 
+                JOIN task_category tc 
                 ON hh.category_id = tc.id
                 WHERE hh.user_id = %s AND
                 execution_date BETWEEN %s AND %s
                 GROUP BY category_id, tc."name", tc.color
             ) AS subquery;
             ''',
-            [HistoryTaskStatusChoices.FAILED, user_id, from_date, to_date, user_id, from_date, to_date]
+            [HistoryTaskStatusChoices.FAILED, user_id, from_date, to_date]
         )
         return cursor.fetchall()[0][0]
 
@@ -362,12 +659,12 @@ class HistoryRepository(HistoryRepositoryInterface):
                     (6, 'Суббота'),
                     (7, 'Воскресенье')
                 ) weekdays(day_index, day_name)
-                LEFT join
+                LEFT JOIN
                     history_history hh 
                 ON 
                     day_index=extract(isodow FROM hh.execution_date)
-                WHERE hh.user_id = %s AND
-                execution_date BETWEEN %s AND %s
+                    AND hh.user_id = %s
+                    AND hh.execution_date BETWEEN %s AND %s
                 GROUP BY day_index, day_name
                 ORDER BY day_index) AS subquery;
             ''',
@@ -384,17 +681,13 @@ class HistoryRepository(HistoryRepositoryInterface):
         cursor = self._connection.cursor()
         cursor.execute(
             '''
-            SELECT (
-                SELECT count(hh2.id) 
-                FROM history_history hh2 
-                WHERE hh2.user_id = %s AND hh2.planned_time = hh2.execution_time 
-                AND execution_date BETWEEN %s AND %s
-            ) AS successfully_planned,
-            count(hh.id) AS total_planned
+            SELECT 
+                count(*) FILTER (WHERE hh.planned_time = hh.execution_time) AS successfully_planned,
+                count(*) AS total_planned
             FROM history_history hh 
             WHERE hh.user_id = %s AND execution_date BETWEEN %s AND %s; 
             ''',
-            [user_id, from_date, to_date, user_id, from_date, to_date]
+            [user_id, from_date, to_date]
         )
         return cursor.fetchall()[0]
 
@@ -446,10 +739,50 @@ class HistoryRepository(HistoryRepositoryInterface):
             [user_id, from_date, to_date]
         )
         return [{'id': row[0], 'name': row[1]} for row in cursor.fetchall()]
-    
-    def get_count_user_tasks_in_categories_for_today(self, user_id: UUID) -> list[dict[str, Union[str, int]]]:
+
+    def get_history_page(
+            self,
+            user_id: UUID,
+            from_date: str,
+            to_date: str,
+            after: Optional[tuple[date, int]],
+            limit: int,
+        ) -> list[dict[str, Union[str, int, date]]]:
+        '''
+        Страница списка истории за период, от новых записей к старым.
+        after - ключ (execution_date, id) последней записи предыдущей страницы,
+        записи после него читаются по индексу без OFFSET.
+        '''
         cursor = self._connection.cursor()
+        after_date, after_id = after if after is not None else (None, None)
         cursor.execute(
+            '''
+            SELECT hh.id, hh.name, hh.execution_date
+            FROM history_history hh
+            WHERE hh.user_id = %s AND
+            hh.execution_date BETWEEN %s AND %s AND
+            (%s::date IS NULL OR (hh.execution_date, hh.id) < (%s::date, %s::int))
+            ORDER BY hh.execution_date DESC, hh.id DESC
+            LIMIT %s;
+            ''',
+            [user_id, from_date, to_date, after_date, after_date, after_id, limit]
+        )
+        return [
+            {'id': row[0], 'name': row[1], 'execution_date': row[2]}
+            for row in cursor.fetchall()
+        ]
+    
+    def get_history_statistics(
+            self,
+            user_id: UUID,
+            from_date: str,
+            to_date: str
+        ) -> dict:
+        return self._execute(*self._get_history_statistics_query(user_id, from_date, to_date))
+
+    def get_count_user_tasks_in_categories_for_today(self, user_id: UUID, today: date) -> list[dict[str, Union[str, int]]]:
+        return self._execute(
+            self._connection.cursor(),
             '''
             SELECT  coalesce(array_agg(
                 category_stats
@@ -459,33 +792,125 @@ class HistoryRepository(HistoryRepositoryInterface):
                 FROM history_history hh
                 JOIN task_category tc
                 ON hh.category_id = tc.id
-                WHERE hh.user_id = %s AND hh.execution_date = CURRENT_DATE
+                WHERE hh.user_id = %s AND hh.execution_date = %s
                 AND hh.status = %s
                 GROUP BY tc.id
             ) AS subquery;
             ''',
-            [user_id, HistoryTaskStatusChoices.SUCCESSFUL]
+            [user_id, today, HistoryTaskStatusChoices.SUCCESSFUL],
+            lambda cursor: cursor.fetchall()[0][0]
         )
-        return cursor.fetchall()[0][0]
     
-    def get_user_tasks_for_today_json(self, user_id: UUID) -> list[dict[str, Union[str, int]]]:
-        cursor = self._connection.cursor()
-        cursor.execute(
+    def get_user_tasks_for_today_json(self, user_id: UUID, today: date) -> list[dict[str, Union[str, int]]]:
+        return self._execute(
+            self._connection.cursor(),
             '''
             SELECT array_agg(
                 json_build_object('id', hh.id, 'name', hh.name, 'color', tc.color)
             )
             FROM history_history hh
             JOIN task_category tc ON tc.id = hh.category_id
-            WHERE hh.user_id = %s AND hh.execution_date = CURRENT_DATE
+            WHERE hh.user_id = %s AND hh.execution_date = %s
             AND hh.status = %s
             GROUP BY hh.user_id;
             ''',
-            [user_id, HistoryTaskStatusChoices.SUCCESSFUL]
+            [user_id, today, HistoryTaskStatusChoices.SUCCESSFUL],
+            self._fetch_first_value_or_empty_list
         )
+
+    def _fetch_first_value_or_empty_list(self, cursor) -> list:
         rows = cursor.fetchall()
         return rows[0][0] if len(rows) > 0 else []
 
+    def rebuild_daily_rollup(self) -> None:
+        '''
+        Полностью пересчитывает history_daily_rollup по сырой истории.
+        Должен вызываться внутри транзакции: блокировка не дает изменить
+        историю, пока агрегаты пересчитываются.
+        '''
+        cursor = self._connection.cursor()
+        cursor.execute('LOCK TABLE history_history IN SHARE MODE;')
+        cursor.execute('DELETE FROM history_daily_rollup;')
+        cursor.execute(
+            '''
+            INSERT INTO history_daily_rollup (
+                user_id, execution_date, category_id, status, task_count,
+                planned_seconds, execution_seconds, accuracy_sum, exact_plan_count
+            )
+            SELECT
+                hh.user_id, hh.execution_date, hh.category_id, hh.status,
+                count(*),
+                sum(extract(epoch FROM hh.planned_time)),
+                sum(extract(epoch FROM hh.execution_time)),
+                sum(history_task_accuracy(hh.planned_time, hh.execution_time)),
+                count(*) FILTER (WHERE hh.planned_time = hh.execution_time)
+            FROM history_history hh
+            GROUP BY hh.user_id, hh.execution_date, hh.category_id, hh.status;
+            '''
+        )
+
+    def get_daily_rollup_mismatches_count(self) -> int:
+        '''
+        Количество групп (пользователь, дата, категория, статус), в которых
+        history_daily_rollup расходится с агрегатами по сырой истории.
+        Суммы точности сравниваются с допуском на округление.
+        '''
+        cursor = self._connection.cursor()
+        cursor.execute(
+            '''
+            WITH expected AS (
+                SELECT
+                    hh.user_id, hh.execution_date, hh.category_id, hh.status,
+                    count(*) AS task_count,
+                    sum(extract(epoch FROM hh.planned_time)) AS planned_seconds,
+                    sum(extract(epoch FROM hh.execution_time)) AS execution_seconds,
+                    sum(history_task_accuracy(hh.planned_time, hh.execution_time)) AS accuracy_sum,
+                    count(*) FILTER (WHERE hh.planned_time = hh.execution_time) AS exact_plan_count
+                FROM history_history hh
+                GROUP BY hh.user_id, hh.execution_date, hh.category_id, hh.status
+            )
+            SELECT count(*)
+            FROM expected e
+            FULL OUTER JOIN history_daily_rollup hdr
+            ON hdr.user_id = e.user_id
+            AND hdr.execution_date = e.execution_date
+            AND coalesce(hdr.category_id, 0) = coalesce(e.category_id, 0)
+            AND hdr.status = e.status
+            WHERE e.user_id IS NULL
+            OR hdr.user_id IS NULL
+            OR hdr.task_count <> e.task_count
+            OR hdr.exact_plan_count <> e.exact_plan_count
+            OR abs(hdr.planned_seconds - e.planned_seconds) > 0.001
+            OR abs(hdr.execution_seconds - e.execution_seconds) > 0.001
+            OR abs(hdr.accuracy_sum - e.accuracy_sum) > 0.000001;
+            '''
+        )
+        return cursor.fetchone()[0]
+
+
+class AsyncHistoryRepository(AsyncRepositoryMixin, HistoryStatisticsQueryMixin, AsyncHistoryReadRepositoryInterface):
+    '''
+    Чтение статистики истории для асинхронных представлений на асинхронном
+    соединении запроса (container.async_connection)
+    '''
+
+    def __init__(
+            self,
+            history_model: Type[History],
+            connection: ConnectionProxy
+        ) -> None:
+        self._history_model = history_model
+        self._connection = connection
+
+    async def aget_history_statistics(
+            self,
+            user_id: UUID,
+            from_date: str,
+            to_date: str
+        ) -> dict:
+        return await self._aexecute(*self._get_history_statistics_query(user_id, from_date, to_date))
+
+
 class SharedHistoryRepository(SharedHistoryRepositoryInterface):
 
     def __init__(
@@ -0,0 +1,32 @@
+from django.db import connection, transaction
+from django.core.management.base import BaseCommand, CommandError
+
+from history.models import History
+from history.infrastructure import HistoryRepository
+
+
+class Command(BaseCommand):
+    help = '''
+        Пересчитывает таблицу дневных агрегатов истории history_daily_rollup
+        по сырой истории и проверяет, что агрегаты с ней совпадают.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify-only',
+            action='store_true',
+            help='Только сверить агрегаты с сырой историей, не пересчитывая их',
+        )
+
+    def handle(self, *args, **options):
+        repository = HistoryRepository(History, connection)
+        with transaction.atomic():
+            if not options['verify_only']:
+                repository.rebuild_daily_rollup()
+                self.stdout.write('Агрегаты истории пересчитаны')
+            mismatches_count = repository.get_daily_rollup_mismatches_count()
+        if mismatches_count:
+            raise CommandError(
+                f'Агрегаты истории расходятся с сырой историей в {mismatches_count} группах'
+            )
+        self.stdout.write(self.style.SUCCESS('Агрегаты истории совпадают с сырой историей'))
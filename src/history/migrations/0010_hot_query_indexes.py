@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-16 22:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('history', '0009_history_planned_deadline'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='history',
+            index=models.Index(fields=['user', 'execution_date'], include=('category', 'status', 'planned_time', 'execution_time'), name='history_user_date_idx'),
+        ),
+        migrations.AlterField(
+            model_name='history',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь, создавший задачу'),
+        ),
+    ]
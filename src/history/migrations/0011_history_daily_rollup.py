@@ -0,0 +1,171 @@
+# Generated by Django 4.2 on 2026-10-16 22:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.functions.comparison
+
+ROLLUP_TRIGGERS_SQL = '''
+CREATE FUNCTION history_daily_rollup_sync() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        INSERT INTO history_daily_rollup AS rollup (
+            user_id, execution_date, category_id, status, task_count,
+            planned_seconds, execution_seconds, accuracy_sum, exact_plan_count
+        )
+        SELECT
+            changed.user_id, changed.execution_date, changed.category_id, changed.status,
+            -count(*),
+            -sum(extract(epoch FROM changed.planned_time)),
+            -sum(extract(epoch FROM changed.execution_time)),
+            -sum(history_task_accuracy(changed.planned_time, changed.execution_time)),
+            -count(*) FILTER (WHERE changed.planned_time = changed.execution_time)
+        FROM old_rows changed
+        GROUP BY changed.user_id, changed.execution_date, changed.category_id, changed.status
+        ON CONFLICT (user_id, execution_date, (coalesce(category_id, 0)), status) DO UPDATE SET
+            task_count = rollup.task_count + EXCLUDED.task_count,
+            planned_seconds = rollup.planned_seconds + EXCLUDED.planned_seconds,
+            execution_seconds = rollup.execution_seconds + EXCLUDED.execution_seconds,
+            accuracy_sum = rollup.accuracy_sum + EXCLUDED.accuracy_sum,
+            exact_plan_count = rollup.exact_plan_count + EXCLUDED.exact_plan_count;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO history_daily_rollup AS rollup (
+            user_id, execution_date, category_id, status, task_count,
+            planned_seconds, execution_seconds, accuracy_sum, exact_plan_count
+        )
+        SELECT
+            changed.user_id, changed.execution_date, changed.category_id, changed.status,
+            count(*),
+            sum(extract(epoch FROM changed.planned_time)),
+            sum(extract(epoch FROM changed.execution_time)),
+            sum(history_task_accuracy(changed.planned_time, changed.execution_time)),
+            count(*) FILTER (WHERE changed.planned_time = changed.execution_time)
+        FROM new_rows changed
+        GROUP BY changed.user_id, changed.execution_date, changed.category_id, changed.status
+        ON CONFLICT (user_id, execution_date, (coalesce(category_id, 0)), status) DO UPDATE SET
+            task_count = rollup.task_count + EXCLUDED.task_count,
+            planned_seconds = rollup.planned_seconds + EXCLUDED.planned_seconds,
+            execution_seconds = rollup.execution_seconds + EXCLUDED.execution_seconds,
+            accuracy_sum = rollup.accuracy_sum + EXCLUDED.accuracy_sum,
+            exact_plan_count = rollup.exact_plan_count + EXCLUDED.exact_plan_count;
+    END IF;
+
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        DELETE FROM history_daily_rollup rollup
+        USING (SELECT DISTINCT user_id, execution_date FROM old_rows) changed
+        WHERE rollup.user_id = changed.user_id
+        AND rollup.execution_date = changed.execution_date
+        AND rollup.task_count = 0;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER history_daily_rollup_insert
+AFTER INSERT ON history_history
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION history_daily_rollup_sync();
+
+CREATE TRIGGER history_daily_rollup_update
+AFTER UPDATE ON history_history
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION history_daily_rollup_sync();
+
+CREATE TRIGGER history_daily_rollup_delete
+AFTER DELETE ON history_history
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION history_daily_rollup_sync();
+'''
+
+DROP_ROLLUP_TRIGGERS_SQL = '''
+DROP TRIGGER history_daily_rollup_insert ON history_history;
+DROP TRIGGER history_daily_rollup_update ON history_history;
+DROP TRIGGER history_daily_rollup_delete ON history_history;
+DROP FUNCTION history_daily_rollup_sync();
+'''
+
+# та же формула точности, что и в запросах статистики HistoryRepository
+TASK_ACCURACY_FUNCTION_SQL = '''
+CREATE FUNCTION history_task_accuracy(planned_time interval, execution_time interval)
+RETURNS numeric AS $$
+    SELECT CASE 
+        WHEN extract(epoch FROM planned_time) = 0 
+            OR extract(epoch FROM execution_time) = 0
+            THEN 0
+        WHEN planned_time < execution_time 
+            THEN (extract(epoch FROM planned_time) /
+            extract(epoch FROM execution_time)) * 100
+        WHEN planned_time > execution_time 
+            THEN (extract(epoch FROM execution_time) / 
+            extract(epoch FROM planned_time)) * 100
+        WHEN planned_time = execution_time 
+            THEN 100
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+'''
+
+BACKFILL_ROLLUP_SQL = '''
+INSERT INTO history_daily_rollup (
+    user_id, execution_date, category_id, status, task_count,
+    planned_seconds, execution_seconds, accuracy_sum, exact_plan_count
+)
+SELECT
+    hh.user_id, hh.execution_date, hh.category_id, hh.status,
+    count(*),
+    sum(extract(epoch FROM hh.planned_time)),
+    sum(extract(epoch FROM hh.execution_time)),
+    sum(history_task_accuracy(hh.planned_time, hh.execution_time)),
+    count(*) FILTER (WHERE hh.planned_time = hh.execution_time)
+FROM history_history hh
+GROUP BY hh.user_id, hh.execution_date, hh.category_id, hh.status;
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('task', '0005_hot_query_indexes'),
+        ('history', '0010_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoryDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('execution_date', models.DateField(verbose_name='День выполнения задач')),
+                ('status', models.CharField(choices=[('SUCCESSFUL', 'Успешно выполнена вовремя'), ('OUT_OF_DEADLINE', 'Выполнена с опозданием'), ('FAILED', 'Провалена')], max_length=50, verbose_name='Статус задач')),
+                ('task_count', models.IntegerField(default=0, verbose_name='Количество задач')),
+                ('planned_seconds', models.DecimalField(decimal_places=6, default=0, max_digits=20, verbose_name='Суммарное запланированное время в секундах')),
+                ('execution_seconds', models.DecimalField(decimal_places=6, default=0, max_digits=20, verbose_name='Суммарное реальное время выполнения в секундах')),
+                ('accuracy_sum', models.DecimalField(decimal_places=12, default=0, max_digits=30, verbose_name='Сумма точностей планирования задач в процентах')),
+                ('exact_plan_count', models.IntegerField(default=0, verbose_name='Количество задач, выполненных ровно за запланированное время')),
+                ('category', models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='task.category', verbose_name='Категория задач')),
+                ('user', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь, к истории которого относится строка')),
+            ],
+            options={
+                'verbose_name': '\n            Агрегаты истории пользователя по дням, категориям и статусам.\n            Поддерживается триггерами на history_history в той же транзакции,\n            что и изменение истории, поэтому напрямую в нее не пишут.\n        ',
+                'db_table': 'history_daily_rollup',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='historydailyrollup',
+            constraint=models.UniqueConstraint(models.F('user'), models.F('execution_date'), django.db.models.functions.comparison.Coalesce(models.F('category'), 0), models.F('status'), name='history_daily_rollup_key'),
+        ),
+        migrations.RunSQL(
+            sql=TASK_ACCURACY_FUNCTION_SQL,
+            reverse_sql='DROP FUNCTION history_task_accuracy(interval, interval);'
+        ),
+        migrations.RunSQL(
+            sql=ROLLUP_TRIGGERS_SQL,
+            reverse_sql=DROP_ROLLUP_TRIGGERS_SQL
+        ),
+        migrations.RunSQL(
+            sql=BACKFILL_ROLLUP_SQL,
+            reverse_sql=migrations.RunSQL.noop
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2 on 2026-10-16 23:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('history', '0011_history_daily_rollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='history',
+            index=models.Index(fields=['user', 'execution_date', 'id'], include=('name',), name='history_user_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2 on 2026-10-16 23:55
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('history', '0012_history_list_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='history',
+            name='execution_date',
+            field=models.DateField(default=django.utils.timezone.localdate, verbose_name='День, в который была выполнена задача, по часовому поясу пользователя'),
+        ),
+    ]
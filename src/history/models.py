@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 from task.models import DomainQuerySet
@@ -13,6 +15,21 @@ class History(models.Model):
         verbose_name = '''
             История выполненных и проваленных задач. Одна строка - одна задача.
         '''
+        indexes = [
+            # все запросы статистики режут историю пользователя по дате,
+            # остальные колонки агрегатов лежат в индексе
+            models.Index(
+                fields=['user', 'execution_date'],
+                include=['category', 'status', 'planned_time', 'execution_time'],
+                name='history_user_date_idx',
+            ),
+            # постраничный список истории по ключу (execution_date, id)
+            models.Index(
+                fields=['user', 'execution_date', 'id'],
+                include=['name'],
+                name='history_user_date_id_idx',
+            ),
+        ]
 
 
     name = models.CharField(
@@ -33,6 +50,7 @@ class History(models.Model):
             on_delete=models.CASCADE, 
             null=False, 
             blank=False, 
+            db_index=False,
             verbose_name='Пользователь, создавший задачу'
         )
     planned_time = models.DurationField(
@@ -48,8 +66,8 @@ class History(models.Model):
     execution_date = models.DateField(
             null=False, 
             blank=False, 
-            auto_now_add=True, 
-            verbose_name='День, в который была выполнена задача'
+            default=timezone.localdate,
+            verbose_name='День, в который была выполнена задача, по часовому поясу пользователя'
         )
     status = models.CharField(
             max_length=50, 
@@ -67,6 +85,15 @@ class History(models.Model):
 
     objects = DomainQuerySet.as_manager()
 
+    DOMAIN_FIELDS = (
+        'id', 'name', 'user_id', 'category_id', 'planned_time',
+        'execution_time', 'execution_date', 'status', 'planned_deadline',
+    )
+
+    @classmethod
+    def row_to_domain(cls, values: dict) -> HistoryEntity:
+        return HistoryEntity(**values)
+
     @classmethod
     def from_domain(cls, entity: HistoryEntity):
         return cls(
@@ -85,8 +112,8 @@ class History(models.Model):
         return HistoryEntity(
             id=self.id,
             name=self.name,
-            user_id=self.user.id,
-            category_id=self.category.id if self.category else None,
+            user_id=self.user_id,
+            category_id=self.category_id,
             planned_time=self.planned_time,
             execution_time=self.execution_time,
             execution_date=self.execution_date,
@@ -134,6 +161,11 @@ class SharedHistory(models.Model):
 
     objects = DomainQuerySet.as_manager()
 
+    DOMAIN_FIELDS = ('key', 'user_id', 'from_date', 'to_date', 'history_statistics')
+
+    @classmethod
+    def row_to_domain(cls, values: dict) -> SharedHistoryEntity:
+        return SharedHistoryEntity(**values)
 
     @classmethod
     def from_domain(cls, entity: SharedHistoryEntity):
@@ -148,9 +180,93 @@ class SharedHistory(models.Model):
     def to_domain(self):
         return SharedHistoryEntity(
             key=self.key,
-            user_id=self.user.id,
+            user_id=self.user_id,
             from_date=self.from_date,
             to_date=self.to_date,
             history_statistics=self.history_statistics
         )
 
+
+
+class HistoryDailyRollup(models.Model):
+
+
+    class Meta:
+        db_table = 'history_daily_rollup'
+        verbose_name = '''
+            Агрегаты истории пользователя по дням, категориям и статусам.
+            Поддерживается триггерами на history_history в той же транзакции,
+            что и изменение истории, поэтому напрямую в нее не пишут.
+        '''
+        constraints = [
+            models.UniqueConstraint(
+                models.F('user'),
+                models.F('execution_date'),
+                Coalesce(models.F('category'), 0),
+                models.F('status'),
+                name='history_daily_rollup_key',
+            ),
+        ]
+
+
+    user = models.ForeignKey(
+            to=get_user_model(), 
+            on_delete=models.DO_NOTHING, 
+            db_constraint=False,
+            db_index=False,
+            null=False, 
+            blank=False, 
+            verbose_name='Пользователь, к истории которого относится строка'
+        )
+    execution_date = models.DateField(
+            null=False, 
+            blank=False, 
+            verbose_name='День выполнения задач'
+        )
+    category = models.ForeignKey(
+            to='task.Category',
+            on_delete=models.DO_NOTHING,
+            db_constraint=False,
+            db_index=False,
+            null=True, 
+            blank=True, 
+            verbose_name='Категория задач'
+        )
+    status = models.CharField(
+            max_length=50, 
+            null=False,
+            blank=False, 
+            choices=HistoryTaskStatusChoices.choices, 
+            verbose_name='Статус задач'
+        )
+    task_count = models.IntegerField(
+            null=False,
+            default=0,
+            verbose_name='Количество задач'
+        )
+    planned_seconds = models.DecimalField(
+            max_digits=20,
+            decimal_places=6,
+            null=False,
+            default=0,
+            verbose_name='Суммарное запланированное время в секундах'
+        )
+    execution_seconds = models.DecimalField(
+            max_digits=20,
+            decimal_places=6,
+            null=False,
+            default=0,
+            verbose_name='Суммарное реальное время выполнения в секундах'
+        )
+    accuracy_sum = models.DecimalField(
+            max_digits=30,
+            decimal_places=12,
+            null=False,
+            default=0,
+            verbose_name='Сумма точностей планирования задач в процентах'
+        )
+    exact_plan_count = models.IntegerField(
+            null=False,
+            default=0,
+            verbose_name='Количество задач, выполненных ровно за запланированное время'
+        )
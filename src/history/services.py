@@ -1,17 +1,19 @@
 import re
+import json
+import base64
 import random
-from datetime import timedelta, datetime
-from typing import Iterable, Union, NoReturn
+from datetime import date, timedelta, datetime
+from typing import Iterable, Optional, Union, NoReturn
 from abc import ABC, abstractmethod
 from copy import deepcopy
 from uuid import UUID
 
-from django.db import transaction
-from django.core.exceptions import ValidationError
+from django.core.exceptions import ValidationError, ObjectDoesNotExist
+from django.utils import timezone
+from django.utils.dateparse import parse_duration
 
-from task.infrastructure import TaskRepositoryInterface
-from task.domain import TaskEntityProtocol
-from .infrastructure import HistoryRepositoryInterface, SharedHistoryRepositoryInterface
+from core.cache import StaleWhileRevalidateCache
+from .infrastructure import HistoryRepositoryInterface, AsyncHistoryReadRepositoryInterface, SharedHistoryRepositoryInterface
 from .domain import HistoryEntity, SharedHistoryEntity
 
 
@@ -44,11 +46,23 @@ class MoveTaskToHistoryUseCaseInterface(ABC):
             self, 
             user_id: UUID, 
             task_id: int, 
-            execution_time: timedelta,
+            execution_time: Union[timedelta, str],
+            successful: Union[str, bool],
         ) -> Union[None, NoReturn]:
         pass
 
 
+class MoveTasksToHistoryUseCaseInterface(ABC):
+
+    @abstractmethod
+    def execute(
+            self,
+            user_id: UUID,
+            tasks: list[dict],
+        ) -> list[dict]:
+        pass
+
+
 class GetUserHistoryUseCaseInterface(ABC):
 
     @abstractmethod
@@ -60,6 +74,29 @@ class GetUserHistoryUseCaseInterface(ABC):
         ) -> dict:
         pass
 
+    @abstractmethod
+    async def aexecute(
+            self,
+            user_id: UUID,
+            from_date: str,
+            to_date: str
+        ) -> dict:
+        pass
+
+
+class GetUserHistoryPageUseCaseInterface(ABC):
+
+    @abstractmethod
+    def execute(
+            self,
+            user_id: UUID,
+            from_date: str,
+            to_date: str,
+            cursor: Optional[str] = None,
+            page_size: Optional[str] = None,
+        ) -> dict:
+        pass
+
 
 class HistoryServiceInterface(ABC):
 
@@ -127,13 +164,46 @@ class ShareHistoryService(ShareHistoryServiceInterface):
         self._shared_history_repository.delete_shared_history(history)
 
 
-class GetUserHistoryUseCase(GetUserHistoryUseCaseInterface):
+class HistoryPeriodValidationMixin:
+
+    def _validate_dates(self, from_date_str: str, to_date_str: str) -> Union[None, NoReturn]:
+        template = r'^\d\d\d\d-\d\d-\d\d$'
+        if not re.fullmatch(template, from_date_str) or not re.fullmatch(template, to_date_str):
+            raise ValidationError('Неправильный формат даты')
+        try:
+            datetime.strptime(from_date_str, '%Y-%m-%d').date()
+            datetime.strptime(to_date_str, '%Y-%m-%d').date()
+        except Exception:
+            raise ValidationError('Неправильный формат даты')    
+
+    def _validate_dates_range(self, from_date_str: str, to_date_str:str) -> Union[None, NoReturn]:
+        from_date = datetime.strptime(from_date_str, '%Y-%m-%d').date()
+        to_date = datetime.strptime(to_date_str, '%Y-%m-%d').date()
+        if not from_date < to_date:
+            raise ValidationError('Вторая дата должна быть больше первой')
+
+
+class GetUserHistoryUseCase(HistoryPeriodValidationMixin, GetUserHistoryUseCaseInterface):
+    '''
+    Статистика истории за период. Список задач за период отдается
+    отдельно и постранично (GetUserHistoryPageUseCase), чтобы обновление
+    графиков не пересылало его заново.
+    С кешем статистики после записи в историю сначала отдается прошлая
+    статистика периода (is_stale), а новая считается в фоне.
+    aexecute читает статистику через async_history_repository
+    (AsyncHistoryRepository), фоновый пересчет по-прежнему идет через
+    синхронный history_repository.
+    '''
 
     def __init__(
             self, 
             history_repository: HistoryRepositoryInterface,
+            statistics_cache: StaleWhileRevalidateCache = None,
+            async_history_repository: AsyncHistoryReadRepositoryInterface = None,
         ):
         self._history_repository = history_repository
+        self._statistics_cache = statistics_cache
+        self._async_history_repository = async_history_repository
 
     def execute(
             self, 
@@ -145,70 +215,73 @@ class GetUserHistoryUseCase(GetUserHistoryUseCaseInterface):
         self._validate_dates(from_date, to_date)
         self._validate_dates_range(from_date, to_date)
 
-        count_tasks_in_categories = self._history_repository.get_count_tasks_in_categories(
-            user_id, from_date, to_date
-        )
-        common_accuracy = self._history_repository.get_common_accuracy(
-            user_id, from_date, to_date
-        )
-        accuracy_by_categories = self._history_repository.get_accuracy_by_categories(
-            user_id, from_date, to_date
+        if self._statistics_cache is None:
+            return {
+                'statistics': self._get_statistics(user_id, from_date, to_date),
+                'is_stale': False,
+            }
+        cached = self._statistics_cache.get_or_compute(
+            user_id, f'{from_date}:{to_date}',
+            lambda: self._get_statistics(user_id, from_date, to_date)
         )
-        common_success_rate = self._history_repository.get_common_success_rate(
-            user_id, from_date, to_date
-        )
-        success_rate_by_categories = self._history_repository.get_success_rate_by_categories(
-            user_id, from_date, to_date
+        return {
+            'statistics': cached.value,
+            'is_stale': cached.is_stale,
+        }
+
+    async def aexecute(
+            self,
+            user_id: UUID,
+            from_date: str,
+            to_date: str
+        ) -> dict:
+        self._validate_dates(from_date, to_date)
+        self._validate_dates_range(from_date, to_date)
+
+        if self._statistics_cache is None:
+            return {
+                'statistics': await self._aget_statistics(user_id, from_date, to_date),
+                'is_stale': False,
+            }
+        cached = await self._statistics_cache.aget_or_compute(
+            user_id, f'{from_date}:{to_date}',
+            lambda: self._aget_statistics(user_id, from_date, to_date),
+            lambda: self._get_statistics(user_id, from_date, to_date),
         )
-        count_tasks_by_weekdays = self._history_repository.get_count_tasks_by_weekdays(
-            user_id, from_date, to_date
-        )   
-        common_successful_planning_rate = self._history_repository.get_common_successful_planning_rate(
-            user_id, from_date, to_date
+        return {
+            'statistics': cached.value,
+            'is_stale': cached.is_stale,
+        }
+
+    def _get_statistics(self, user_id: UUID, from_date: str, to_date: str) -> dict:
+        return self._build_statistics(
+            self._history_repository.get_history_statistics(user_id, from_date, to_date)
         )
-        count_successful_planned_tasks_by_categories = self._history_repository.get_count_successful_planned_tasks_by_categories(
-            user_id, from_date, to_date
+
+    async def _aget_statistics(self, user_id: UUID, from_date: str, to_date: str) -> dict:
+        return self._build_statistics(
+            await self._async_history_repository.aget_history_statistics(user_id, from_date, to_date)
         )
 
-        history = self._history_repository.get_history(
-                user_id, from_date, to_date
-            )
-        
-        common_successful_planning_rate = {'data': self._calculate_successful_planning_rate(common_successful_planning_rate[0], common_successful_planning_rate[1])}
-        common_success_rate = {'data': self._calculate_success_rate(common_success_rate[0], common_success_rate[1])}
-        common_accuracy = {'data': float(common_accuracy)}
+    def _build_statistics(self, history_statistics: dict) -> dict:
+        successfully_planned_tasks, total_planned_tasks = history_statistics['common_successful_planning_rate']
+        successful_tasks, total_tasks = history_statistics['common_success_rate']
+
+        common_successful_planning_rate = {'data': self._calculate_successful_planning_rate(successfully_planned_tasks, total_planned_tasks)}
+        common_success_rate = {'data': self._calculate_success_rate(successful_tasks, total_tasks)}
+        common_accuracy = {'data': float(history_statistics['common_accuracy'] or 0)}
 
         statistics = {
-            'countUserTasksInCategories': count_tasks_in_categories,
+            'countUserTasksInCategories': history_statistics['count_tasks_in_categories'],
             'commonUserAccuracy': common_accuracy,
-            'userAccuracyByCategories': accuracy_by_categories, 
+            'userAccuracyByCategories': history_statistics['accuracy_by_categories'], 
             'commonUserSuccessRate': common_success_rate,
-            'userSuccessRateByCategories': success_rate_by_categories,
-            'countUserTasksByWeekdays': count_tasks_by_weekdays,
+            'userSuccessRateByCategories': history_statistics['success_rate_by_categories'],
+            'countUserTasksByWeekdays': history_statistics['count_tasks_by_weekdays'],
             'commonUserSuccessfulPlanningRate': common_successful_planning_rate,
-            'countUserSuccessfulPlannedTasksByCategories': count_successful_planned_tasks_by_categories,
-        }
-        cleaned_statistics = self._clean_statistics(statistics)
-        return {
-            'history': history,
-            'statistics': cleaned_statistics
+            'countUserSuccessfulPlannedTasksByCategories': history_statistics['count_successful_planned_tasks_by_categories'],
         }
-
-    def _validate_dates(self, from_date_str: str, to_date_str: str) -> Union[None, NoReturn]:
-        template = r'^\d\d\d\d-\d\d-\d\d$'
-        if not re.fullmatch(template, from_date_str) or not re.fullmatch(template, to_date_str):
-            raise ValidationError('Неправильный формат даты')
-        try:
-            datetime.strptime(from_date_str, '%Y-%m-%d').date()
-            datetime.strptime(to_date_str, '%Y-%m-%d').date()
-        except Exception:
-            raise ValidationError('Неправильный формат даты')    
-
-    def _validate_dates_range(self, from_date_str: str, to_date_str:str) -> Union[None, NoReturn]:
-        from_date = datetime.strptime(from_date_str, '%Y-%m-%d').date()
-        to_date = datetime.strptime(to_date_str, '%Y-%m-%d').date()
-        if not from_date < to_date:
-            raise ValidationError('Вторая дата должна быть больше первой')
+        return self._clean_statistics(statistics)
 
     def _calculate_successful_planning_rate(
             self,
@@ -247,40 +320,152 @@ class GetUserHistoryUseCase(GetUserHistoryUseCaseInterface):
         return False
 
 
+class GetUserHistoryPageUseCase(HistoryPeriodValidationMixin, GetUserHistoryPageUseCaseInterface):
+    '''
+    Страница списка истории за период, от новых записей к старым.
+    Курсор для клиента непрозрачен: это закодированный ключ
+    (execution_date, id) последней записи страницы. Следующая страница
+    читается по индексу с этого ключа, поэтому ее стоимость не зависит
+    от номера страницы.
+    '''
+
+    DEFAULT_PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 200
+
+    def __init__(
+            self,
+            history_repository: HistoryRepositoryInterface,
+        ):
+        self._history_repository = history_repository
+
+    def execute(
+            self,
+            user_id: UUID,
+            from_date: str,
+            to_date: str,
+            cursor: Optional[str] = None,
+            page_size: Optional[str] = None,
+        ) -> dict:
+        self._validate_dates(from_date, to_date)
+        self._validate_dates_range(from_date, to_date)
+        limit = self._parse_page_size(page_size)
+        after = self._decode_cursor(cursor) if cursor else None
+
+        # лишняя запись показывает, есть ли следующая страница
+        rows = self._history_repository.get_history_page(
+            user_id, from_date, to_date, after, limit + 1
+        )
+        page = rows[:limit]
+        next_cursor = self._encode_cursor(page[-1]) if len(rows) > limit else None
+        return {
+            'history': [{'id': row['id'], 'name': row['name']} for row in page],
+            'next_cursor': next_cursor,
+        }
+
+    def _parse_page_size(self, page_size: Optional[str]) -> Union[int, NoReturn]:
+        if page_size is None:
+            return self.DEFAULT_PAGE_SIZE
+        try:
+            parsed_page_size = int(page_size)
+        except ValueError:
+            raise ValidationError('Размер страницы должен быть числом')
+        if parsed_page_size < 1:
+            raise ValidationError('Размер страницы должен быть больше нуля')
+        return min(parsed_page_size, self.MAX_PAGE_SIZE)
+
+    def _encode_cursor(self, row: dict) -> str:
+        key = json.dumps([row['execution_date'].isoformat(), row['id']])
+        return base64.urlsafe_b64encode(key.encode()).decode()
+
+    def _decode_cursor(self, cursor: str) -> Union[tuple[date, int], NoReturn]:
+        try:
+            execution_date, history_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return date.fromisoformat(execution_date), int(history_id)
+        except (ValueError, TypeError):
+            raise ValidationError('Некорректный курсор страницы')
+
+
 class MoveTaskToHistoryUseCase(MoveTaskToHistoryUseCaseInterface):
+    '''
+    Перенос задачи в историю одним запросом к БД: задача удаляется только
+    если принадлежит пользователю, и в том же запросе вставляется строка
+    истории со статусом по правилам HistoryEntity._get_status.
+    '''
 
     def __init__(
             self, 
             history_repository: HistoryRepositoryInterface,
-            task_repository: TaskRepositoryInterface,
         ):
         self._history_repository = history_repository
-        self._task_repository = task_repository
-        
-    @transaction.atomic
+
     def execute(
             self, 
             user_id: UUID, 
             task_id: int, 
-            execution_time: timedelta,
-            successful: str
+            execution_time: Union[timedelta, str],
+            successful: Union[str, bool]
         ) -> Union[None, NoReturn]:
-    
-        task = self._task_repository.get_task_by_id(task_id)
-        self._user_task_owner(user_id, task)
-
-        history_task = HistoryEntity.from_task(
-                task, 
-                execution_time, 
-                successful
-            )
-        self._task_repository.delete_task(task)
-        self._history_repository.save_history(history_task)
-
-    def _user_task_owner(self, user_id: UUID, task: TaskEntityProtocol) -> Union[None, NoReturn]:
-        if not task.user_id == user_id:
+        result = self._history_repository.move_user_task_to_history(
+            user_id,
+            task_id,
+            execution_time,
+            HistoryEntity._parse_is_successful(str(successful).lower()),
+            timezone.localdate(),
+        )
+        if result['moved']:
+            return
+        if result['error'] == 'forbidden':
             raise PermissionError
-    
+        raise ObjectDoesNotExist('Задача не найдена')
+
+
+class MoveTasksToHistoryUseCase(MoveTasksToHistoryUseCaseInterface):
+    '''
+    Пакетный перенос задач в историю, например при закрытии дня.
+    Весь пакет переносится одним запросом к БД. Чужие и несуществующие
+    задачи не прерывают перенос остальных, а возвращаются с ошибкой
+    в результате по каждой задаче.
+    '''
+
+    MAX_BATCH_SIZE = 500
+
+    def __init__(self, history_repository: HistoryRepositoryInterface):
+        self._history_repository = history_repository
+
+    def execute(
+            self,
+            user_id: UUID,
+            tasks: list[dict[str, Union[int, str, bool]]],
+        ) -> Union[list[dict], NoReturn]:
+        if len(tasks) > self.MAX_BATCH_SIZE:
+            raise ValueError(f'За один раз можно перенести не больше {self.MAX_BATCH_SIZE} задач')
+        task_ids = []
+        execution_times = []
+        successful = []
+        for task_json in tasks:
+            task_ids.append(int(task_json['task_id']))
+            execution_times.append(self._parse_execution_time(task_json['execution_time']))
+            successful.append(self._parse_successful(task_json['successful']))
+        if len(set(task_ids)) != len(task_ids):
+            raise ValueError('Задача не может быть перенесена в историю дважды')
+        if not task_ids:
+            return []
+        return self._history_repository.move_user_tasks_to_history(
+            user_id, task_ids, execution_times, successful, timezone.localdate()
+        )
+
+    def _parse_execution_time(self, execution_time: str) -> Union[timedelta, NoReturn]:
+        parsed_execution_time = parse_duration(str(execution_time))
+        if parsed_execution_time is None:
+            raise ValueError('Время выполнения должно быть в формате HH:MM:SS')
+        return parsed_execution_time
+
+    def _parse_successful(self, successful: Union[str, bool]) -> Union[bool, NoReturn]:
+        successful = str(successful).lower()
+        if successful not in ('true', 'false'):
+            raise ValueError('Недопустимое значение для successful')
+        return successful == 'true'
+
 
 class HistoryService(HistoryServiceInterface):
     def __init__(
@@ -290,9 +475,13 @@ class HistoryService(HistoryServiceInterface):
         self._history_repository = history_repository
 
     def get_user_history_statistics_for_today(self, user_id: UUID) -> dict:
+        today = timezone.localdate()
+        with self._history_repository.batch():
+            tasks = self._history_repository.get_user_tasks_for_today_json(user_id, today)
+            categories = self._history_repository.get_count_user_tasks_in_categories_for_today(user_id, today)
         statistics = {
-            'tasks': self._history_repository.get_user_tasks_for_today_json(user_id),
-            'categories' : self._history_repository.get_count_user_tasks_in_categories_for_today(user_id),
+            'tasks': tasks.result,
+            'categories' : categories.result,
         }
         return statistics
     
@@ -313,9 +502,11 @@ class ShareHistoryUseCase(ShareHistoryUseCaseInterface):
             self, 
             shared_history_repository: SharedHistoryRepositoryInterface,
             get_history_use_case: GetUserHistoryUseCaseInterface,
+            history_repository: HistoryRepositoryInterface,
         ) -> None:
         self._shared_history_repository = shared_history_repository
         self._get_history_use_case = get_history_use_case
+        self._history_repository = history_repository
 
     def execute(
             self, 
@@ -325,6 +516,9 @@ class ShareHistoryUseCase(ShareHistoryUseCaseInterface):
         ) -> str:
         
         history_statistics = self._get_history_use_case.execute(user_id=user_id, from_date=from_date, to_date=to_date)
+        del history_statistics['is_stale']
+        # сохраненная история - снимок, поэтому список задач в нее входит целиком
+        history_statistics['history'] = self._history_repository.get_history(user_id, from_date, to_date)
 
         key = self._generate_random_string()
         self._shared_history_repository.save_user_shared_history(
@@ -0,0 +1,134 @@
+import json
+from datetime import date, timedelta
+
+from django.test import TestCase
+from django.db import connection
+from django.contrib.auth import get_user_model
+
+from task.models import Task, Category
+from .models import History, HistoryDailyRollup
+from .infrastructure import HistoryRepository
+from .services import MoveTasksToHistoryUseCase
+from .constants.choices import HistoryTaskStatusChoices
+
+User = get_user_model()
+
+
+class MoveTasksToHistoryTest(TestCase):
+    """Пакетный перенос задач в историю должен выполняться одним запросом"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='batchuser',
+            email='batch@example.com',
+            password='testpass123',
+        )
+        self.other_user = User.objects.create_user(
+            username='batchother',
+            email='batchother@example.com',
+            password='testpass123',
+        )
+        self.category = Category.objects.create(
+            name='Batch category',
+            color='rgba(0, 0, 255, 0.4)',
+            user=self.user,
+            is_custom=True,
+        )
+        self.repository = HistoryRepository(History, connection)
+        self.use_case = MoveTasksToHistoryUseCase(self.repository)
+
+    def _create_task(self, user, name: str, deadline=None) -> Task:
+        return Task.objects.create(
+            name=name,
+            order=Task.objects.filter(user=user).count() + 1,
+            category=self.category if user == self.user else None,
+            user=user,
+            deadline=deadline,
+            planned_time=timedelta(hours=1),
+        )
+
+    def test_batch_results(self):
+        """Тест результатов по каждой задаче пакета"""
+        on_time = self._create_task(self.user, 'On time', date.today())
+        late = self._create_task(self.user, 'Late', date.today() - timedelta(days=1))
+        failed = self._create_task(self.user, 'Failed')
+        foreign = self._create_task(self.other_user, 'Foreign')
+
+        with self.assertNumQueries(1):
+            results = self.use_case.execute(self.user.id, [
+                {'task_id': on_time.id, 'execution_time': '01:00:00', 'successful': True},
+                {'task_id': late.id, 'execution_time': '00:30:00', 'successful': 'true'},
+                {'task_id': foreign.id, 'execution_time': '01:00:00', 'successful': True},
+                {'task_id': failed.id, 'execution_time': '02:00:00', 'successful': 'false'},
+                {'task_id': 999999, 'execution_time': '01:00:00', 'successful': True},
+            ])
+
+        self.assertEqual(results, [
+            {'task_id': on_time.id, 'moved': True, 'status': HistoryTaskStatusChoices.SUCCESSFUL},
+            {'task_id': late.id, 'moved': True, 'status': HistoryTaskStatusChoices.OUT_OF_DEADLINE},
+            {'task_id': foreign.id, 'moved': False, 'error': 'forbidden'},
+            {'task_id': failed.id, 'moved': True, 'status': HistoryTaskStatusChoices.FAILED},
+            {'task_id': 999999, 'moved': False, 'error': 'not_found'},
+        ])
+        self.assertEqual(list(Task.objects.filter(user=self.user)), [])
+        self.assertTrue(Task.objects.filter(id=foreign.id).exists())
+
+        history = {item.name: item for item in History.objects.filter(user=self.user)}
+        self.assertEqual(set(history), {'On time', 'Late', 'Failed'})
+        self.assertEqual(history['Late'].execution_time, timedelta(minutes=30))
+        self.assertEqual(history['Late'].planned_deadline, date.today() - timedelta(days=1))
+        self.assertEqual(history['Late'].category_id, self.category.id)
+        self.assertEqual(history['Failed'].execution_date, date.today())
+        self.assertEqual(self.repository.get_daily_rollup_mismatches_count(), 0)
+        self.assertEqual(HistoryDailyRollup.objects.filter(user=self.user).count(), 3)
+
+    def test_query_count_does_not_grow_with_batch(self):
+        """Тест одного запроса для пакета любого размера"""
+        tasks = [self._create_task(self.user, f'Task {index}') for index in range(50)]
+        for batch in [tasks[:1], tasks[1:50]]:
+            with self.subTest(batch_size=len(batch)):
+                with self.assertNumQueries(1):
+                    results = self.use_case.execute(self.user.id, [
+                        {'task_id': task.id, 'execution_time': '01:00:00', 'successful': True}
+                        for task in batch
+                    ])
+                self.assertTrue(all(result['moved'] for result in results))
+        self.assertEqual(History.objects.filter(user=self.user).count(), 50)
+
+    def test_invalid_batches(self):
+        """Тест отказа для некорректных пакетов без изменений в БД"""
+        task = self._create_task(self.user, 'Invalid')
+        invalid_batches = [
+            [{'task_id': task.id, 'execution_time': 'long', 'successful': True}],
+            [{'task_id': task.id, 'execution_time': '01:00:00', 'successful': 'maybe'}],
+            [{'task_id': task.id, 'execution_time': '01:00:00'}],
+            [{'task_id': task.id, 'execution_time': '01:00:00', 'successful': True}] * 2,
+            [{'task_id': task.id, 'execution_time': '01:00:00', 'successful': True}] * (MoveTasksToHistoryUseCase.MAX_BATCH_SIZE + 1),
+        ]
+        for batch in invalid_batches:
+            with self.subTest(batch=batch[:2]):
+                with self.assertRaises((ValueError, KeyError)):
+                    self.use_case.execute(self.user.id, batch)
+        self.assertTrue(Task.objects.filter(id=task.id).exists())
+        self.assertEqual(self.use_case.execute(self.user.id, []), [])
+
+    def test_batch_view(self):
+        """Тест ответа эндпоинта пакетного переноса"""
+        task = self._create_task(self.user, 'View task')
+        self.client.login(username='batchuser', password='testpass123')
+        response = self.client.post(
+            '/api/history/move-to-history/',
+            json.dumps({'tasks': [{'task_id': task.id, 'execution_time': '00:45:00', 'successful': True}]}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()['results'],
+            [{'task_id': task.id, 'moved': True, 'status': HistoryTaskStatusChoices.SUCCESSFUL}]
+        )
+        response = self.client.post(
+            '/api/history/move-to-history/',
+            json.dumps({'tasks': [{'task_id': task.id}]}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,115 @@
+from datetime import date, timedelta
+from itertools import product
+
+from django.test import TestCase
+from django.db import connection
+from django.core.exceptions import ValidationError, ObjectDoesNotExist
+from django.contrib.auth import get_user_model
+
+from task.models import Task, Category
+from .models import History
+from .domain import HistoryEntity
+from .infrastructure import HistoryRepository
+from .services import MoveTaskToHistoryUseCase
+
+User = get_user_model()
+
+
+class MoveTaskToHistoryTest(TestCase):
+    """Перенос задачи в историю должен выполняться одним запросом с прежним поведением"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='moveuser',
+            email='move@example.com',
+            password='testpass123',
+        )
+        self.other_user = User.objects.create_user(
+            username='moveother',
+            email='moveother@example.com',
+            password='testpass123',
+        )
+        self.category = Category.objects.create(
+            name='Move category',
+            color='rgba(0, 0, 255, 0.4)',
+            user=self.user,
+            is_custom=True,
+        )
+        self.use_case = MoveTaskToHistoryUseCase(HistoryRepository(History, connection))
+
+    def _create_task(self, user, deadline=None) -> Task:
+        return Task.objects.create(
+            name='Move task',
+            order=Task.objects.filter(user=user).count() + 1,
+            category=self.category,
+            user=user,
+            deadline=deadline,
+            planned_time=timedelta(hours=1),
+        )
+
+    def test_single_round_trip(self):
+        """Тест переноса задачи одним запросом"""
+        task = self._create_task(self.user, date.today())
+        with self.assertNumQueries(1):
+            self.use_case.execute(self.user.id, task.id, '01:30:00', 'true')
+        self.assertFalse(Task.objects.filter(id=task.id).exists())
+        history = History.objects.get(user=self.user)
+        self.assertEqual(history.name, 'Move task')
+        self.assertEqual(history.category_id, self.category.id)
+        self.assertEqual(history.planned_time, timedelta(hours=1))
+        self.assertEqual(history.execution_time, timedelta(minutes=90))
+        self.assertEqual(history.execution_date, date.today())
+        self.assertEqual(history.planned_deadline, date.today())
+
+    def test_status_matches_domain_rules(self):
+        """Тест совпадения статуса с HistoryEntity._get_status"""
+        deadlines = [None, date.today() - timedelta(days=1), date.today(), date.today() + timedelta(days=1)]
+        for deadline, successful in product(deadlines, ['true', 'false']):
+            with self.subTest(deadline=deadline, successful=successful):
+                task = self._create_task(self.user, deadline)
+                self.use_case.execute(self.user.id, task.id, timedelta(minutes=30), successful)
+                self.assertEqual(
+                    History.objects.latest('id').status,
+                    HistoryEntity._get_status(successful, deadline, date.today())
+                )
+
+    def test_errors(self):
+        """Тест ошибок для чужой, несуществующей задачи и некорректных данных"""
+        foreign = self._create_task(self.other_user)
+        with self.assertRaises(PermissionError):
+            self.use_case.execute(self.user.id, foreign.id, '01:00:00', 'true')
+        self.assertTrue(Task.objects.filter(id=foreign.id).exists())
+
+        with self.assertRaises(ObjectDoesNotExist):
+            self.use_case.execute(self.user.id, 999999, '01:00:00', 'true')
+
+        task = self._create_task(self.user)
+        with self.assertRaises(ValidationError) as error:
+            self.use_case.execute(self.user.id, task.id, 'long', 'true')
+        self.assertIn('execution_time', error.exception.message_dict)
+        with self.assertRaises(ValueError):
+            self.use_case.execute(self.user.id, task.id, '01:00:00', 'maybe')
+        self.assertTrue(Task.objects.filter(id=task.id).exists())
+        self.assertFalse(History.objects.exists())
+
+    def test_view_responses(self):
+        """Тест ответов эндпоинта переноса задачи"""
+        self.client.login(username='moveuser', password='testpass123')
+        task = self._create_task(self.user)
+        foreign = self._create_task(self.other_user)
+        response = self.client.post(
+            f'/api/history/move-to-history/{foreign.id}/',
+            {'execution_time': '01:00:00', 'successful': 'true'},
+        )
+        self.assertEqual(response.status_code, 403)
+        response = self.client.post(
+            f'/api/history/move-to-history/{task.id}/',
+            {'execution_time': 'long', 'successful': 'true'},
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            f'/api/history/move-to-history/{task.id}/',
+            {'execution_time': '01:00:00', 'successful': 'false'},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(History.objects.get(user=self.user).name, 'Move task')
@@ -0,0 +1,116 @@
+from datetime import date, timedelta
+
+from django.test import TestCase
+from django.db import connection
+from django.contrib.auth import get_user_model
+
+from core.testing import QueryPlanAssertionsMixin
+from task.models import Category
+from .models import History
+from .infrastructure import HistoryRepository
+from .constants.choices import HistoryTaskStatusChoices
+
+User = get_user_model()
+
+
+class HistoryQueryPlanTest(QueryPlanAssertionsMixin, TestCase):
+    """Запросы статистики истории должны идти по индексам"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(
+                username=f'historyplan{index}',
+                email=f'historyplan{index}@example.com',
+                password='testpass123',
+            )
+            for index in range(5)
+        ]
+        cls.user = cls.users[0]
+        categories = Category.objects.bulk_create([
+            Category(
+                name=f'Category {index}',
+                color='rgba(0, 255, 0, 0.4)',
+                user=user,
+                is_custom=True,
+            )
+            for user in cls.users
+            for index in range(3)
+        ])
+        statuses = HistoryTaskStatusChoices.values
+        History.objects.bulk_create([
+            History(
+                name=f'History {index}',
+                category=categories[index % len(categories)],
+                user=cls.users[index % len(cls.users)],
+                planned_time=timedelta(hours=1),
+                execution_time=timedelta(minutes=30 + index % 90),
+                status=statuses[index % len(statuses)],
+            )
+            for index in range(3000)
+        ])
+        # auto_now_add не дает задать дату при создании
+        with connection.cursor() as cursor:
+            cursor.execute(
+                '''
+                UPDATE history_history
+                SET execution_date = CURRENT_DATE - (id %% %s)::int;
+                ''',
+                [200]
+            )
+        cls.history = History.objects.filter(user=cls.user).first()
+
+    def setUp(self):
+        self.analyze_tables()
+        self.repository = HistoryRepository(History, connection)
+
+    def test_history_statistics_queries(self):
+        """Тест планов запросов статистики за период"""
+        from_date = str(date.today() - timedelta(days=30))
+        to_date = str(date.today())
+        period_methods = [
+            'get_count_tasks_in_categories',
+            'get_common_accuracy',
+            'get_accuracy_by_categories',
+            'get_common_success_rate',
+            'get_success_rate_by_categories',
+            'get_count_tasks_by_weekdays',
+            'get_common_successful_planning_rate',
+            'get_count_successful_planned_tasks_by_categories',
+            'get_history',
+            'get_history_statistics',
+        ]
+        for name in period_methods:
+            method = getattr(self.repository, name)
+            with self.subTest(method=name):
+                self.assertNoSequentialScans(
+                    lambda: method(self.user.id, from_date, to_date)
+                )
+
+    def test_history_page_query(self):
+        """Тест плана запроса страницы списка истории"""
+        from_date = date.today() - timedelta(days=30)
+        to_date = date.today()
+        self.assertNoSequentialScans(
+            lambda: self.repository.get_history_page(self.user.id, from_date, to_date, None, 50)
+        )
+        self.assertNoSequentialScans(
+            lambda: self.repository.get_history_page(self.user.id, from_date, to_date, (to_date, self.history.id), 50)
+        )
+
+    def test_history_today_queries(self):
+        """Тест планов запросов статистики за сегодня"""
+        today_methods = [
+            'get_count_user_tasks_in_categories_for_today',
+            'get_user_tasks_for_today_json',
+        ]
+        for name in today_methods:
+            method = getattr(self.repository, name)
+            with self.subTest(method=name):
+                self.assertNoSequentialScans(lambda: method(self.user.id, date.today()))
+
+    def test_history_by_id(self):
+        """Тест плана запроса записи истории по id"""
+        self.assertNoSequentialScans(
+            lambda: self.repository.get_history_by_id(self.history.id)
+        )
@@ -0,0 +1,109 @@
+from io import StringIO
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.db import connection
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.contrib.auth import get_user_model
+
+from task.models import Task, Category
+from .models import History, HistoryDailyRollup
+from .infrastructure import HistoryRepository
+from .services import MoveTaskToHistoryUseCase, HistoryService
+from .constants.choices import HistoryTaskStatusChoices
+
+User = get_user_model()
+
+
+class HistoryDailyRollupTest(TestCase):
+    """Дневные агрегаты истории должны меняться вместе с историей"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='rollupuser',
+            email='rollup@example.com',
+            password='testpass123',
+        )
+        self.category = Category.objects.create(
+            name='Rollup category',
+            color='rgba(0, 0, 255, 0.4)',
+            user=self.user,
+            is_custom=True,
+        )
+        self.history_repository = HistoryRepository(History, connection)
+
+    def _create_task(self, name: str, planned_minutes: int) -> Task:
+        return Task.objects.create(
+            name=name,
+            order=Task.objects.filter(user=self.user).count() + 1,
+            category=self.category,
+            user=self.user,
+            planned_time=timedelta(minutes=planned_minutes),
+        )
+
+    def _move_to_history(self, task: Task, execution_minutes: int, successful: bool) -> None:
+        MoveTaskToHistoryUseCase(self.history_repository).execute(
+            self.user.id, task.id, timedelta(minutes=execution_minutes), successful
+        )
+
+    def test_move_task_to_history_updates_rollup(self):
+        """Тест появления агрегатов при переносе задач в историю"""
+        self._move_to_history(self._create_task('Exact', 60), 60, True)
+        self._move_to_history(self._create_task('Half', 60), 30, True)
+        self._move_to_history(self._create_task('Failed', 60), 60, False)
+
+        successful = HistoryDailyRollup.objects.get(
+            user=self.user, category=self.category,
+            execution_date=date.today(), status=HistoryTaskStatusChoices.SUCCESSFUL,
+        )
+        self.assertEqual(successful.task_count, 2)
+        self.assertEqual(successful.exact_plan_count, 1)
+        self.assertEqual(successful.planned_seconds, Decimal(7200))
+        self.assertEqual(successful.execution_seconds, Decimal(5400))
+        self.assertAlmostEqual(float(successful.accuracy_sum), 150.0)
+
+        failed = HistoryDailyRollup.objects.get(
+            user=self.user, status=HistoryTaskStatusChoices.FAILED
+        )
+        self.assertEqual(failed.task_count, 1)
+        self.assertEqual(self.history_repository.get_daily_rollup_mismatches_count(), 0)
+
+    def test_delete_history_updates_rollup(self):
+        """Тест уменьшения и удаления агрегатов при удалении истории"""
+        self._move_to_history(self._create_task('First', 60), 60, True)
+        self._move_to_history(self._create_task('Second', 60), 45, True)
+        service = HistoryService(self.history_repository)
+        history_ids = list(History.objects.filter(user=self.user).order_by('id').values_list('id', flat=True))
+
+        service.delete_user_history_by_id(history_ids[0], self.user.id)
+        rollup = HistoryDailyRollup.objects.get(user=self.user)
+        self.assertEqual(rollup.task_count, 1)
+        self.assertEqual(rollup.exact_plan_count, 0)
+        self.assertAlmostEqual(float(rollup.accuracy_sum), 75.0)
+
+        service.delete_user_history_by_id(history_ids[1], self.user.id)
+        self.assertFalse(HistoryDailyRollup.objects.filter(user=self.user).exists())
+
+    def test_category_delete_keeps_totals(self):
+        """Тест переноса агрегатов в группу без категории при удалении категории"""
+        self._move_to_history(self._create_task('Task', 60), 60, True)
+        self.category.delete()
+
+        rollup = HistoryDailyRollup.objects.get(user=self.user)
+        self.assertIsNone(rollup.category_id)
+        self.assertEqual(rollup.task_count, 1)
+        self.assertEqual(self.history_repository.get_daily_rollup_mismatches_count(), 0)
+
+    def test_rebuild_command(self):
+        """Тест пересчета и сверки агрегатов командой"""
+        self._move_to_history(self._create_task('Task', 60), 50, True)
+        HistoryDailyRollup.objects.filter(user=self.user).update(task_count=10)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_history_rollup', '--verify-only', stdout=StringIO())
+
+        call_command('rebuild_history_rollup', stdout=StringIO())
+        self.assertEqual(HistoryDailyRollup.objects.get(user=self.user).task_count, 1)
+        call_command('rebuild_history_rollup', '--verify-only', stdout=StringIO())
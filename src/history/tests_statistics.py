@@ -0,0 +1,259 @@
+from datetime import date, timedelta
+
+from django.test import TestCase
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.contrib.auth import get_user_model
+
+from task.models import Category
+from .models import History
+from .infrastructure import HistoryRepository
+from .services import GetUserHistoryUseCase, GetUserHistoryPageUseCase
+from .constants.choices import HistoryTaskStatusChoices
+
+User = get_user_model()
+
+
+def create_history(user, category, execution_date, planned_minutes, execution_minutes, status):
+    history = History.objects.create(
+        name=f'History {category.name if category else "-"} {execution_date}',
+        category=category,
+        user=user,
+        planned_time=timedelta(minutes=planned_minutes),
+        execution_time=timedelta(minutes=execution_minutes),
+        status=status,
+    )
+    # auto_now_add не дает задать дату выполнения при создании
+    History.objects.filter(id=history.id).update(execution_date=execution_date)
+    return history
+
+
+class HistoryStatisticsTest(TestCase):
+    """Статистика одним запросом должна совпадать со статистикой по отдельным запросам"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='statsuser',
+            email='stats@example.com',
+            password='testpass123',
+        )
+        self.other_user = User.objects.create_user(
+            username='otherstats',
+            email='otherstats@example.com',
+            password='testpass123',
+        )
+        self.categories = [
+            Category.objects.create(
+                name=f'Stats category {index}',
+                color=f'rgba({index * 40}, 0, 0, 0.4)',
+                user=self.user,
+                is_custom=True,
+            )
+            for index in range(4)
+        ]
+        self.to_date = date.today()
+        self.from_date = self.to_date - timedelta(days=30)
+
+        statuses = [
+            HistoryTaskStatusChoices.SUCCESSFUL,
+            HistoryTaskStatusChoices.OUT_OF_DEADLINE,
+            HistoryTaskStatusChoices.FAILED,
+        ]
+        for category_index, category in enumerate(self.categories):
+            for index in range(category_index * 2 + 1):
+                create_history(
+                    self.user,
+                    category,
+                    self.to_date - timedelta(days=index * 3 + category_index),
+                    planned_minutes=60,
+                    execution_minutes=60 if index % 2 else 30 + category_index * 7 + index,
+                    status=statuses[(index + category_index) % len(statuses)],
+                )
+        # задача без категории попадает только в общие показатели
+        create_history(self.user, None, self.to_date, 60, 60, HistoryTaskStatusChoices.SUCCESSFUL)
+        # за пределами периода
+        create_history(self.user, self.categories[0], self.from_date - timedelta(days=1), 60, 60, HistoryTaskStatusChoices.SUCCESSFUL)
+        # другой пользователь
+        create_history(self.other_user, self.categories[0], self.to_date, 60, 60, HistoryTaskStatusChoices.FAILED)
+
+        self.repository = HistoryRepository(History, connection)
+        self.use_case = GetUserHistoryUseCase(self.repository)
+
+    def _get_statistics_by_separate_queries(self, from_date: str, to_date: str) -> dict:
+        repository = self.repository
+        user_id = self.user.id
+        return {
+            'count_tasks_in_categories': repository.get_count_tasks_in_categories(user_id, from_date, to_date),
+            'common_accuracy': repository.get_common_accuracy(user_id, from_date, to_date),
+            'accuracy_by_categories': repository.get_accuracy_by_categories(user_id, from_date, to_date),
+            'common_success_rate': list(repository.get_common_success_rate(user_id, from_date, to_date)),
+            'success_rate_by_categories': repository.get_success_rate_by_categories(user_id, from_date, to_date),
+            'count_tasks_by_weekdays': repository.get_count_tasks_by_weekdays(user_id, from_date, to_date),
+            'common_successful_planning_rate': list(repository.get_common_successful_planning_rate(user_id, from_date, to_date)),
+            'count_successful_planned_tasks_by_categories': repository.get_count_successful_planned_tasks_by_categories(user_id, from_date, to_date),
+        }
+
+    def _normalize_chart(self, chart: dict) -> list:
+        # порядок категорий в части графиков не задан, сравниваем наборы
+        if chart['labels'] is None:
+            return []
+        return sorted(zip(*[chart[key] for key in sorted(chart.keys())]))
+
+    def test_single_statement_matches_separate_queries(self):
+        """Тест совпадения всех блоков статистики"""
+        from_date, to_date = str(self.from_date), str(self.to_date)
+        expected = self._get_statistics_by_separate_queries(from_date, to_date)
+        actual = self.repository.get_history_statistics(self.user.id, from_date, to_date)
+
+        self.assertEqual(set(actual.keys()), set(expected.keys()))
+        for key in ['count_tasks_in_categories', 'accuracy_by_categories', 'success_rate_by_categories', 'count_successful_planned_tasks_by_categories']:
+            with self.subTest(block=key):
+                self.assertEqual(self._normalize_chart(actual[key]), self._normalize_chart(expected[key]))
+        self.assertEqual(actual['count_tasks_by_weekdays'], expected['count_tasks_by_weekdays'])
+        self.assertAlmostEqual(actual['common_accuracy'], float(expected['common_accuracy']))
+        self.assertEqual(actual['common_success_rate'], expected['common_success_rate'])
+        self.assertEqual(actual['common_successful_planning_rate'], expected['common_successful_planning_rate'])
+
+    def test_use_case_single_round_trip(self):
+        """Тест того, что ответ /api/history/ собирается одним запросом"""
+        with self.assertNumQueries(1):
+            result = self.use_case.execute(self.user.id, str(self.from_date), str(self.to_date))
+        self.assertEqual(set(result.keys()), {'statistics', 'is_stale'})
+        self.assertEqual(
+            set(result['statistics'].keys()),
+            {
+                'countUserTasksInCategories',
+                'commonUserAccuracy',
+                'userAccuracyByCategories',
+                'commonUserSuccessRate',
+                'userSuccessRateByCategories',
+                'countUserTasksByWeekdays',
+                'commonUserSuccessfulPlanningRate',
+                'countUserSuccessfulPlannedTasksByCategories',
+            }
+        )
+
+    def test_empty_period(self):
+        """Тест пустого периода - все блоки статистики вычищаются"""
+        from_date = str(self.from_date - timedelta(days=400))
+        to_date = str(self.from_date - timedelta(days=300))
+        result = self.use_case.execute(self.user.id, from_date, to_date)
+        self.assertEqual(result, {'statistics': {}, 'is_stale': False})
+
+    def test_history_view(self):
+        """Тест ответа эндпоинта истории"""
+        self.client.login(username='statsuser', password='testpass123')
+        response = self.client.get(
+            '/api/history/',
+            {'from_date': str(self.from_date), 'to_date': str(self.to_date)}
+        )
+        self.assertEqual(response.status_code, 200)
+        context = response.json()['context']
+        self.assertEqual(context['statistics']['commonUserSuccessRate']['data'], round(12 / 17 * 100, 2))
+
+
+class HistoryPageTest(TestCase):
+    """Постраничный список истории должен отдавать весь период без пропусков и повторов"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='pageuser',
+            email='page@example.com',
+            password='testpass123',
+        )
+        self.category = Category.objects.create(
+            name='Page category',
+            color='rgba(0, 0, 255, 0.4)',
+            user=self.user,
+            is_custom=True,
+        )
+        self.to_date = date.today()
+        self.from_date = self.to_date - timedelta(days=30)
+        # несколько записей на одну дату, чтобы курсор различал их по id
+        for index in range(23):
+            create_history(
+                self.user,
+                self.category,
+                self.to_date - timedelta(days=index // 3),
+                60, 60,
+                HistoryTaskStatusChoices.SUCCESSFUL,
+            )
+        create_history(self.user, self.category, self.from_date - timedelta(days=1), 60, 60, HistoryTaskStatusChoices.SUCCESSFUL)
+
+        self.repository = HistoryRepository(History, connection)
+        self.use_case = GetUserHistoryPageUseCase(self.repository)
+
+    def _walk_pages(self, page_size: int) -> list[int]:
+        ids, cursor = [], None
+        while True:
+            with self.assertNumQueries(1):
+                page = self.use_case.execute(
+                    self.user.id, str(self.from_date), str(self.to_date),
+                    cursor=cursor, page_size=page_size,
+                )
+            self.assertLessEqual(len(page['history']), page_size)
+            ids.extend(item['id'] for item in page['history'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                return ids
+
+    def test_pages_cover_period(self):
+        """Тест того, что страницы вместе дают ту же историю, что и полный список"""
+        expected = [
+            item['id'] for item in
+            self.repository.get_history(self.user.id, str(self.from_date), str(self.to_date))
+        ]
+        for page_size in [1, 5, 23, 50]:
+            with self.subTest(page_size=page_size):
+                ids = self._walk_pages(page_size)
+                self.assertEqual(len(ids), len(set(ids)))
+                self.assertEqual(sorted(ids), sorted(expected))
+        self.assertEqual(
+            ids,
+            list(
+                History.objects.filter(id__in=ids)
+                .order_by('-execution_date', '-id').values_list('id', flat=True)
+            )
+        )
+
+    def test_page_size_is_capped(self):
+        """Тест ограничения размера страницы"""
+        page = self.use_case.execute(
+            self.user.id, str(self.from_date), str(self.to_date),
+            page_size=GetUserHistoryPageUseCase.MAX_PAGE_SIZE * 10,
+        )
+        self.assertEqual(len(page['history']), 23)
+        self.assertIsNone(page['next_cursor'])
+        for page_size in [0, -1, 'many']:
+            with self.subTest(page_size=page_size):
+                with self.assertRaises(ValidationError):
+                    self.use_case.execute(
+                        self.user.id, str(self.from_date), str(self.to_date), page_size=page_size
+                    )
+
+    def test_invalid_cursor(self):
+        """Тест отказа для испорченного курсора"""
+        for cursor in ['not-a-cursor', 'W10=', 'WyJ4IiwgMV0=']:
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(ValidationError):
+                    self.use_case.execute(
+                        self.user.id, str(self.from_date), str(self.to_date), cursor=cursor
+                    )
+
+    def test_history_list_view(self):
+        """Тест ответа эндпоинта списка истории"""
+        self.client.login(username='pageuser', password='testpass123')
+        params = {'from_date': str(self.from_date), 'to_date': str(self.to_date), 'page_size': 20}
+        response = self.client.get('/api/history/list/', params)
+        self.assertEqual(response.status_code, 200)
+        first_page = response.json()
+        self.assertEqual(len(first_page['history']), 20)
+        self.assertIsNotNone(first_page['next_cursor'])
+
+        response = self.client.get('/api/history/list/', {**params, 'cursor': first_page['next_cursor']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['history']), 3)
+        self.assertIsNone(response.json()['next_cursor'])
+
+        self.assertEqual(self.client.get('/api/history/list/', {'from_date': str(self.from_date)}).status_code, 400)
+        self.assertEqual(self.client.get('/api/history/list/', {**params, 'cursor': 'broken'}).status_code, 400)
@@ -0,0 +1,192 @@
+import threading
+import time
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.contrib.auth import get_user_model
+
+from core.cache import StaleWhileRevalidateCache, UserVersion, history_version
+from task.models import Category
+from .models import History
+from .infrastructure import HistoryRepository
+from .services import GetUserHistoryUseCase
+from .tests_statistics import create_history
+from .constants.choices import HistoryTaskStatusChoices
+
+User = get_user_model()
+
+
+class InlineExecutor:
+    """Выполняет фоновый пересчет сразу, чтобы он видел данные теста"""
+
+    def submit(self, function, *args):
+        function(*args)
+
+
+class HistoryStatisticsCacheTest(TestCase):
+    """Статистика периода читается из кеша, а после записи отдается устаревшей до пересчета"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='statscacheuser',
+            email='statscache@example.com',
+            password='testpass123',
+        )
+        self.category = Category.objects.create(
+            name='Stats cache category',
+            color='rgba(255, 0, 0, 0.4)',
+            user=self.user,
+            is_custom=True,
+        )
+        self.to_date = str(date.today())
+        self.from_date = str(date.today() - timedelta(days=7))
+        create_history(self.user, self.category, date.today(), 60, 60, HistoryTaskStatusChoices.SUCCESSFUL)
+        self.statistics_cache = StaleWhileRevalidateCache(
+            'test-history-statistics', history_version, executor=InlineExecutor()
+        )
+        self.use_case = GetUserHistoryUseCase(
+            HistoryRepository(History, connection), self.statistics_cache
+        )
+
+    def _execute(self) -> dict:
+        return self.use_case.execute(self.user.id, self.from_date, self.to_date)
+
+    def _success_rate(self, result: dict) -> float:
+        return result['statistics']['commonUserSuccessRate']['data']
+
+    def test_repeated_reads_are_served_from_cache(self):
+        """Тест повторного чтения без запросов к базе"""
+        first = self._execute()
+        with self.assertNumQueries(0):
+            second = self._execute()
+        self.assertEqual(first, second)
+        self.assertFalse(second['is_stale'])
+
+    def test_stale_result_then_recomputed(self):
+        """Тест отдачи прошлой статистики после записи и пересчета в фоне"""
+        self.assertEqual(self._success_rate(self._execute()), 100.0)
+        create_history(self.user, self.category, date.today(), 60, 60, HistoryTaskStatusChoices.FAILED)
+        history_version.bump(self.user.id)
+
+        stale = self._execute()
+        self.assertTrue(stale['is_stale'])
+        self.assertEqual(self._success_rate(stale), 100.0)
+
+        with self.assertNumQueries(0):
+            fresh = self._execute()
+        self.assertFalse(fresh['is_stale'])
+        self.assertEqual(self._success_rate(fresh), 50.0)
+
+    def test_periods_are_cached_separately(self):
+        """Тест того, что разные периоды не подменяют друг друга"""
+        self._execute()
+        other_period = self.use_case.execute(
+            self.user.id, str(date.today() - timedelta(days=60)), str(date.today() - timedelta(days=30))
+        )
+        self.assertEqual(other_period['statistics'], {})
+        self.assertEqual(self._success_rate(self._execute()), 100.0)
+
+    def test_metrics(self):
+        """Тест счетчиков попаданий и времени пересчета"""
+        self._execute()
+        self._execute()
+        history_version.bump(self.user.id)
+        self._execute()
+        metrics = self.statistics_cache.metrics.snapshot()
+        self.assertEqual(metrics['hits'], 1)
+        self.assertEqual(metrics['stale_hits'], 1)
+        self.assertEqual(metrics['misses'], 1)
+        self.assertEqual(metrics['recomputes'], 2)
+        self.assertEqual(metrics['hit_ratio'], round(2 / 3, 4))
+        self.assertGreaterEqual(metrics['recompute_avg_ms'], 0)
+
+    def test_history_view_marks_stale_response(self):
+        """Тест запрета сохранять устаревший ответ на клиенте"""
+        self.client.login(username='statscacheuser', password='testpass123')
+        params = {'from_date': self.from_date, 'to_date': self.to_date}
+        with patch.object(StaleWhileRevalidateCache, '_executor', InlineExecutor()):
+            response = self.client.get('/api/history/', params)
+            self.assertFalse(response.json()['context']['is_stale'])
+            self.assertFalse(response.has_header('Cache-Control'))
+
+            history_version.bump(self.user.id)
+            response = self.client.get('/api/history/', params)
+            self.assertTrue(response.json()['context']['is_stale'])
+            self.assertEqual(response['Cache-Control'], 'no-store')
+
+            response = self.client.get('/api/history/', params)
+            self.assertFalse(response.json()['context']['is_stale'])
+
+
+class StaleWhileRevalidateCoalescingTest(TestCase):
+    """Одновременные одинаковые запросы должны запускать один пересчет"""
+
+    def setUp(self):
+        cache.clear()
+        self.version = UserVersion('test-coalescing')
+        self.user_id = 'coalescing-user'
+        self.computations = 0
+        self.computations_lock = threading.Lock()
+
+    def _compute(self) -> dict:
+        with self.computations_lock:
+            self.computations += 1
+        time.sleep(0.2)
+        return {'value': 42}
+
+    def _run_concurrently(self, statistics_cache: StaleWhileRevalidateCache, threads_count: int) -> list:
+        barrier = threading.Barrier(threads_count)
+        results = [None] * threads_count
+
+        def request(index: int):
+            barrier.wait()
+            results[index] = statistics_cache.get_or_compute(self.user_id, 'period', self._compute)
+
+        threads = [threading.Thread(target=request, args=(index,)) for index in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_misses_compute_once(self):
+        """Тест одного вычисления на несколько одновременных промахов"""
+        statistics_cache = StaleWhileRevalidateCache('test-coalescing-miss', self.version)
+        results = self._run_concurrently(statistics_cache, 6)
+        self.assertEqual(self.computations, 1)
+        self.assertEqual([result.value for result in results], [{'value': 42}] * 6)
+        metrics = statistics_cache.metrics.snapshot()
+        self.assertEqual(metrics['misses'], 1)
+        self.assertEqual(metrics['coalesced'], 5)
+
+    def test_concurrent_stale_reads_schedule_one_recompute(self):
+        """Тест одного фонового пересчета на несколько устаревших чтений"""
+        executor = InlineExecutor()
+        submitted = []
+        executor.submit = lambda function, *args: submitted.append((function, args))
+        statistics_cache = StaleWhileRevalidateCache('test-coalescing-stale', self.version, executor=executor)
+        statistics_cache.get_or_compute(self.user_id, 'period', self._compute)
+        self.version.bump(self.user_id)
+
+        results = self._run_concurrently(statistics_cache, 6)
+        self.assertEqual([result.status for result in results], ['stale'] * 6)
+        self.assertEqual(len(submitted), 1)
+
+        function, args = submitted[0]
+        function(*args)
+        self.assertEqual(self.computations, 2)
+        self.assertEqual(statistics_cache.get_or_compute(self.user_id, 'period', self._compute).status, 'hit')
+
+    def test_wait_timeout_keeps_foreign_lock(self):
+        """Тест запроса, не дождавшегося чужого пересчета: блокировка исполнителя остается"""
+        statistics_cache = StaleWhileRevalidateCache('test-coalescing-timeout', self.version, wait_timeout=0.1)
+        lock_key = f'test-coalescing-timeout:{self.user_id}:period:lock'
+        cache.add(lock_key, self.version.get(self.user_id))
+
+        result = statistics_cache.get_or_compute(self.user_id, 'period', self._compute)
+        self.assertEqual(result.status, 'miss')
+        self.assertIsNotNone(cache.get(lock_key))
@@ -0,0 +1,98 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+
+from task.models import Task, Category
+from user.validators import timezone_validator
+from .models import History
+from .constants.choices import HistoryTaskStatusChoices
+
+User = get_user_model()
+
+
+class UserTimezoneTest(TestCase):
+    """Сегодняшний день должен считаться по часовому поясу пользователя"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='timezoneuser',
+            email='timezone@example.com',
+            password='testpass123',
+            timezone='Pacific/Kiritimati',
+        )
+        self.category = Category.objects.create(
+            name='Timezone category',
+            color='rgba(0, 0, 255, 0.4)',
+            user=self.user,
+            is_custom=True,
+        )
+        # в полдень по UTC в Киритимати (UTC+14) уже следующий день
+        self.utc_now = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        self.utc_today = self.utc_now.date()
+        self.local_today = self.utc_today + timedelta(days=1)
+        self.client.login(username='timezoneuser', password='testpass123')
+
+    def _create_task(self, name: str, deadline) -> Task:
+        return Task.objects.create(
+            name=name,
+            order=Task.objects.filter(user=self.user).count() + 1,
+            category=self.category,
+            user=self.user,
+            deadline=deadline,
+            planned_time=timedelta(hours=1),
+        )
+
+    def test_today_statistics_use_user_calendar(self):
+        """Тест задач на сегодня по местной дате пользователя"""
+        self._create_task('Local today', self.local_today)
+        self._create_task('UTC today', self.utc_today)
+        with patch('django.utils.timezone.now', return_value=self.utc_now):
+            response = self.client.get('/api/today-statistics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [task['name'] for task in response.json()['tasks']['planned']],
+            ['Local today']
+        )
+
+    def test_move_to_history_stamps_local_date(self):
+        """Тест даты выполнения и статуса по местной дате пользователя"""
+        task = self._create_task('Deadline UTC today', self.utc_today)
+        with patch('django.utils.timezone.now', return_value=self.utc_now):
+            response = self.client.post(
+                f'/api/history/move-to-history/{task.id}/',
+                {'execution_time': '01:00:00', 'successful': 'true'},
+            )
+            self.assertEqual(response.status_code, 201)
+            history = History.objects.get(user=self.user)
+            self.assertEqual(history.execution_date, self.local_today)
+            self.assertEqual(history.status, HistoryTaskStatusChoices.OUT_OF_DEADLINE)
+
+            task = self._create_task('Deadline local today', self.local_today)
+            self.client.post(
+                f'/api/history/move-to-history/{task.id}/',
+                {'execution_time': '01:00:00', 'successful': 'true'},
+            )
+            response = self.client.get('/api/history/today-statistics/')
+        self.assertEqual(
+            [task['name'] for task in response.json()['tasks']],
+            ['Deadline local today']
+        )
+
+    def test_timezone_is_deactivated_after_request(self):
+        """Тест того, что часовой пояс пользователя не остается в потоке после запроса"""
+        self.client.get('/api/today-statistics/')
+        self.assertEqual(timezone.get_current_timezone_name(), 'UTC')
+
+    def test_timezone_validator(self):
+        """Тест проверки названия часового пояса"""
+        self.assertEqual(timezone_validator('Europe/Moscow'), 'Europe/Moscow')
+        for timezone_name in ['Mars/Olympus', '', '../etc/passwd']:
+            with self.subTest(timezone_name=timezone_name):
+                with self.assertRaises(ValidationError):
+                    timezone_validator(timezone_name)
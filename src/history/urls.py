@@ -6,11 +6,13 @@ app_name = 'history'
 
 urlpatterns = [
     path('', views.HistoryView.as_view(), name='history'),
+    path('list/', views.HistoryListView.as_view(), name='history_list'),
     path('share/', views.ShareHistoryView.as_view(), name='share'),
     path('my-shared-histories/', views.GetUserSharedHistories.as_view(), name='user_shared_histories'),
     path('delete-shared-history/<str:history_key>/', views.SharedHistoryDeletionView.as_view(), name='delete_shared_history'),
     path('delete-history/<int:history_id>/', views.HistoryDeletionView.as_view(), name='delete_history'),
     path('move-to-history/<int:task_id>/', views.MoveTaskToHistoryView.as_view(), name='task_completion'),
+    path('move-to-history/', views.MoveTasksToHistoryView.as_view(), name='tasks_completion'),
     path('today-statistics/', views.HistoryForTodayView.as_view(), name='today_history_statistics'),
 ]
 
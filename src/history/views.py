@@ -1,22 +1,43 @@
+import json
+
 from django.urls import reverse_lazy
 from django.views.generic import View, ListView
-from django.db import connection
 from django.utils.datastructures import MultiValueDictKeyError
 from django.http import HttpResponseBadRequest, JsonResponse, HttpResponseForbidden, HttpResponseNotFound
 from django.core.exceptions import ValidationError, ObjectDoesNotExist
 
-from task.infrastructure import TaskRepository
-from task.models import Task
 from history.models import History, SharedHistory
-from core.mixins import ApiLoginRequiredMixin
-from .services import ShareHistoryService, MoveTaskToHistoryUseCase, GetUserHistoryUseCase, HistoryService, ShareHistoryUseCase
-from .infrastructure import HistoryRepository, SharedHistoryRepository
+from core.cache import StaleWhileRevalidateCache, history_version
+from core.container import RequestScoped
+from core.mixins import ApiLoginRequiredMixin, UserVersionETagMixin
+from .services import ShareHistoryService, MoveTaskToHistoryUseCase, MoveTasksToHistoryUseCase, GetUserHistoryUseCase, GetUserHistoryPageUseCase, HistoryService, ShareHistoryUseCase
+from .infrastructure import HistoryRepository, AsyncHistoryRepository, SharedHistoryRepository
+
+# кеш и его фоновый поток общие для всех запросов, репозитории создаются на каждый запрос
+statistics_cache = StaleWhileRevalidateCache('history-statistics', history_version)
+
+history_repository = RequestScoped(
+    lambda container: HistoryRepository(History, container.connection)
+)
+# статистика и списки истории читаются с реплики, если она есть (см. core.routers)
+history_read_repository = RequestScoped(
+    lambda container: HistoryRepository(History, container.read_connection)
+)
+async_history_repository = RequestScoped(
+    lambda container: AsyncHistoryRepository(History, container.async_read_connection)
+)
+shared_history_repository = RequestScoped(
+    lambda container: SharedHistoryRepository(SharedHistory, container.connection)
+)
 
 
 class MoveTaskToHistoryView(
             ApiLoginRequiredMixin, 
             View,
         ):
+    use_case = RequestScoped(lambda container: MoveTaskToHistoryUseCase(
+        history_repository=history_repository.resolve(container),
+    ))
 
     def dispatch(self, request, *args, **kwargs):
         try:
@@ -29,14 +50,7 @@ class MoveTaskToHistoryView(
             return JsonResponse({'context': error.messages}, status=400)
 
     def post(self, request, task_id: int):
-        use_case = MoveTaskToHistoryUseCase(
-            task_repository=TaskRepository(Task, connection),
-            history_repository=HistoryRepository(
-                History, 
-                connection,
-            )
-        )
-        use_case.execute(
+        self.use_case.execute(
             self.request.user.id, 
             task_id,
             self.request.POST['execution_time'],
@@ -45,18 +59,50 @@ class MoveTaskToHistoryView(
         return JsonResponse({}, status=201)
 
 
+class MoveTasksToHistoryView(
+            ApiLoginRequiredMixin,
+            View,
+        ):
+    '''
+    Принимает json вида {"tasks": [{"task_id": 1, "execution_time": "01:30:00", "successful": true}, ...]}
+    и возвращает результат переноса по каждой задаче в том же порядке
+    '''
+    use_case = RequestScoped(lambda container: MoveTasksToHistoryUseCase(
+        history_repository.resolve(container),
+    ))
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except (ValueError, KeyError, TypeError):
+            return HttpResponseBadRequest(
+                '<h1>400 Bad Request</h1><p>Некорректный формат данных</p>'
+            )
+
+    def post(self, request):
+        post_data = self.request.body.decode('utf-8')
+        post_data_json = json.loads(post_data)
+
+        results = self.use_case.execute(self.request.user.id, post_data_json['tasks'])
+
+        return JsonResponse({'results': results})
+
+
 class HistoryView(
         ApiLoginRequiredMixin, 
+        UserVersionETagMixin,
         View
     ):
-    use_case = GetUserHistoryUseCase(
-        HistoryRepository(
-            History, 
-            connection
-        )
-    )
+    # история хранит названия и цвета категорий, поэтому записи
+    # категорий тоже увеличивают версию истории
+    etag_versions = (history_version,)
+    use_case = RequestScoped(lambda container: GetUserHistoryUseCase(
+        history_read_repository.resolve(container),
+        statistics_cache,
+        async_history_repository.resolve(container),
+    ))
 
-    def get(self, request):
+    async def get(self, request):
         try:
             from_date = self.request.GET['from_date']
             to_date = self.request.GET['to_date']
@@ -71,11 +117,61 @@ class HistoryView(
                 '''
             )
         try:
-            context = self.use_case.execute(
+            context = await self.use_case.aexecute(
                 self.request.user.id, 
                 from_date, to_date
             )
-            return JsonResponse({'context': context})
+            response = JsonResponse({'context': context})
+            if context['is_stale']:
+                # ETag уже посчитан по новой версии истории, а тело старое,
+                # поэтому такой ответ клиент не должен сохранять
+                response['Cache-Control'] = 'no-store'
+            return response
+
+        except ValidationError as exc:
+            return HttpResponseBadRequest(
+                f'<h1>400</h1><p>{exc.message}</p>'
+            )
+
+
+class HistoryListView(
+        ApiLoginRequiredMixin,
+        UserVersionETagMixin,
+        View
+    ):
+    '''
+    Список истории за период постранично. Принимает query-параметры:
+    from_date, to_date: str - даты в формате YYYY-MM-DD
+    cursor: str - next_cursor из предыдущей страницы, для первой не передается
+    page_size: int - размер страницы, не больше GetUserHistoryPageUseCase.MAX_PAGE_SIZE
+    '''
+    etag_versions = (history_version,)
+    use_case = RequestScoped(lambda container: GetUserHistoryPageUseCase(
+        history_read_repository.resolve(container),
+    ))
+
+    def get(self, request):
+        try:
+            from_date = self.request.GET['from_date']
+            to_date = self.request.GET['to_date']
+        except MultiValueDictKeyError:
+            return HttpResponseBadRequest(
+                '''
+                <h1>400</h1>
+                <p>
+                Для запроса истории в ссылке должны быть переданы query-параметры,
+                которые должны включать временной интервал, по которому будет показана история!
+                </p>
+                '''
+            )
+        try:
+            page = self.use_case.execute(
+                self.request.user.id,
+                from_date, to_date,
+                cursor=self.request.GET.get('cursor'),
+                page_size=self.request.GET.get('page_size'),
+            )
+            return JsonResponse(page)
 
         except ValidationError as exc:
             return HttpResponseBadRequest(
@@ -87,12 +183,10 @@ class HistoryForTodayView(
         ApiLoginRequiredMixin, 
         View
     ):
-    use_case = HistoryService(
-            HistoryRepository(
-                History, 
-                connection
-            )
-        )
+    use_case = RequestScoped(lambda container: HistoryService(
+        history_read_repository.resolve(container),
+    ))
+
     def get(self, request):
         today_history_statistics = self.use_case.get_user_history_statistics_for_today(
                 self.request.user.id
@@ -101,18 +195,16 @@ class HistoryForTodayView(
 
 
 class ShareHistoryView(View):
-    use_case = ShareHistoryUseCase(
-            SharedHistoryRepository(
-                SharedHistory, 
-                connection
-            ),
-            GetUserHistoryUseCase(
-                HistoryRepository(
-                    History, 
-                    connection
-                )
-            )
-        )
+    use_case = RequestScoped(lambda container: ShareHistoryUseCase(
+        shared_history_repository.resolve(container),
+        GetUserHistoryUseCase(
+            history_repository.resolve(container),
+        ),
+        history_repository.resolve(container),
+    ))
+    service = RequestScoped(lambda container: ShareHistoryService(
+        shared_history_repository.resolve(container),
+    ))
 
     def post(self, request):
         try:
@@ -142,13 +234,7 @@ class ShareHistoryView(View):
 
     def get(self, request):
         try:
-            service = ShareHistoryService(
-                SharedHistoryRepository(
-                    SharedHistory, 
-                    connection
-                )
-            )
-            context = service.get_shared_history_by_key(self.request.GET['key'])
+            context = self.service.get_shared_history_by_key(self.request.GET['key'])
             return JsonResponse(context)
         except ObjectDoesNotExist:
             return HttpResponseNotFound(
@@ -162,12 +248,9 @@ class GetUserSharedHistories(
         ):
     template_name = 'history/user_shared_histories.html'
     context_object_name = 'histories'
-    use_case = ShareHistoryService(
-            SharedHistoryRepository(
-                SharedHistory, 
-                connection
-            )
-        )
+    use_case = RequestScoped(lambda container: ShareHistoryService(
+        shared_history_repository.resolve(container),
+    ))
 
     def get_queryset(self):
         return self.use_case.get_user_shared_histories(self.request.user.id)
@@ -177,12 +260,9 @@ class SharedHistoryDeletionView(
             ApiLoginRequiredMixin, 
             View
         ):
-    use_case = ShareHistoryService(
-            SharedHistoryRepository(
-                SharedHistory, 
-                connection
-            )
-        )
+    use_case = RequestScoped(lambda container: ShareHistoryService(
+        shared_history_repository.resolve(container),
+    ))
 
     def dispatch(self, request, *args, **kwargs):
         try:
@@ -215,12 +295,9 @@ class HistoryDeletionView(
             ApiLoginRequiredMixin, 
             View
         ):
-    use_case = HistoryService(
-        HistoryRepository(
-            History,
-            connection
-        )
-    )
+    use_case = RequestScoped(lambda container: HistoryService(
+        history_repository.resolve(container),
+    ))
 
     def dispatch(self, request, *args, **kwargs):
         try:
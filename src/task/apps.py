@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class TaskConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'task'
+
+    def ready(self):
+        # базовые категории создаются миграциями, поэтому справочник
+        # перечитывает их после migrate и flush, а не при старте процесса
+        post_migrate.connect(_reset_base_categories, sender=self)
+
+
+def _reset_base_categories(**kwargs) -> None:
+    from .infrastructure import CategoryDirectory
+
+    CategoryDirectory.reset_base_categories()
@@ -223,6 +223,11 @@ class CategoryEntity:
         return rgba
 
 class TaskEntity:
+
+    # шаг между соседними задачами, в промежуток помещается
+    # около десяти последовательных перемещений без перенумерации
+    ORDER_STEP = 1024
+
     def __init__(
             self,
             name: str,
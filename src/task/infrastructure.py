@@ -1,14 +1,22 @@
 from abc import ABC, abstractmethod
-from typing import Union, Type
+from datetime import date
+from typing import Optional, Union, Type
 from uuid import UUID
 
 from django.utils.connection import ConnectionProxy
 
+from core.cache import VersionedUserCache, tasks_version, categories_version, history_version
+from core.db import JsonPassthroughRepositoryMixin, QueryBatchRepositoryMixin, QueryBatch, AsyncRepositoryMixin, AsyncQueryBatch, RepositoryQuery
+from history.constants.choices import HistoryTaskStatusChoices
 from .models import Category, Task
 from .domain import TaskEntity, CategoryEntity
 
 
 class TaskRepositoryInterface(ABC):
+    @abstractmethod
+    def batch(self) -> QueryBatch:
+        pass
+
     @abstractmethod
     def get_ordered_user_tasks_json(self, user_id: UUID) -> list[dict[str, Union[str, int]]]:
         pass
@@ -43,16 +51,49 @@ class TaskRepositoryInterface(ABC):
     def get_next_task_order(self, user_id: UUID) -> int:
         pass
 
+    @abstractmethod
+    def create_task(self, task_entity: TaskEntity) -> TaskEntity:
+        pass
+
     @abstractmethod
     def update_user_tasks_order(self, user_id: UUID, new_order: list[str]) -> None:
         pass
 
     @abstractmethod
-    def get_count_user_tasks_in_categories_for_today(self, user_id: UUID) -> list[dict[str, Union[str, int]]]:
+    def get_user_tasks_order_for_update(
+            self,
+            user_id: UUID,
+            task_ids: list[int],
+        ) -> dict[int, int]:
+        pass
+
+    @abstractmethod
+    def update_user_task_order(self, user_id: UUID, task_id: int, order: int) -> None:
+        pass
+
+    @abstractmethod
+    def rebalance_user_tasks_order(self, user_id: UUID) -> None:
+        pass
+
+    @abstractmethod
+    def update_user_tasks_deadlines(
+            self,
+            user_id: UUID,
+            task_ids: list[int],
+            deadlines: list[date],
+        ) -> int:
         pass
 
     @abstractmethod
-    def get_user_tasks_for_today_json(self, user_id: UUID) -> list[dict[str, Union[str, int]]]:
+    def get_count_user_tasks_in_categories_for_today(self, user_id: UUID, today: date) -> list[dict[str, Union[str, int]]]:
+        pass
+
+    @abstractmethod
+    def get_user_tasks_for_today_json(self, user_id: UUID, today: date) -> list[dict[str, Union[str, int]]]:
+        pass
+
+    @abstractmethod
+    def get_user_today_statistics_json(self, user_id: UUID, today: date) -> dict[str, dict[str, list[dict[str, Union[str, int]]]]]:
         pass
 
     @abstractmethod
@@ -64,6 +105,28 @@ class TaskRepositoryInterface(ABC):
         pass
 
 
+class AsyncTaskReadRepositoryInterface(ABC):
+    @abstractmethod
+    def abatch(self) -> AsyncQueryBatch:
+        pass
+
+    @abstractmethod
+    async def aget_ordered_user_tasks_json(self, user_id: UUID) -> list[dict[str, Union[str, int]]]:
+        pass
+
+    @abstractmethod
+    async def aget_count_user_tasks_in_categories(self, user_id: UUID) -> dict[str, Union[list[int], list[str]]]:
+        pass
+
+    @abstractmethod
+    async def aget_user_tasks_by_deadlines(self, user_id: UUID) -> dict[str, list[dict[str, Union[str, int]]]]:
+        pass
+
+    @abstractmethod
+    async def aget_user_today_statistics_json(self, user_id: UUID, today: date) -> dict[str, dict[str, list[dict[str, Union[str, int]]]]]:
+        pass
+
+
 class CategoryRepositoryInterface(ABC):
     @abstractmethod
     def get_category_by_id(self, category_id: int) -> CategoryEntity:
@@ -76,6 +139,14 @@ class CategoryRepositoryInterface(ABC):
             ) -> list[dict[str, Union[str, int]]]:
         pass
 
+    @abstractmethod
+    def get_base_categories(self) -> list[CategoryEntity]:
+        pass
+
+    @abstractmethod
+    def get_user_custom_categories(self, user_id: UUID) -> list[CategoryEntity]:
+        pass
+
     @abstractmethod
     def delete_category(self, category_entity: CategoryEntity) -> None:
         pass
@@ -84,38 +155,70 @@ class CategoryRepositoryInterface(ABC):
     def save_category(self, category_entity: CategoryEntity) -> None:
         pass
 
-class TaskRepository(TaskRepositoryInterface):
-    def __init__(self, model: Type[Task], connection: ConnectionProxy):
-        self._model = model
-        self._connection = connection
 
-    def get_ordered_user_tasks_json(self, user_id: UUID) -> list[dict[str, Union[str, int]]]:
-        cursor = self._connection.cursor()
-        cursor.execute(
+class AsyncCategoryReadRepositoryInterface(ABC):
+    @abstractmethod
+    async def aget_ordered_user_categories_json(self, user_id: UUID) -> list[dict[str, Union[str, int]]]:
+        pass
+
+    @abstractmethod
+    async def aget_base_categories(self) -> list[CategoryEntity]:
+        pass
+
+    @abstractmethod
+    async def aget_user_custom_categories(self, user_id: UUID) -> list[CategoryEntity]:
+        pass
+
+
+class CategoryDirectoryInterface(ABC):
+    @abstractmethod
+    def get_user_category(
+                self,
+                category_id: int,
+                user_id: UUID
+            ) -> CategoryEntity:
+        pass
+
+    @abstractmethod
+    def get_ordered_user_categories_json(
+                self,
+                user_id: UUID
+            ) -> list[dict[str, Union[str, int]]]:
+        pass
+
+    @abstractmethod
+    async def aget_ordered_user_categories_json(
+                self,
+                user_id: UUID
+            ) -> list[dict[str, Union[str, int]]]:
+        pass
+
+
+class TaskReadQueriesMixin(JsonPassthroughRepositoryMixin):
+    '''
+    Запросы чтения задач, общие для TaskRepository и AsyncTaskRepository.
+    Методы возвращают запрос для _execute или _aexecute.
+    '''
+
+    def _get_ordered_user_tasks_json_query(self, user_id: UUID) -> RepositoryQuery:
+        return (
+            self._get_json_cursor(),
             '''
-            SELECT array_agg(
-                json_build_object('id', tt.id, 'name', tt.name) ORDER BY "order"
+            SELECT json_agg(
+                json_build_object('id', tt.id, 'name', tt.name) ORDER BY "order", tt.id
             )
             FROM task_task tt
-            WHERE tt.user_id = %s
-            GROUP BY tt.user_id;
+            WHERE tt.user_id = %s;
             ''',
-            [user_id]
+            [user_id],
+            lambda cursor: self._fetch_json(cursor, default=[])
         )
-        rows = cursor.fetchall()
-        return rows[0][0] if len(rows) > 0 else []
-    
-    def get_ordered_user_tasks(self, user_id: UUID) -> list[TaskEntity]:
-        return self._model.objects.filter(user_id=user_id).order_by('order').to_entity_list()
 
-    def get_task_by_id(self, task_id: int) -> TaskEntity:
-        return self._model.objects.get(id=task_id).to_domain()
-
-    def get_count_user_tasks_in_categories(
+    def _get_count_user_tasks_in_categories_query(
                 self, user_id: UUID
-            ) -> dict[str, Union[list[int], list[str]]]:
-        cursor = self._connection.cursor()
-        cursor.execute(
+            ) -> RepositoryQuery:
+        return (
+            self._get_json_cursor(),
             '''
             SELECT json_build_object(
                 'counts', array_agg(task_count), 
@@ -134,16 +237,16 @@ class TaskRepository(TaskRepositoryInterface):
                 GROUP BY tc.id
             ) subquery;
             ''', 
-            [user_id]
+            [user_id],
+            self._fetch_json
         )
-        return cursor.fetchall()[0][0]
 
-    def get_user_tasks_by_deadlines(
+    def _get_user_tasks_by_deadlines_query(
             self, 
             user_id: UUID
-        ) -> dict[str, list[dict[str, Union[str, int]]]]:
-        cursor = self._connection.cursor()
-        cursor.execute(
+        ) -> RepositoryQuery:
+        return (
+            self._get_json_cursor(),
             '''
             SELECT json_object_agg(subquery.deadline, subquery.tasks) 
             FROM
@@ -157,44 +260,339 @@ class TaskRepository(TaskRepositoryInterface):
                 GROUP BY tt.deadline
             ) AS subquery;
             ''',
-            [user_id]
+            [user_id],
+            self._fetch_json
         )
-        return cursor.fetchall()[0][0]
+
+    def _get_user_today_statistics_json_query(self, user_id: UUID, today: date) -> RepositoryQuery:
+        '''
+        Задачи на сегодня и выполненные сегодня задачи из истории одним
+        запросом. today - сегодняшняя дата в часовом поясе пользователя.
+        Возвращает {'tasks': {...}, 'categories': {...}}, где planned -
+        запланированные вместе с выполненными (выполненные в конце),
+        completed - только выполненные; в категориях planned количества
+        задач из обеих таблиц сложены.
+        '''
+        return (
+            self._get_json_cursor(),
+            '''
+            WITH today_items AS (
+                SELECT false AS is_completed, tt.id, tt.name, tt.category_id, tt.order
+                FROM task_task tt
+                WHERE tt.user_id = %(user_id)s AND tt.deadline = %(today)s
+                UNION ALL
+                SELECT true, hh.id, hh.name, hh.category_id, NULL
+                FROM history_history hh
+                WHERE hh.user_id = %(user_id)s AND hh.execution_date = %(today)s
+                AND hh.status = %(successful)s
+            ), items AS (
+                SELECT ti.is_completed, ti.id, ti.name, ti.order, tc.id AS category_id,
+                tc.name AS category_name, tc.color
+                FROM today_items ti
+                JOIN task_category tc ON tc.id = ti.category_id
+            ), categories AS (
+                SELECT category_id, category_name, color,
+                count(*) AS task_count,
+                count(*) FILTER (WHERE is_completed) AS completed_count,
+                bool_and(is_completed) AS only_completed
+                FROM items
+                GROUP BY category_id, category_name, color
+            )
+            SELECT
+                json_build_object(
+                    'planned', (
+                        SELECT coalesce(json_agg(
+                            json_build_object('id', id, 'name', name, 'color', color)
+                            ORDER BY is_completed, "order", id
+                        ), '[]')
+                        FROM items
+                    ),
+                    'completed', (
+                        SELECT coalesce(json_agg(
+                            json_build_object('id', id, 'name', name, 'color', color) ORDER BY id
+                        ), '[]')
+                        FROM items
+                        WHERE is_completed
+                    )
+                ),
+                json_build_object(
+                    'planned', (
+                        SELECT coalesce(json_agg(
+                            json_build_object('id', category_id, 'name', category_name, 'color', color, 'taskCount', task_count)
+                            ORDER BY only_completed, category_id
+                        ), '[]')
+                        FROM categories
+                    ),
+                    'completed', (
+                        SELECT coalesce(json_agg(
+                            json_build_object('id', category_id, 'name', category_name, 'color', color, 'taskCount', completed_count)
+                            ORDER BY category_id
+                        ), '[]')
+                        FROM categories
+                        WHERE completed_count > 0
+                    )
+                );
+            ''',
+            {'user_id': user_id, 'today': today, 'successful': HistoryTaskStatusChoices.SUCCESSFUL},
+            lambda cursor: self._fetch_json_columns(cursor, ('tasks', 'categories'))
+        )
+
+
+class TaskRepository(TaskReadQueriesMixin, QueryBatchRepositoryMixin, TaskRepositoryInterface):
+    def __init__(
+            self, 
+            model: Type[Task], 
+            connection: ConnectionProxy,
+            json_passthrough: bool = False,
+        ):
+        self._model = model
+        self._connection = connection
+        self._json_passthrough = json_passthrough
+
+    def get_ordered_user_tasks_json(self, user_id: UUID) -> list[dict[str, Union[str, int]]]:
+        return self._execute(*self._get_ordered_user_tasks_json_query(user_id))
+    
+    def get_ordered_user_tasks(self, user_id: UUID) -> list[TaskEntity]:
+        return self._model.objects.filter(user_id=user_id).order_by('order', 'id').to_entity_list()
+
+    def get_task_by_id(self, task_id: int) -> TaskEntity:
+        return self._model.objects.get(id=task_id).to_domain()
+
+    def get_count_user_tasks_in_categories(
+                self, user_id: UUID
+            ) -> dict[str, Union[list[int], list[str]]]:
+        return self._execute(*self._get_count_user_tasks_in_categories_query(user_id))
+
+    def get_user_tasks_by_deadlines(
+            self, 
+            user_id: UUID
+        ) -> dict[str, list[dict[str, Union[str, int]]]]:
+        return self._execute(*self._get_user_tasks_by_deadlines_query(user_id))
 
     def save_task(self, task_entity: TaskEntity) -> None:
         task = Task.from_domain(task_entity)
         task.clean_fields(exclude=['id'])
         task.save()
+        tasks_version.bump(task.user_id)
+
+    def create_task(self, task_entity: TaskEntity) -> TaskEntity:
+        '''
+        Создает задачу в конце списка пользователя одним запросом.
+        Порядок берется из счетчика пользователя (task_order_counter),
+        строку которого вставка блокирует до конца транзакции, поэтому
+        параллельные создания получают разные порядки. Счетчик не отстает
+        от max(order), если задачи переставили в конец списка.
+        Порядок из сущности игнорируется, id и порядок новой задачи
+        записываются в сущность.
+        '''
+        task = Task.from_domain(task_entity)
+        # категория проверяется в сценарии, пользователь - текущий
+        task.clean_fields(exclude=['id', 'order', 'category', 'user'])
+        cursor = self._connection.cursor()
+        cursor.execute(
+            '''
+            WITH next_order AS (
+                INSERT INTO task_order_counter AS counter (user_id, last_order)
+                SELECT %(user_id)s::uuid, coalesce(max(tt."order"), 0) + %(step)s
+                FROM task_task tt
+                WHERE tt.user_id = %(user_id)s::uuid
+                ON CONFLICT (user_id) DO UPDATE
+                SET last_order = greatest(
+                    counter.last_order, EXCLUDED.last_order - %(step)s
+                ) + %(step)s
+                RETURNING counter.last_order
+            )
+            INSERT INTO task_task (
+                name, description, "order", category_id, user_id,
+                deadline, planned_time
+            )
+            SELECT
+                %(name)s, %(description)s, next_order.last_order, %(category_id)s,
+                %(user_id)s::uuid, %(deadline)s, %(planned_time)s
+            FROM next_order
+            RETURNING id, "order";
+            ''',
+            {
+                'user_id': str(task.user_id),
+                'step': TaskEntity.ORDER_STEP,
+                'name': task.name,
+                'description': task.description,
+                'category_id': task.category_id,
+                'deadline': task.deadline,
+                'planned_time': task.planned_time,
+            }
+        )
+        task_id, order = cursor.fetchone()
+        tasks_version.bump(task.user_id)
+        return TaskEntity(
+            id=task_id,
+            name=task_entity.name,
+            description=task_entity.description,
+            order=order,
+            category_id=task_entity.category_id,
+            user_id=task_entity.user_id,
+            deadline=task_entity.deadline,
+            planned_time=task_entity.planned_time,
+        )
 
     def update_user_tasks_order(self, user_id: UUID, new_order: list[str]) -> None:
+        '''
+        Проверяет владельца и меняет порядок задач одним запросом.
+        Строки задач блокируются в порядке id до обновления, поэтому
+        параллельные перестановки одного пользователя ждут друг друга,
+        а не попадают во взаимную блокировку. Если хотя бы одна задача
+        не принадлежит пользователю или не существует, порядок не меняется
+        и выбрасывается PermissionError.
+        '''
         cursor = self._connection.cursor()
         cursor.execute(
             '''
             WITH order_cte AS (
                 SELECT order_array.id, order_array.new_order FROM
                 unnest(%s::int[]) WITH ordinality AS order_array(id, new_order)
+            ), locked_tasks AS (
+                SELECT tt.id
+                FROM task_task tt
+                WHERE tt.id IN (SELECT id FROM order_cte) AND tt.user_id = %s
+                ORDER BY tt.id
+                FOR UPDATE
+            ), ownership AS (
+                SELECT (SELECT count(*) FROM locked_tasks)
+                    = (SELECT count(DISTINCT id) FROM order_cte) AS is_owner
+            ), updated AS (
+                UPDATE task_task tt
+                SET "order" = order_cte.new_order * %s
+                FROM order_cte
+                WHERE tt.id = order_cte.id AND tt.user_id = %s
+                AND tt."order" IS DISTINCT FROM order_cte.new_order * %s
+                AND (SELECT is_owner FROM ownership)
+                RETURNING tt.id
             )
+            SELECT (SELECT is_owner FROM ownership), (SELECT count(*) FROM updated);
+            ''',
+            [new_order, user_id, TaskEntity.ORDER_STEP, user_id, TaskEntity.ORDER_STEP]
+        )
+        is_owner, updated_count = cursor.fetchone()
+        if not is_owner:
+            raise PermissionError()
+        if updated_count:
+            tasks_version.bump(user_id)
+
+    def get_user_tasks_order_for_update(
+            self,
+            user_id: UUID,
+            task_ids: list[int],
+        ) -> dict[int, int]:
+        '''
+        Возвращает порядок задач пользователя по id и блокирует их строки
+        до конца транзакции. Чужих и несуществующих задач в ответе нет.
+        '''
+        cursor = self._connection.cursor()
+        cursor.execute(
+            '''
+            SELECT tt.id, tt."order"
+            FROM task_task tt
+            WHERE tt.id = ANY(%s::int[]) AND tt.user_id = %s
+            ORDER BY tt.id
+            FOR UPDATE;
+            ''',
+            [task_ids, user_id]
+        )
+        return dict(cursor.fetchall())
+
+    def update_user_task_order(self, user_id: UUID, task_id: int, order: int) -> None:
+        cursor = self._connection.cursor()
+        cursor.execute(
+            '''
             UPDATE task_task tt
-            SET "order" = order_cte.new_order
-            FROM order_cte
-            WHERE tt.id = order_cte.id AND tt.user_id = %s;
+            SET "order" = %s
+            WHERE tt.id = %s AND tt.user_id = %s;
+            ''',
+            [order, task_id, user_id]
+        )
+        tasks_version.bump(user_id)
+
+    def rebalance_user_tasks_order(self, user_id: UUID) -> None:
+        '''
+        Перенумеровывает задачи пользователя с шагом TaskEntity.ORDER_STEP,
+        сохраняя их порядок. Строки, номер которых не изменился, не пишутся.
+        '''
+        cursor = self._connection.cursor()
+        cursor.execute(
+            '''
+            UPDATE task_task tt
+            SET "order" = numbered.new_order
+            FROM (
+                SELECT id, row_number() OVER (ORDER BY "order", id) * %s AS new_order
+                FROM task_task
+                WHERE user_id = %s
+            ) AS numbered
+            WHERE tt.id = numbered.id AND tt.user_id = %s
+            AND tt."order" <> numbered.new_order;
+            ''',
+            [TaskEntity.ORDER_STEP, user_id, user_id]
+        )
+        tasks_version.bump(user_id)
+
+    def update_user_tasks_deadlines(
+            self,
+            user_id: UUID,
+            task_ids: list[int],
+            deadlines: list[date],
+        ) -> int:
+        '''
+        Переносит задачи на новые даты одним запросом и возвращает количество
+        задач, у которых дата изменилась. Если среди id есть задачи другого
+        пользователя или несуществующие, ничего не меняется и
+        выбрасывается PermissionError.
+        '''
+        cursor = self._connection.cursor()
+        cursor.execute(
+            '''
+            WITH new_deadlines AS (
+                SELECT nd.id, nd.deadline
+                FROM unnest(%s::int[], %s::date[]) AS nd(id, deadline)
+            ), foreign_tasks AS (
+                SELECT count(*) AS task_count
+                FROM new_deadlines nd
+                LEFT JOIN task_task tt
+                ON tt.id = nd.id AND tt.user_id = %s
+                WHERE tt.id IS NULL
+            ), updated AS (
+                UPDATE task_task tt
+                SET deadline = nd.deadline
+                FROM new_deadlines nd
+                WHERE tt.id = nd.id AND tt.user_id = %s
+                AND tt.deadline IS DISTINCT FROM nd.deadline
+                AND (SELECT task_count FROM foreign_tasks) = 0
+                RETURNING tt.id
+            )
+            SELECT
+                (SELECT task_count FROM foreign_tasks),
+                (SELECT count(*) FROM updated);
             ''',
-            [new_order, user_id]
+            [task_ids, deadlines, user_id, user_id]
         )
+        foreign_count, updated_count = cursor.fetchone()
+        if foreign_count:
+            raise PermissionError()
+        if updated_count:
+            tasks_version.bump(user_id)
+        return updated_count
 
     def get_next_task_order(self, user_id: UUID) -> int:
         cursor = self._connection.cursor()
         cursor.execute(
             '''
-            SELECT coalesce(max(tt.order) + 1, 1)
+            SELECT coalesce(max(tt.order), 0) + %s
             FROM task_task tt
             where tt.user_id = %s;
             ''',
-            [user_id]
+            [TaskEntity.ORDER_STEP, user_id]
         )
         return cursor.fetchall()[0][0]
     
-    def get_count_user_tasks_in_categories_for_today(self, user_id: UUID) -> list[dict[str, Union[str, int]]]:
+    def get_count_user_tasks_in_categories_for_today(self, user_id: UUID, today: date) -> list[dict[str, Union[str, int]]]:
         cursor = self._connection.cursor()
         cursor.execute(
             '''
@@ -206,49 +604,80 @@ class TaskRepository(TaskRepositoryInterface):
                 FROM task_task tt
                 JOIN task_category tc
                 ON tt.category_id = tc.id
-                WHERE tt.user_id = %s AND tt.deadline = CURRENT_DATE
+                WHERE tt.user_id = %s AND tt.deadline = %s
                 GROUP BY tc.id
             ) AS subquery;
             ''',
-            [user_id]
+            [user_id, today]
         )
         return cursor.fetchall()[0][0]
     
-    def get_user_tasks_for_today_json(self, user_id: UUID) -> list[dict[str, Union[str, int]]]:
+    def get_user_tasks_for_today_json(self, user_id: UUID, today: date) -> list[dict[str, Union[str, int]]]:
         cursor = self._connection.cursor()
         cursor.execute(
             '''
             SELECT array_agg(
-                json_build_object('id', tt.id, 'name', tt.name, 'color', tc.color) ORDER BY "order"
+                json_build_object('id', tt.id, 'name', tt.name, 'color', tc.color) ORDER BY "order", tt.id
             )
             FROM task_task tt
             JOIN task_category tc ON tc.id = tt.category_id
-            WHERE tt.user_id = %s AND tt.deadline = CURRENT_DATE
+            WHERE tt.user_id = %s AND tt.deadline = %s
             GROUP BY tt.user_id;
             ''',
-            [user_id]
+            [user_id, today]
         )
         rows = cursor.fetchall()
         return rows[0][0] if len(rows) > 0 else []
     
+    def get_user_today_statistics_json(self, user_id: UUID, today: date) -> dict[str, dict[str, list[dict[str, Union[str, int]]]]]:
+        return self._execute(*self._get_user_today_statistics_json_query(user_id, today))
+
     def delete_task(self, task: TaskEntity) -> None:
         self._model.from_domain(task).delete()
+        tasks_version.bump(task.user_id)
 
     def get_tasks_bulk(self, task_ids: list[int]) -> list[TaskEntity]:
         return self._model.objects.filter(id__in=task_ids).to_entity_list()
 
 
-class CategoryRepository(CategoryRepositoryInterface):
-    def __init__(self, model: Type[Category], connection: ConnectionProxy):
+class AsyncTaskRepository(AsyncRepositoryMixin, TaskReadQueriesMixin, AsyncTaskReadRepositoryInterface):
+    '''
+    Чтения задач для асинхронных представлений на асинхронном
+    соединении запроса (container.async_connection)
+    '''
+
+    def __init__(
+            self,
+            model: Type[Task],
+            connection: ConnectionProxy,
+            json_passthrough: bool = False,
+        ):
         self._model = model
         self._connection = connection
+        self._json_passthrough = json_passthrough
 
-    def get_category_by_id(self, category_id: int) -> CategoryEntity:
-        return self._model.objects.get(id=category_id).to_domain()
+    async def aget_ordered_user_tasks_json(self, user_id: UUID) -> list[dict[str, Union[str, int]]]:
+        return await self._aexecute(*self._get_ordered_user_tasks_json_query(user_id))
 
-    def get_ordered_user_categories_json(self, user_id: UUID) -> list[dict[str, Union[str, int]]]:
-        cursor = self._connection.cursor()
-        cursor.execute(
+    async def aget_count_user_tasks_in_categories(self, user_id: UUID) -> dict[str, Union[list[int], list[str]]]:
+        return await self._aexecute(*self._get_count_user_tasks_in_categories_query(user_id))
+
+    async def aget_user_tasks_by_deadlines(self, user_id: UUID) -> dict[str, list[dict[str, Union[str, int]]]]:
+        return await self._aexecute(*self._get_user_tasks_by_deadlines_query(user_id))
+
+    async def aget_user_today_statistics_json(self, user_id: UUID, today: date) -> dict[str, dict[str, list[dict[str, Union[str, int]]]]]:
+        return await self._aexecute(*self._get_user_today_statistics_json_query(user_id, today))
+
+
+class CategoryReadQueriesMixin:
+    '''
+    Запросы чтения категорий, общие для CategoryRepository
+    и AsyncCategoryRepository. Ожидает self._connection.
+    '''
+
+    def _get_ordered_user_categories_json_query(self, user_id: UUID) -> RepositoryQuery:
+        return (
+            self._connection.cursor(),
             '''
             SELECT array_agg(
                 json_build_object('id', tc.id, 'name', tc.name, 'is_custom', tc.is_custom, 'color', tc.color) ORDER BY "is_custom"
@@ -256,15 +685,188 @@ class CategoryRepository(CategoryRepositoryInterface):
             FROM task_category tc
             WHERE tc.user_id = %s OR NOT tc.is_custom;
             ''',
-            [user_id]
+            [user_id],
+            lambda cursor: cursor.fetchall()[0][0]
         )
-        return cursor.fetchall()[0][0]
-    
+
+    def _get_base_categories_query(self) -> RepositoryQuery:
+        return (
+            self._connection.cursor(),
+            '''
+            SELECT tc.id, tc.name, tc.description, tc.color, tc.user_id, tc.is_custom
+            FROM task_category tc
+            WHERE NOT tc.is_custom
+            ORDER BY tc.id;
+            ''',
+            [],
+            self._fetch_categories
+        )
+
+    def _get_user_custom_categories_query(self, user_id: UUID) -> RepositoryQuery:
+        return (
+            self._connection.cursor(),
+            '''
+            SELECT tc.id, tc.name, tc.description, tc.color, tc.user_id, tc.is_custom
+            FROM task_category tc
+            WHERE tc.user_id = %s AND tc.is_custom
+            ORDER BY tc.id;
+            ''',
+            [user_id],
+            self._fetch_categories
+        )
+
+    def _fetch_categories(self, cursor) -> list[CategoryEntity]:
+        return [
+            CategoryEntity(id=id, name=name, description=description, color=color, user_id=user_id, is_custom=is_custom)
+            for id, name, description, color, user_id, is_custom in cursor.fetchall()
+        ]
+
+
+class CategoryRepository(CategoryReadQueriesMixin, QueryBatchRepositoryMixin, CategoryRepositoryInterface):
+    def __init__(self, model: Type[Category], connection: ConnectionProxy):
+        self._model = model
+        self._connection = connection
+
+    def get_category_by_id(self, category_id: int) -> CategoryEntity:
+        return self._model.objects.get(id=category_id).to_domain()
+
+    def get_ordered_user_categories_json(self, user_id: UUID) -> list[dict[str, Union[str, int]]]:
+        return self._execute(*self._get_ordered_user_categories_json_query(user_id))
+
+    def get_base_categories(self) -> list[CategoryEntity]:
+        return self._execute(*self._get_base_categories_query())
+
+    def get_user_custom_categories(self, user_id: UUID) -> list[CategoryEntity]:
+        return self._execute(*self._get_user_custom_categories_query(user_id))
+
     def save_category(self, category_entity: CategoryEntity) -> None:
         category = Category.from_domain(category_entity)
         category.clean_fields(exclude=['id'])
         category.save()
+        self._bump_user_version(category.user_id)
 
     def delete_category(self, category_entity: CategoryEntity) -> None:
         self._model.from_domain(category_entity).delete()
+        self._bump_user_version(category_entity.user_id)
+
+    def _bump_user_version(self, user_id: Union[UUID, None]) -> None:
+        # базовые категории не принадлежат пользователю и не редактируются.
+        # названия и цвета категорий входят и в статистику истории
+        if user_id is not None:
+            tasks_version.bump(user_id)
+            categories_version.bump(user_id)
+            history_version.bump(user_id)
+
+
+class AsyncCategoryRepository(AsyncRepositoryMixin, CategoryReadQueriesMixin, AsyncCategoryReadRepositoryInterface):
+    '''
+    Чтения категорий для асинхронных представлений на асинхронном
+    соединении запроса (container.async_connection)
+    '''
+
+    def __init__(self, model: Type[Category], connection: ConnectionProxy):
+        self._model = model
+        self._connection = connection
+
+    async def aget_ordered_user_categories_json(self, user_id: UUID) -> list[dict[str, Union[str, int]]]:
+        return await self._aexecute(*self._get_ordered_user_categories_json_query(user_id))
+
+    async def aget_base_categories(self) -> list[CategoryEntity]:
+        return await self._aexecute(*self._get_base_categories_query())
+
+    async def aget_user_custom_categories(self, user_id: UUID) -> list[CategoryEntity]:
+        return await self._aexecute(*self._get_user_custom_categories_query(user_id))
+
+
+class CategoryDirectory(CategoryDirectoryInterface):
+    '''
+    Справочник категорий, доступных пользователю, без обращения к БД
+    при попадании. Базовые категории не меняются, поэтому читаются один раз
+    на процесс при первом обращении. Кастомные категории кешируются
+    по пользователю под версией categories_version, которую увеличивают
+    CategoryRepository.save_category и delete_category.
+    Асинхронные методы читают через async_category_repository.
+    '''
+
+    _base_categories: Optional[dict[int, CategoryEntity]] = None
+
+    def __init__(
+            self,
+            category_repository: CategoryRepositoryInterface,
+            user_categories_cache: VersionedUserCache,
+            async_category_repository: AsyncCategoryReadRepositoryInterface = None,
+        ):
+        self._category_repository = category_repository
+        self._user_categories_cache = user_categories_cache
+        self._async_category_repository = async_category_repository
+
+    def get_user_category(self, category_id: int, user_id: UUID) -> CategoryEntity:
+        '''
+        Возвращает базовую категорию или категорию пользователя из справочника.
+        Остальные категории читаются из БД, поэтому несуществующая категория
+        выбрасывает ObjectDoesNotExist, а чужая возвращается для проверки владельца.
+        '''
+        category = self._get_base_categories().get(category_id)
+        if category is None:
+            category = self._get_user_custom_categories(user_id).get(category_id)
+        if category is None:
+            category = self._category_repository.get_category_by_id(category_id)
+        return category
+
+    def get_ordered_user_categories_json(self, user_id: UUID) -> list[dict[str, Union[str, int]]]:
+        return self._to_json([
+            *self._get_base_categories().values(),
+            *self._get_user_custom_categories(user_id).values(),
+        ])
+
+    async def aget_ordered_user_categories_json(self, user_id: UUID) -> list[dict[str, Union[str, int]]]:
+        '''
+        get_ordered_user_categories_json с асинхронным репозиторием категорий
+        '''
+        base_categories = await self._aget_base_categories()
+        user_categories = await self._aget_user_custom_categories(user_id)
+        return self._to_json([*base_categories.values(), *user_categories.values()])
+
+    def _to_json(self, categories: list[CategoryEntity]) -> list[dict[str, Union[str, int]]]:
+        return [
+            {'id': category.id, 'name': category.name, 'is_custom': category.is_custom, 'color': category.color}
+            for category in categories
+        ]
+
+    @classmethod
+    def reset_base_categories(cls) -> None:
+        cls._base_categories = None
+
+    def _get_base_categories(self) -> dict[int, CategoryEntity]:
+        if CategoryDirectory._base_categories is None:
+            CategoryDirectory._base_categories = {
+                category.id: category for category in self._category_repository.get_base_categories()
+            }
+        return CategoryDirectory._base_categories
+
+    def _get_user_custom_categories(self, user_id: UUID) -> dict[int, CategoryEntity]:
+        categories, _ = self._user_categories_cache.get_or_set(
+            user_id,
+            lambda: {
+                category.id: category
+                for category in self._category_repository.get_user_custom_categories(user_id)
+            }
+        )
+        return categories
+
+    async def _aget_base_categories(self) -> dict[int, CategoryEntity]:
+        if CategoryDirectory._base_categories is None:
+            CategoryDirectory._base_categories = {
+                category.id: category for category in await self._async_category_repository.aget_base_categories()
+            }
+        return CategoryDirectory._base_categories
+
+    async def _aget_user_custom_categories(self, user_id: UUID) -> dict[int, CategoryEntity]:
+        async def get_categories():
+            return {
+                category.id: category
+                for category in await self._async_category_repository.aget_user_custom_categories(user_id)
+            }
+        categories, _ = await self._user_categories_cache.aget_or_set(user_id, get_categories)
+        return categories
 
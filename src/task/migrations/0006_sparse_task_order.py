@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-16 23:10
+
+from django.db import migrations
+
+
+# Должен совпадать с TaskEntity.ORDER_STEP на момент миграции
+ORDER_STEP = 1024
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task', '0005_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=(
+                '''
+                UPDATE task_task tt
+                SET "order" = numbered.new_order
+                FROM (
+                    SELECT id, row_number() OVER (
+                        PARTITION BY user_id ORDER BY "order", id
+                    ) * %d AS new_order
+                    FROM task_task
+                ) AS numbered
+                WHERE tt.id = numbered.id;
+                ''' % ORDER_STEP
+            ),
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2 on 2026-10-16 23:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('task', '0006_sparse_task_order'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskOrderCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь, которому принадлежат задачи')),
+                ('last_order', models.IntegerField(verbose_name='Порядок последней созданной задачи')),
+            ],
+            options={
+                'verbose_name': '\n            Последний выданный порядок задачи пользователя. Строка блокируется\n            вставкой задачи (INSERT ... ON CONFLICT DO UPDATE), поэтому\n            параллельные создания задач одного пользователя получают разные\n            номера. Пишется только из TaskRepository.create_task.\n        ',
+                'db_table': 'task_order_counter',
+            },
+        ),
+    ]
@@ -6,9 +6,35 @@ from .domain import CategoryEntity, TaskEntity
 
 
 class DomainQuerySet(models.QuerySet):
-
-    def to_entity_list(self) -> list[TaskEntity]:
-        return [task.to_domain() for task in self]
+    '''
+    Модели, которые используют этот QuerySet, описывают в DOMAIN_FIELDS
+    колонки (с *_id вместо связанных объектов), из которых собирается сущность.
+    Поэтому список сущностей любого размера получается одним запросом
+    без ленивой подгрузки связанных строк.
+    '''
+
+    def to_entity_list(self) -> list:
+        fields = self._get_loaded_domain_fields()
+        empty_values = dict.fromkeys(self.model.DOMAIN_FIELDS)
+        return [
+            self.model.row_to_domain({**empty_values, **dict(zip(fields, row))})
+            for row in self.values_list(*fields)
+        ]
+
+    def _get_loaded_domain_fields(self) -> tuple[str, ...]:
+        # учитываем only() и defer(), чтобы не тянуть лишние колонки
+        field_names, is_deferred = self.query.deferred_loading
+        if not field_names:
+            return self.model.DOMAIN_FIELDS
+        pk_name = self.model._meta.pk.name
+        loaded_fields = []
+        for field in self.model.DOMAIN_FIELDS:
+            name = self.model._meta.get_field(field).name
+            if is_deferred and name not in field_names:
+                loaded_fields.append(field)
+            elif not is_deferred and (name in field_names or name == pk_name):
+                loaded_fields.append(field)
+        return tuple(loaded_fields)
 
 
 class Category(models.Model):
@@ -16,6 +42,15 @@ class Category(models.Model):
 
     class Meta:
         verbose_name = 'Категории задач'
+        indexes = [
+            # базовые категории выбираются вместе с кастомными через
+            # user_id = %s OR NOT is_custom, это плечо OR идет по этому индексу
+            models.Index(
+                fields=['id'],
+                condition=models.Q(is_custom=False),
+                name='category_base_idx',
+            ),
+        ]
 
 
     name = models.CharField(
@@ -45,6 +80,12 @@ class Category(models.Model):
 
     objects = DomainQuerySet.as_manager()
 
+    DOMAIN_FIELDS = ('id', 'name', 'description', 'color', 'user_id', 'is_custom')
+
+    @classmethod
+    def row_to_domain(cls, values: dict) -> CategoryEntity:
+        return CategoryEntity(**values)
+
     @classmethod
     def from_domain(cls, entity: CategoryEntity):
         return cls(
@@ -62,7 +103,7 @@ class Category(models.Model):
             name=self.name,
             description=self.description,
             color=self.color,
-            user_id=self.user.id if self.user else None,
+            user_id=self.user_id,
             is_custom=self.is_custom
         )
 
@@ -74,6 +115,19 @@ class Task(models.Model):
 
     class Meta:
         verbose_name = 'Задачи, которые пользователи ставят себе'
+        indexes = [
+            models.Index(
+                fields=['user', 'order'],
+                include=['name'],
+                name='task_user_order_idx',
+            ),
+            models.Index(
+                fields=['user', 'deadline'],
+                include=['category', 'order', 'name'],
+                condition=models.Q(deadline__isnull=False),
+                name='task_user_deadline_idx',
+            ),
+        ]
 
 
     name = models.CharField(
@@ -103,6 +157,7 @@ class Task(models.Model):
         on_delete=models.CASCADE,
         null=False,
         blank=False,
+        db_index=False,
         verbose_name='Пользователь, создавший задачу'
     )
     deadline = models.DateField(
@@ -118,6 +173,15 @@ class Task(models.Model):
 
     objects = DomainQuerySet.as_manager()
 
+    DOMAIN_FIELDS = (
+        'id', 'name', 'description', 'order', 'category_id',
+        'user_id', 'deadline', 'planned_time',
+    )
+
+    @classmethod
+    def row_to_domain(cls, values: dict) -> TaskEntity:
+        return TaskEntity(**values)
+
     @classmethod
     def from_domain(cls, entity: TaskEntity) -> "Task":
         return cls(
@@ -137,9 +201,35 @@ class Task(models.Model):
             name=self.name,
             description=self.description,
             order=self.order,
-            category_id=self.category.id if self.category else None,
-            user_id=self.user.id,
+            category_id=self.category_id,
+            user_id=self.user_id,
             deadline=self.deadline,
             planned_time=self.planned_time,
         )
 
+
+
+class TaskOrderCounter(models.Model):
+
+
+    class Meta:
+        db_table = 'task_order_counter'
+        verbose_name = '''
+            Последний выданный порядок задачи пользователя. Строка блокируется
+            вставкой задачи (INSERT ... ON CONFLICT DO UPDATE), поэтому
+            параллельные создания задач одного пользователя получают разные
+            номера. Пишется только из TaskRepository.create_task.
+        '''
+
+
+    user = models.OneToOneField(
+        to=get_user_model(),
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name='Пользователь, которому принадлежат задачи'
+    )
+    last_order = models.IntegerField(
+        null=False,
+        blank=False,
+        verbose_name='Порядок последней созданной задачи'
+    )
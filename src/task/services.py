@@ -1,15 +1,23 @@
 from abc import ABC, abstractmethod
-from typing import Union, NoReturn
+from datetime import date
+from typing import Optional, Union, NoReturn
 from uuid import UUID
 
-from history.infrastructure import HistoryRepositoryInterface
+from django.db import transaction
 
-from .infrastructure import TaskRepositoryInterface, CategoryRepositoryInterface
+from core.cache import VersionedUserCache
+from core.db import QueryBatch, AsyncQueryBatch
+
+from .infrastructure import TaskRepositoryInterface, AsyncTaskReadRepositoryInterface, CategoryRepositoryInterface, CategoryDirectoryInterface
 from .domain import CategoryEntity, TaskEntity, TaskEntityProtocol, CategoryEntityProtocol
 
 
 class TaskServiceInterface(ABC):
 
+    @abstractmethod
+    def query_batch(self) -> QueryBatch:
+        pass
+
     @abstractmethod
     def get_ordered_user_tasks(self, user_id: UUID) -> list[dict[str, Union[str, int]]]:
         pass
@@ -25,6 +33,22 @@ class TaskServiceInterface(ABC):
         ) -> dict[str, list]:
         pass
 
+    @abstractmethod
+    def aquery_batch(self) -> AsyncQueryBatch:
+        pass
+
+    @abstractmethod
+    async def aget_ordered_user_tasks(self, user_id: UUID) -> list[dict[str, Union[str, int]]]:
+        pass
+
+    @abstractmethod
+    async def aget_user_task_count_by_categories(self, user_id: UUID) -> dict[str, list]:
+        pass
+
+    @abstractmethod
+    async def aget_user_tasks_by_deadlines(self, user_id: UUID) -> dict[str, list]:
+        pass
+
     @abstractmethod
     def get_user_task_by_id(
             self, 
@@ -38,6 +62,17 @@ class TaskServiceInterface(ABC):
         pass
 
 
+class TaskDashboardUseCaseInterface(ABC):
+
+    @abstractmethod
+    def execute(self, user_id: UUID) -> dict:
+        pass
+
+    @abstractmethod
+    async def aexecute(self, user_id: UUID) -> dict:
+        pass
+
+
 class DeadlinesUpdateUseCaseInterface(ABC):
 
     @abstractmethod
@@ -45,7 +80,7 @@ class DeadlinesUpdateUseCaseInterface(ABC):
             self,
             user_id: UUID,
             new_deadlines: dict[str, list]
-        ) -> None:
+        ) -> int:
         pass
 
 
@@ -60,6 +95,19 @@ class TaskOrderUpdateUseCaseInterface(ABC):
         pass
 
 
+class TaskMoveUseCaseInterface(ABC):
+
+    @abstractmethod
+    def execute(
+            self,
+            user_id: UUID,
+            task_id: int,
+            before_id: Optional[int],
+            after_id: Optional[int],
+        ) -> int:
+        pass
+
+
 class CategoryUseCaseInterface(ABC):
 
     @abstractmethod
@@ -124,6 +172,10 @@ class GetTodayStatisticsUseCaseInterface(ABC):
         ) -> dict:
         pass
 
+    @abstractmethod
+    async def aexecute(self, user_id: UUID) -> dict:
+        pass
+
 
 class CategoryServiceInterface(ABC):
     
@@ -142,15 +194,33 @@ class CategoryServiceInterface(ABC):
             ) -> list[dict[str, Union[str, int]]]:
         pass
 
+    @abstractmethod
+    async def aget_ordered_user_categories(
+                self,
+                user_id: UUID
+            ) -> list[dict[str, Union[str, int]]]:
+        pass
+
 
 class TaskService(TaskServiceInterface):
+    '''
+    Асинхронные методы читают через async_task_repository
+    '''
 
     def __init__(
             self, task_repository: TaskRepositoryInterface = None,
-            category_repository: CategoryRepositoryInterface = None
+            category_repository: CategoryRepositoryInterface = None,
+            async_task_repository: AsyncTaskReadRepositoryInterface = None,
         ):
         self._task_repository = task_repository
         self._category_repository = category_repository
+        self._async_task_repository = async_task_repository
+
+    def query_batch(self) -> QueryBatch:
+        return self._task_repository.batch()
+
+    def aquery_batch(self) -> AsyncQueryBatch:
+        return self._async_task_repository.abatch()
 
     def get_ordered_user_tasks(self, user_id: UUID) -> list[dict[str, Union[str, int]]]:
         return self._task_repository.get_ordered_user_tasks_json(user_id)
@@ -169,6 +239,21 @@ class TaskService(TaskServiceInterface):
         count_user_tasks_in_categories_by_deadlines = self._task_repository.get_user_tasks_by_deadlines(user_id)
         return count_user_tasks_in_categories_by_deadlines
 
+    async def aget_ordered_user_tasks(self, user_id: UUID) -> list[dict[str, Union[str, int]]]:
+        return await self._async_task_repository.aget_ordered_user_tasks_json(user_id)
+
+    async def aget_user_task_count_by_categories(
+                self,
+                user_id: UUID
+            ) -> dict[str, Union[list[int], list[str]]]:
+        return await self._async_task_repository.aget_count_user_tasks_in_categories(user_id)
+
+    async def aget_user_tasks_by_deadlines(
+                self,
+                user_id: UUID
+            ) -> dict[str, list[dict[str, Union[int, str]]]]:
+        return await self._async_task_repository.aget_user_tasks_by_deadlines(user_id)
+
     def get_user_task_by_id(
                 self,
                 task_id: int, 
@@ -184,14 +269,66 @@ class TaskService(TaskServiceInterface):
         return self._task_repository.get_next_task_order(user_id)
 
 
+class TaskDashboardUseCase(TaskDashboardUseCaseInterface):
+    '''
+    Данные главной страницы задач: диаграмма задач по категориям и
+    упорядоченный список задач. Ответ кешируется по версии задач
+    пользователя, которую увеличивают записи задач и категорий.
+    '''
+
+    def __init__(
+            self,
+            task_service: TaskServiceInterface,
+            dashboard_cache: VersionedUserCache,
+        ):
+        self._task_service = task_service
+        self._dashboard_cache = dashboard_cache
+
+    def execute(self, user_id: UUID) -> dict:
+        dashboard, _ = self._dashboard_cache.get_or_set(
+            user_id, lambda: self._get_dashboard(user_id)
+        )
+        return dashboard
+
+    def _get_dashboard(self, user_id: UUID) -> dict:
+        # запросы независимы, поэтому уходят на сервер одним пакетом
+        with self._task_service.query_batch():
+            chart_data = self._task_service.get_user_task_count_by_categories(user_id)
+            tasks = self._task_service.get_ordered_user_tasks(user_id)
+        return {
+            'chart_data': chart_data.result,
+            'tasks': tasks.result,
+        }
+
+    async def aexecute(self, user_id: UUID) -> dict:
+        '''
+        execute для асинхронных представлений, сервис задач должен
+        быть собран с асинхронным репозиторием (async_task_repository)
+        '''
+        dashboard, _ = await self._dashboard_cache.aget_or_set(
+            user_id, lambda: self._aget_dashboard(user_id)
+        )
+        return dashboard
+
+    async def _aget_dashboard(self, user_id: UUID) -> dict:
+        # как и в _get_dashboard, запросы уходят на сервер одним пакетом
+        async with self._task_service.aquery_batch():
+            chart_data = await self._task_service.aget_user_task_count_by_categories(user_id)
+            tasks = await self._task_service.aget_ordered_user_tasks(user_id)
+        return {
+            'chart_data': chart_data.result,
+            'tasks': tasks.result,
+        }
+
+
 class TaskUseCase(TaskUseCaseInterface):
 
     def __init__(
             self, task_repository: TaskRepositoryInterface, 
-            category_repository: CategoryRepositoryInterface = None
+            category_directory: CategoryDirectoryInterface = None
         ):
         self._task_repository = task_repository  
-        self._category_repository = category_repository
+        self._category_directory = category_directory
 
     def get(
             self, 
@@ -209,15 +346,16 @@ class TaskUseCase(TaskUseCaseInterface):
             task_data: dict[str, Union[str, int, bool]]
         ) -> Union[None, NoReturn]:
         self._user_category_owner(user_id, task_data.get('category'))
-        task = TaskEntity.from_dict({**task_data, 'user_id': str(user_id), 'order': self._task_repository.get_next_task_order(user_id)})
-        self._task_repository.save_task(task)
+        # порядок выдается репозиторием при вставке
+        task = TaskEntity.from_dict({**task_data, 'user_id': str(user_id), 'order': None})
+        self._task_repository.create_task(task)
     
     def _user_category_owner(
             self, 
             user_id: UUID, 
             category_id: int
         ) -> Union[None, NoReturn]:
-        category = self._category_repository.get_category_by_id(category_id)
+        category = self._category_directory.get_user_category(category_id, user_id)
         if category.user_id != user_id and category.is_custom:
             raise PermissionError()
     
@@ -239,6 +377,11 @@ class TaskUseCase(TaskUseCaseInterface):
         self._task_repository.save_task(task)
 
 class TaskOrderUpdateUseCase(TaskOrderUpdateUseCaseInterface):
+    '''
+    Изменение порядка задач. Принадлежность задач пользователю
+    проверяется в том же запросе к БД, что и обновление порядка.
+    '''
+
     def __init__(self, task_repository: TaskRepositoryInterface):
         self._task_repository = task_repository
 
@@ -246,68 +389,95 @@ class TaskOrderUpdateUseCase(TaskOrderUpdateUseCaseInterface):
             self, 
             user_id: UUID, 
             new_order: list[str]
-        ) -> None:
-
-        all_tasks_for_update = self._task_repository.get_tasks_bulk(new_order)
-        user_tasks = self._task_repository.get_ordered_user_tasks(user_id)
+        ) -> Union[None, NoReturn]:
+        self._task_repository.update_user_tasks_order(
+            user_id, [int(task_id) for task_id in new_order]
+        )
 
-        self._user_tasks_owner(all_tasks_for_update, user_tasks)
 
-        self._task_repository.update_user_tasks_order(user_id, new_order)
+class TaskMoveUseCase(TaskMoveUseCaseInterface):
+    '''
+    Перемещение одной задачи между соседями before_id (задача, которая
+    окажется перед ней) и after_id (задача, которая окажется после нее).
+    Для перемещения в начало или конец списка один из соседей не передается.
+    Новый порядок берется из промежутка между соседями, поэтому меняется
+    только строка перемещаемой задачи. Если промежуток исчерпан, задачи
+    пользователя перенумеровываются с шагом TaskEntity.ORDER_STEP.
+    '''
 
-    def _user_tasks_owner(
-            self, 
-            all_tasks_for_update: list[TaskEntityProtocol], 
-            user_tasks: list[TaskEntityProtocol]
-        ):
-        user_tasks_ids = self._get_ids_from_entities(user_tasks)
-        for task in all_tasks_for_update:
-            if not task.id in user_tasks_ids:
-                raise PermissionError()
-    
-    def _get_ids_from_entities(self, entity_list: list):
-        return [entity.id for entity in entity_list]
-
-
-class DeadlinesUpdateUseCase(DeadlinesUpdateUseCaseInterface):
     def __init__(self, task_repository: TaskRepositoryInterface):
         self._task_repository = task_repository
 
+    @transaction.atomic
     def execute(
             self,
             user_id: UUID,
-            new_deadlines: dict[str, list[dict[str, Union[int, str]]]]
-        ) -> Union[None, NoReturn]:
+            task_id: int,
+            before_id: Optional[int],
+            after_id: Optional[int],
+        ) -> Union[int, NoReturn]:
+        if before_id is None and after_id is None:
+            raise ValueError('Не указаны соседние задачи')
+        if task_id in (before_id, after_id) or before_id == after_id:
+            raise ValueError('Задача не может быть соседней самой себе')
+
+        task_ids = [task_id] + [neighbour_id for neighbour_id in (before_id, after_id) if neighbour_id is not None]
+        orders = self._task_repository.get_user_tasks_order_for_update(user_id, task_ids)
+        if len(orders) != len(task_ids):
+            raise PermissionError()
 
-        for date, tasks in new_deadlines.items():
-            for task_json in tasks:
-                task = self._task_repository.get_task_by_id(task_json['id'])
-                self._user_task_owner(user_id, task)
-                if self._deadline_has_changed(task, date):
-                    self._update_deadline(task, date)
+        new_order = self._get_order_between(orders.get(before_id), orders.get(after_id))
+        if new_order is None:
+            self._task_repository.rebalance_user_tasks_order(user_id)
+            orders = self._task_repository.get_user_tasks_order_for_update(user_id, task_ids)
+            new_order = self._get_order_between(orders.get(before_id), orders.get(after_id))
 
-    def _user_task_owner(
-            self,
-            user_id: UUID,
-            task: TaskEntityProtocol,
-        ) -> Union[None, NoReturn]:
-        if not task.user_id == user_id:
-            raise PermissionError()
+        self._task_repository.update_user_task_order(user_id, task_id, new_order)
+        return new_order
 
-    def _deadline_has_changed(
+    def _get_order_between(
             self,
-            task: TaskEntityProtocol,
-            new_deadline: str
-        ) -> bool:
-        return not str(task.deadline) == new_deadline
+            before_order: Optional[int],
+            after_order: Optional[int],
+        ) -> Optional[int]:
+        if before_order is None:
+            return after_order - TaskEntity.ORDER_STEP
+        if after_order is None:
+            return before_order + TaskEntity.ORDER_STEP
+        if before_order >= after_order:
+            raise ValueError('Задача before_id должна стоять раньше задачи after_id')
+        if after_order - before_order < 2:
+            return None
+        return (before_order + after_order) // 2
+
 
-    def _update_deadline(
+class DeadlinesUpdateUseCase(DeadlinesUpdateUseCaseInterface):
+    '''
+    Перенос задач в календаре. Все задачи из запроса обновляются одним
+    запросом к БД, если хотя бы одна задача не принадлежит пользователю,
+    не обновляется ни одна.
+    '''
+
+    def __init__(self, task_repository: TaskRepositoryInterface):
+        self._task_repository = task_repository
+
+    def execute(
             self,
-            task: TaskEntityProtocol,
-            new_deadline: str
-        ) -> None:
-        task.deadline = new_deadline
-        self._task_repository.save_task(task)
+            user_id: UUID,
+            new_deadlines: dict[str, list[dict[str, Union[int, str]]]]
+        ) -> Union[int, NoReturn]:
+        task_ids = []
+        deadlines = []
+        for deadline, tasks in new_deadlines.items():
+            parsed_deadline = date.fromisoformat(deadline)
+            for task_json in tasks:
+                task_ids.append(int(task_json['id']))
+                deadlines.append(parsed_deadline)
+        if not task_ids:
+            return 0
+        return self._task_repository.update_user_tasks_deadlines(
+            user_id, task_ids, deadlines
+        )
 
     
 class CategoryUseCase(CategoryUseCaseInterface):
@@ -352,71 +522,52 @@ class CategoryUseCase(CategoryUseCaseInterface):
     
 
 class GetTodayStatisticsUseCase(GetTodayStatisticsUseCaseInterface):
+    '''
+    Статистика на сегодня: запланированные и выполненные задачи и их
+    количество по категориям. Эндпоинт постоянно опрашивается, поэтому
+    обе таблицы читаются и сводятся по категориям одним запросом.
+    Сегодняшний день берется в часовом поясе пользователя.
+    aexecute читает через async_task_repository.
+    '''
+
     def __init__(
             self, 
-            task_repository: TaskRepositoryInterface, 
-            history_repository: HistoryRepositoryInterface
+            task_repository: TaskRepositoryInterface = None, 
+            async_task_repository: AsyncTaskReadRepositoryInterface = None,
         ):
         self._task_repository = task_repository
-        self._history_repository = history_repository
+        self._async_task_repository = async_task_repository
 
     def execute(
             self, 
             user_id: UUID
         ) -> dict:
-        planned_tasks = self._task_repository.get_user_tasks_for_today_json(user_id)
-        completed_tasks = self._history_repository.get_user_tasks_for_today_json(user_id)
-        categories_statistics = self._task_repository.get_count_user_tasks_in_categories_for_today(user_id)
-        categories_statistics_completed = self._history_repository.get_count_user_tasks_in_categories_for_today(user_id)
+        return self._task_repository.get_user_today_statistics_json(user_id, timezone.localdate())
 
-        return {
-            'tasks': {
-                'planned': [*planned_tasks, *completed_tasks],
-                'completed': completed_tasks
-            },
-            'categories': {
-                'planned': self._union_categories_statistics(
-                    categories_statistics,
-                    categories_statistics_completed
-                ),
-                'completed': categories_statistics_completed
-            }
-        }
-    
-    def _union_categories_statistics(
-            self,
-            planned: list[dict[str, int]],
-            completed: list[dict[str, int]]
-        ) -> list[dict[str, int]]:
-        # TODO: рефакторить
-        all_categories = [*planned, *completed]
-        category_ids = []
-        result = []
-        for category in all_categories:
-            if category['id'] not in category_ids:
-                result.append(category)
-                category_ids.append(category['id'])
-            else:
-                for result_category in result:
-                    if result_category['id'] == category['id']:
-                        result_category['taskCount'] += category['taskCount']
-        return result
+    async def aexecute(self, user_id: UUID) -> dict:
+        '''
+        execute для асинхронных представлений
+        '''
+        return await self._async_task_repository.aget_user_today_statistics_json(user_id, timezone.localdate())
 
 
 class CategoryService(CategoryServiceInterface):
-    def __init__(self, category_repository: CategoryRepositoryInterface):
-        self._category_repository = category_repository
+    def __init__(self, category_directory: CategoryDirectoryInterface):
+        self._category_directory = category_directory
 
     def get_user_category_by_id(
                 self, 
                 category_id: int, 
                 user_id: UUID
             ) -> Union[dict, NoReturn]:
-        category = self._category_repository.get_category_by_id(category_id)
+        category = self._category_directory.get_user_category(category_id, user_id)
         if category.user_id != user_id:
             raise PermissionError
         return category.to_dict(for_form=True)
 
     def get_ordered_user_categories(self, user_id: UUID) -> list[dict[str, Union[str, int]]]:
-        return self._category_repository.get_ordered_user_categories_json(user_id)  
+        return self._category_directory.get_ordered_user_categories_json(user_id)
+
+    async def aget_ordered_user_categories(self, user_id: UUID) -> list[dict[str, Union[str, int]]]:
+        return await self._category_directory.aget_ordered_user_categories_json(user_id)
 
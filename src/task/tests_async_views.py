@@ -0,0 +1,180 @@
+import json
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from asgiref.sync import sync_to_async
+from django.test import TransactionTestCase
+from django.core.cache import cache
+from django.db import connection
+from django.contrib.auth import get_user_model
+
+from core.cache import categories_version
+from core.container import RequestContainer
+from core.pool import enable_async_pools, close_async_pools
+from history.models import History
+from history.infrastructure import HistoryRepository, AsyncHistoryRepository
+from history.constants.choices import HistoryTaskStatusChoices
+from .models import Task, Category
+from .domain import TaskEntity
+from .infrastructure import TaskRepository, AsyncTaskRepository, CategoryRepository, AsyncCategoryRepository, CategoryDirectory
+from .services import CategoryUseCase
+from .views import CategoryView
+
+User = get_user_model()
+
+
+class AsyncReadPathTest(TransactionTestCase):
+    """Асинхронные представления должны читать те же данные через асинхронное соединение"""
+
+    # базовые категории из миграций нужны остальным тестам
+    serialized_rollback = True
+    # представления читают через соединение реплики, если она настроена
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        CategoryDirectory.reset_base_categories()
+        self.user = User.objects.create_user(
+            username='asyncuser',
+            email='async@example.com',
+            password='testpass123',
+        )
+        self.category = Category.objects.create(
+            name='Async category',
+            color='rgba(255, 0, 0, 0.4)',
+            user=self.user,
+            is_custom=True,
+        )
+        for index in range(3):
+            Task.objects.create(
+                name=f'Async task {index}',
+                order=(3 - index) * TaskEntity.ORDER_STEP,
+                category=self.category,
+                user=self.user,
+                deadline=date.today(),
+                planned_time=timedelta(hours=1),
+            )
+        History.objects.create(
+            name='Async history',
+            category=self.category,
+            user=self.user,
+            planned_time=timedelta(hours=1),
+            execution_time=timedelta(minutes=50),
+            execution_date=date.today(),
+            status=HistoryTaskStatusChoices.SUCCESSFUL,
+        )
+        self.from_date = str(date.today() - timedelta(days=7))
+        self.to_date = str(date.today())
+        self.async_client.force_login(self.user)
+
+    async def test_repositories_match_sync_repositories(self):
+        """Тест совпадения результатов асинхронных и синхронных репозиториев"""
+        task_repository = TaskRepository(Task, connection)
+        history_repository = HistoryRepository(History, connection)
+        # асинхронные соединения, как под ASGI
+        enable_async_pools()
+        try:
+            async with RequestContainer() as container:
+                async_task_repository = AsyncTaskRepository(Task, container.async_connection)
+                async_history_repository = AsyncHistoryRepository(History, container.async_connection)
+                tasks = await async_task_repository.aget_ordered_user_tasks_json(self.user.id)
+                chart_data = await async_task_repository.aget_count_user_tasks_in_categories(self.user.id)
+                statistics = await async_history_repository.aget_history_statistics(self.user.id, self.from_date, self.to_date)
+                categories = await AsyncCategoryRepository(Category, container.async_connection).aget_user_custom_categories(self.user.id)
+                self.assertTrue(container.async_connection.is_open)
+            self.assertFalse(container.async_connection.is_open)
+        finally:
+            enable_async_pools(False)
+            await close_async_pools()
+
+        self.assertEqual(tasks, await sync_to_async(task_repository.get_ordered_user_tasks_json)(self.user.id))
+        self.assertEqual(chart_data, await sync_to_async(task_repository.get_count_user_tasks_in_categories)(self.user.id))
+        self.assertEqual(
+            statistics,
+            await sync_to_async(history_repository.get_history_statistics)(self.user.id, self.from_date, self.to_date),
+        )
+        self.assertEqual(
+            categories,
+            await sync_to_async(CategoryRepository(Category, connection).get_user_custom_categories)(self.user.id),
+        )
+
+    async def test_endpoints(self):
+        """Тест асинхронных эндпоинтов"""
+        response = await self.async_client.get('/api/tasks/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [task['name'] for task in response.json()['tasks']],
+            ['Async task 2', 'Async task 1', 'Async task 0'],
+        )
+
+        response = await self.async_client.get('/api/today-statistics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['tasks']['planned']), 4)
+        self.assertEqual(len(response.json()['tasks']['completed']), 1)
+
+        response = await self.async_client.get('/api/deadlines/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['calendar_data'][str(date.today())]), 3)
+
+        response = await self.async_client.get('/api/categories/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Async category', [category['name'] for category in response.json()['categories']])
+
+        response = await self.async_client.get('/api/history/', {'from_date': self.from_date, 'to_date': self.to_date})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['context']['statistics']['commonUserSuccessRate']['data'], 100.0)
+
+    async def _get_dashboard_pipeline_syncs(self) -> list[str]:
+        cache.clear()
+        with patch('core.db.record_query') as record_query:
+            response = await self.async_client.get('/api/tasks/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['tasks']), 3)
+        self.assertEqual(len(response.json()['chart_data']['counts']), 1)
+        return [call.args[0].split('\n')[0] for call in record_query.call_args_list]
+
+    async def test_dashboard_reads_are_pipelined(self):
+        """Тест отправки запросов главной страницы одним пайплайном"""
+        # в соединении Django (пул соединений Django без асинхронных пулов) - синхронным QueryBatch
+        self.assertEqual(await self._get_dashboard_pipeline_syncs(), ['-- pipeline sync, 2 queries'])
+        # под ASGI - пайплайном асинхронного соединения
+        enable_async_pools()
+        try:
+            self.assertEqual(await self._get_dashboard_pipeline_syncs(), ['-- pipeline sync, 2 queries'])
+        finally:
+            enable_async_pools(False)
+            await close_async_pools()
+
+    async def test_conditional_get_and_login(self):
+        """Тест ответа 304 и 401 у асинхронных эндпоинтов"""
+        response = await self.async_client.get('/api/tasks/')
+        not_modified = await self.async_client.get('/api/tasks/', headers={'If-None-Match': response['ETag']})
+        self.assertEqual(not_modified.status_code, 304)
+
+        await sync_to_async(self.async_client.logout)()
+        response = await self.async_client.get('/api/tasks/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_category_writes(self):
+        """Тест записи категорий через синхронный репозиторий, use case и представление"""
+        repository = CategoryRepository(Category, connection)
+        version = categories_version.get(self.user.id)
+        CategoryUseCase(repository).create(
+            self.user.id, {'name': 'Written category', 'color': 'rgba(0, 0, 255, 0.4)'}
+        )
+        self.assertTrue(Category.objects.filter(name='Written category', user=self.user).exists())
+        self.assertNotEqual(categories_version.get(self.user.id), version)
+
+        self.assertIsInstance(CategoryView.use_case.resolve(RequestContainer()), CategoryUseCase)
+        self.client.force_login(self.user)
+        response = self.client.post(
+            '/api/category/',
+            json.dumps({'name': 'View category', 'color': 'rgba(0, 255, 0, 0.4)'}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(Category.objects.filter(name='View category', user=self.user).exists())
+        repository.delete_category(
+            Category.objects.get(name='Written category', user=self.user).to_domain()
+        )
+        self.assertFalse(Category.objects.filter(name='Written category').exists())
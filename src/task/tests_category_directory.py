@@ -0,0 +1,114 @@
+import json
+
+from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.contrib.auth import get_user_model
+
+from .models import Task, Category
+from .infrastructure import CategoryRepository
+
+User = get_user_model()
+
+
+class CategoryDirectoryTest(TestCase):
+    """Проверка владельца категории и список категорий читаются из справочника"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='directoryuser',
+            email='directory@example.com',
+            password='testpass123',
+        )
+        self.other_user = User.objects.create_user(
+            username='directoryother',
+            email='directoryother@example.com',
+            password='testpass123',
+        )
+        self.category = Category.objects.create(
+            name='Directory category',
+            color='rgba(255, 0, 0, 0.4)',
+            user=self.user,
+            is_custom=True,
+        )
+        self.other_category = Category.objects.create(
+            name='Other directory category',
+            color='rgba(0, 255, 0, 0.4)',
+            user=self.other_user,
+            is_custom=True,
+        )
+        self.client.login(username='directoryuser', password='testpass123')
+
+    def _get_categories(self) -> list[dict]:
+        response = self.client.get('/api/categories/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['categories']
+
+    def _create_task(self, category_id: int):
+        return self.client.post(
+            '/api/task/',
+            json.dumps({
+                'name': 'Directory task',
+                'category': category_id,
+                'planned_time': '01:00:00',
+            }),
+            content_type='application/json',
+        )
+
+    def test_listing_matches_repository(self):
+        """Тест совпадения списка категорий со списком из БД"""
+        expected = CategoryRepository(Category, connection).get_ordered_user_categories_json(self.user.id)
+        categories = self._get_categories()
+        self.assertEqual(
+            sorted(categories, key=lambda category: category['id']),
+            sorted(expected, key=lambda category: category['id']),
+        )
+        self.assertEqual(categories[-1]['name'], 'Directory category')
+        self.assertNotIn('Other directory category', [category['name'] for category in categories])
+
+    def test_warm_listing_skips_database(self):
+        """Тест повторного списка категорий без запросов к таблице категорий"""
+        self._get_categories()
+        # остаются только запросы сессии и пользователя
+        with self.assertNumQueries(2):
+            self._get_categories()
+
+    def test_warm_ownership_check_skips_database(self):
+        """Тест создания задачи без чтения категории из БД"""
+        self._get_categories()
+        base_category = Category.objects.filter(is_custom=False).first()
+        for category_id in [self.category.id, base_category.id]:
+            with self.subTest(category_id=category_id):
+                # сессия, пользователь и вставка задачи
+                with self.assertNumQueries(3):
+                    response = self._create_task(category_id)
+                self.assertEqual(response.status_code, 200)
+        self.assertEqual(Task.objects.filter(user=self.user).count(), 2)
+
+    def test_foreign_and_missing_categories(self):
+        """Тест отказа для чужой и несуществующей категории"""
+        self._get_categories()
+        self.assertEqual(self._create_task(self.other_category.id).status_code, 403)
+        self.assertEqual(self._create_task(99999).status_code, 404)
+
+    def test_category_writes_invalidate_directory(self):
+        """Тест сброса справочника после создания и изменения категории"""
+        self._get_categories()
+        response = self.client.post(
+            '/api/category/',
+            json.dumps({'name': 'New directory category', 'color': 'rgba(0, 0, 0, 0.4)', 'description': ''}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('New directory category', [category['name'] for category in self._get_categories()])
+
+        response = self.client.put(
+            f'/api/category/{self.category.id}/',
+            json.dumps({'name': 'Renamed directory category', 'color': 'rgba(0, 0, 0, 0.4)', 'description': ''}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        names = [category['name'] for category in self._get_categories()]
+        self.assertIn('Renamed directory category', names)
+        self.assertNotIn('Directory category', names)
@@ -0,0 +1,104 @@
+import json
+from datetime import date, timedelta
+
+from django.test import TestCase
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+
+from .models import Task, Category
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+    """Опрашиваемые эндпоинты должны отвечать 304 по версиям данных пользователя"""
+
+    POLLED_URLS = [
+        '/api/tasks/',
+        '/api/categories/',
+        '/api/deadlines/',
+        '/api/today-statistics/',
+        f'/api/history/?from_date={date.today() - timedelta(days=7)}&to_date={date.today()}',
+    ]
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='etaguser',
+            email='etag@example.com',
+            password='testpass123',
+        )
+        self.category = Category.objects.create(
+            name='ETag category',
+            color='rgba(255, 0, 0, 0.4)',
+            user=self.user,
+            is_custom=True,
+        )
+        self.task = Task.objects.create(
+            name='ETag task',
+            order=1,
+            category=self.category,
+            user=self.user,
+            deadline=date.today(),
+            planned_time=timedelta(hours=1),
+        )
+        self.client.login(username='etaguser', password='testpass123')
+
+    def _get_etags(self) -> dict[str, str]:
+        etags = {}
+        for url in self.POLLED_URLS:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertTrue(response['ETag'].startswith('W/"'), url)
+            etags[url] = response['ETag']
+        return etags
+
+    def test_not_modified_without_repository_queries(self):
+        """Тест ответа 304 без запросов к таблицам приложения"""
+        etags = self._get_etags()
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                # остаются только запросы сессии и пользователя
+                with self.assertNumQueries(2):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_writes_change_etags(self):
+        """Тест смены ETag после записей задач, категорий и истории"""
+        etags = self._get_etags()
+        response = self.client.put(
+            f'/api/category/{self.category.id}/',
+            json.dumps({'name': 'Renamed ETag category', 'color': 'rgba(0, 0, 0, 0.4)', 'description': ''}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        new_etags = self._get_etags()
+        for url in self.POLLED_URLS:
+            with self.subTest(url=url):
+                self.assertNotEqual(etags[url], new_etags[url])
+
+        etags = new_etags
+        response = self.client.post(
+            f'/api/history/move-to-history/{self.task.id}/',
+            {'execution_time': '01:00:00', 'successful': 'true'},
+        )
+        self.assertEqual(response.status_code, 201)
+        new_etags = self._get_etags()
+        self.assertEqual(etags['/api/categories/'], new_etags['/api/categories/'])
+        for url in self.POLLED_URLS:
+            if url != '/api/categories/':
+                with self.subTest(url=url):
+                    self.assertNotEqual(etags[url], new_etags[url])
+
+    def test_etags_are_per_user(self):
+        """Тест того, что ETag одного пользователя не подходит другому"""
+        etags = self._get_etags()
+        User.objects.create_user(
+            username='etagother',
+            email='etagother@example.com',
+            password='testpass123',
+        )
+        self.client.login(username='etagother', password='testpass123')
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
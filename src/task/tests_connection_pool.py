@@ -0,0 +1,129 @@
+from django.test import TransactionTestCase, SimpleTestCase
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.contrib.auth import get_user_model
+
+from core.container import RequestContainer
+from core.pool import (
+    PoolMetrics, ConnectionPoolLifespan, get_pool_options, get_async_pool,
+    enable_async_pools, async_pools_enabled, close_async_pools,
+)
+from .models import Task
+from .infrastructure import AsyncTaskRepository
+
+User = get_user_model()
+
+
+class ConnectionPoolTest(TransactionTestCase):
+    """Соединения с базой должны браться из пула и возвращаться в него"""
+
+    # базовые категории из миграций нужны остальным тестам
+    serialized_rollback = True
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='pooluser',
+            email='pool@example.com',
+            password='testpass123',
+        )
+
+    def tearDown(self):
+        enable_async_pools(False)
+
+    def test_connection_is_returned_to_pool(self):
+        """Тест возврата соединения Django в пул вместо закрытия"""
+        connection.close()
+        connection.ensure_connection()
+        raw_connection = connection.connection
+        self.assertIs(raw_connection._pool, connection.pool)
+
+        connection.close()
+        self.assertIsNone(connection.connection)
+        self.assertFalse(raw_connection.closed)
+        self.assertGreaterEqual(PoolMetrics.snapshot(connection.pool)['pool_available'], 1)
+
+    def test_broken_connection_is_not_reused(self):
+        """Тест проверки соединения перед выдачей из пула"""
+        connection.ensure_connection()
+        broken_connection = connection.connection
+        connection.close()
+        broken_connection.close()
+
+        for _ in range(connection.pool.max_size + 1):
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                self.assertEqual(cursor.fetchone(), (1,))
+            self.assertIsNot(connection.connection, broken_connection)
+            connection.close()
+
+    async def test_async_connection_is_returned_to_pool(self):
+        """Тест асинхронного соединения из пула под ASGI"""
+        enable_async_pools()
+        try:
+            async with RequestContainer() as container:
+                repository = AsyncTaskRepository(Task, container.async_connection)
+                await repository.aget_ordered_user_tasks_json(self.user.id)
+                raw_connection = await container.async_connection.get()
+                self.assertIs(raw_connection._pool, await get_async_pool('default'))
+            self.assertFalse(container.async_connection.is_open)
+            self.assertFalse(raw_connection.closed)
+            self.assertGreaterEqual(PoolMetrics.snapshot_all()['default-async']['requests_num'], 1)
+        finally:
+            await close_async_pools()
+
+    async def test_async_repository_uses_django_connection_under_wsgi(self):
+        """Тест запросов асинхронного репозитория через пул соединений Django без пула асинхронных соединений"""
+        async with RequestContainer() as container:
+            repository = AsyncTaskRepository(Task, container.async_connection)
+            self.assertEqual(await repository.aget_ordered_user_tasks_json(self.user.id), [])
+            self.assertTrue(await container.async_connection.uses_django_connection())
+            self.assertFalse(container.async_connection.is_open)
+
+    def test_metrics_for_staff_only(self):
+        """Тест метрик пулов соединений"""
+        self.client.login(username='pooluser', password='testpass123')
+        self.assertEqual(self.client.get('/api/pool-metrics/').status_code, 403)
+        User.objects.filter(id=self.user.id).update(is_staff=True)
+        response = self.client.get('/api/pool-metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(response.json()['default']['requests_num'], 1)
+        self.assertIn('requests_wait_ms_avg', response.json()['default'])
+
+
+class PoolSettingsTest(SimpleTestCase):
+    """Настройки пула и точка входа ASGI"""
+
+    def test_pool_options(self):
+        """Тест значений по умолчанию и несовместимости с CONN_MAX_AGE"""
+        self.assertIsNone(get_pool_options({'OPTIONS': {}, 'CONN_MAX_AGE': 0}))
+        options = get_pool_options({'OPTIONS': {'pool': {'max_size': 4}}, 'CONN_MAX_AGE': 0})
+        self.assertEqual(options['max_size'], 4)
+        self.assertTrue(options['check'])
+        with self.assertRaises(ImproperlyConfigured):
+            get_pool_options({'OPTIONS': {'pool': True}, 'CONN_MAX_AGE': 60})
+
+    async def test_lifespan(self):
+        """Тест включения пулов асинхронных соединений и ответа на lifespan"""
+        messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        async def application(scope, receive, send):
+            raise AssertionError('lifespan не должен доходить до приложения Django')
+
+        try:
+            lifespan = ConnectionPoolLifespan(application)
+            self.assertTrue(async_pools_enabled())
+            # пул не открывается без базы: SimpleTestCase не разрешает запросы
+            enable_async_pools(False)
+            await lifespan({'type': 'lifespan'}, receive, send)
+        finally:
+            enable_async_pools(False)
+        self.assertEqual(sent, ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
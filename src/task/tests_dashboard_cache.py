@@ -0,0 +1,119 @@
+import json
+from datetime import timedelta
+
+from django.test import TestCase
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+
+from core.cache import CacheMetrics
+from .models import Task, Category
+
+User = get_user_model()
+
+
+class TaskDashboardCacheTest(TestCase):
+    """Главная страница задач читается из кеша до следующей записи"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='dashboarduser',
+            email='dashboard@example.com',
+            password='testpass123',
+        )
+        self.category = Category.objects.create(
+            name='Dashboard category',
+            color='rgba(255, 0, 0, 0.4)',
+            user=self.user,
+            is_custom=True,
+        )
+        self.tasks = [
+            Task.objects.create(
+                name=f'Dashboard task {index}',
+                order=index + 1,
+                category=self.category,
+                user=self.user,
+                planned_time=timedelta(hours=1),
+            )
+            for index in range(3)
+        ]
+        self.client.login(username='dashboarduser', password='testpass123')
+
+    def _get_dashboard(self) -> dict:
+        response = self.client.get('/api/tasks/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def _get_metrics(self) -> dict:
+        return CacheMetrics.registry['task-dashboard'].snapshot()
+
+    def test_repeated_reads_are_served_from_cache(self):
+        """Тест повторного чтения без запросов к таблицам задач"""
+        first = self._get_dashboard()
+        # остаются только запросы сессии и пользователя
+        with self.assertNumQueries(2):
+            second = self._get_dashboard()
+        self.assertEqual(first, second)
+        self.assertEqual(self._get_metrics(), {'hits': 1, 'misses': 1})
+
+    def test_task_create_invalidates_cache(self):
+        """Тест сброса кеша после создания задачи"""
+        self._get_dashboard()
+        response = self.client.post(
+            '/api/task/',
+            json.dumps({
+                'name': 'New dashboard task',
+                'category': self.category.id,
+                'planned_time': '01:00:00',
+            }),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        dashboard = self._get_dashboard()
+        self.assertIn('New dashboard task', [task['name'] for task in dashboard['tasks']])
+        self.assertEqual(self._get_metrics(), {'hits': 0, 'misses': 2})
+
+    def test_order_update_invalidates_cache(self):
+        """Тест сброса кеша после изменения порядка задач"""
+        self._get_dashboard()
+        new_order = [task.id for task in reversed(self.tasks)]
+        response = self.client.put(
+            '/api/update-order/',
+            json.dumps({'order': new_order}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        dashboard = self._get_dashboard()
+        self.assertEqual([task['id'] for task in dashboard['tasks']], new_order)
+
+    def test_category_update_invalidates_cache(self):
+        """Тест сброса кеша после изменения категории"""
+        self._get_dashboard()
+        response = self.client.put(
+            f'/api/category/{self.category.id}/',
+            json.dumps({'name': 'Renamed category', 'color': 'rgba(0, 0, 0, 0.4)', 'description': ''}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        dashboard = self._get_dashboard()
+        self.assertEqual(dashboard['chart_data']['categories'], ['Renamed category'])
+
+    def test_cache_is_per_user(self):
+        """Тест того, что кеш одного пользователя не отдается другому"""
+        self._get_dashboard()
+        User.objects.create_user(
+            username='otherdashboard',
+            email='otherdashboard@example.com',
+            password='testpass123',
+        )
+        self.client.login(username='otherdashboard', password='testpass123')
+        self.assertEqual(self._get_dashboard()['tasks'], [])
+
+    def test_metrics_view(self):
+        """Тест эндпоинта счетчиков кеша"""
+        self._get_dashboard()
+        self.assertEqual(self.client.get('/api/cache-metrics/').status_code, 403)
+        User.objects.filter(id=self.user.id).update(is_staff=True)
+        response = self.client.get('/api/cache-metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['task-dashboard'], {'hits': 0, 'misses': 1})
@@ -0,0 +1,89 @@
+import json
+from datetime import date, timedelta
+
+from django.test import TestCase
+from django.db import connection
+from django.contrib.auth import get_user_model
+
+from core.db import RawJson
+from core.http import RawJsonResponse
+from .models import Task, Category
+from .infrastructure import TaskRepository
+
+User = get_user_model()
+
+
+class JsonPassthroughTest(TestCase):
+    """JSON из Postgres в виде текста должен совпадать с разобранным"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='passthrough',
+            email='passthrough@example.com',
+            password='testpass123',
+        )
+        self.empty_user = User.objects.create_user(
+            username='passthroughempty',
+            email='passthroughempty@example.com',
+            password='testpass123',
+        )
+        category = Category.objects.create(
+            name='Passthrough category',
+            color='rgba(255, 0, 0, 0.4)',
+            user=self.user,
+            is_custom=True,
+        )
+        Task.objects.bulk_create([
+            Task(
+                name=f'Задача "{index}"',
+                order=index,
+                category=category,
+                user=self.user,
+                deadline=date.today() + timedelta(days=index % 5),
+                planned_time=timedelta(hours=1),
+            )
+            for index in range(20)
+        ])
+        self.repository = TaskRepository(Task, connection)
+        self.passthrough_repository = TaskRepository(Task, connection, json_passthrough=True)
+
+    def test_passthrough_matches_parsed_values(self):
+        """Тест совпадения текста JSON с разобранными значениями"""
+        methods = [
+            'get_ordered_user_tasks_json',
+            'get_count_user_tasks_in_categories',
+            'get_user_tasks_by_deadlines',
+        ]
+        for user in [self.user, self.empty_user]:
+            for name in methods:
+                with self.subTest(method=name, user=user.username):
+                    parsed = getattr(self.repository, name)(user.id)
+                    raw = getattr(self.passthrough_repository, name)(user.id)
+                    self.assertIsInstance(raw, RawJson)
+                    self.assertEqual(json.loads(raw), parsed)
+
+    def test_passthrough_does_not_leak_to_connection(self):
+        """Тест того, что загрузчик json как текста остается на курсоре"""
+        self.passthrough_repository.get_ordered_user_tasks_json(self.user.id)
+        self.assertIsInstance(self.repository.get_ordered_user_tasks_json(self.user.id), list)
+
+    def test_raw_json_response(self):
+        """Тест сборки тела ответа из текста JSON и обычных значений"""
+        response = RawJsonResponse({
+            'raw': RawJson('[{"id": 1}]'),
+            'plain': {'date': date(2025, 1, 2)},
+        })
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(
+            json.loads(response.content),
+            {'raw': [{'id': 1}], 'plain': {'date': '2025-01-02'}}
+        )
+
+    def test_views_return_same_json(self):
+        """Тест ответов эндпоинтов задач и календаря"""
+        self.client.login(username='passthrough', password='testpass123')
+        tasks = self.client.get('/api/tasks/').json()
+        self.assertEqual(tasks['tasks'], self.repository.get_ordered_user_tasks_json(self.user.id))
+        self.assertEqual(tasks['chart_data'], self.repository.get_count_user_tasks_in_categories(self.user.id))
+        deadlines = self.client.get('/api/deadlines/').json()
+        self.assertEqual(deadlines['calendar_data'], self.repository.get_user_tasks_by_deadlines(self.user.id))
@@ -0,0 +1,104 @@
+from datetime import date, timedelta
+
+from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.contrib.auth import get_user_model
+
+from history.models import History
+from history.infrastructure import HistoryRepository
+from history.services import HistoryService
+from history.constants.choices import HistoryTaskStatusChoices
+from .models import Task, Category
+from .domain import TaskEntity
+from .infrastructure import TaskRepository
+
+User = get_user_model()
+
+
+class QueryBatchTest(TestCase):
+    """Запросы, отправленные пакетом, должны возвращать те же данные, что и по одному"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='batchuser',
+            email='batch@example.com',
+            password='testpass123',
+        )
+        self.category = Category.objects.create(
+            name='Batch category',
+            color='rgba(255, 0, 0, 0.4)',
+            user=self.user,
+            is_custom=True,
+        )
+        for index in range(3):
+            Task.objects.create(
+                name=f'Batch task {index}',
+                order=(3 - index) * TaskEntity.ORDER_STEP,
+                category=self.category,
+                user=self.user,
+                deadline=date.today(),
+                planned_time=timedelta(hours=1),
+            )
+        History.objects.create(
+            name='Batch history',
+            category=self.category,
+            user=self.user,
+            planned_time=timedelta(hours=1),
+            execution_time=timedelta(minutes=50),
+            execution_date=date.today(),
+            status=HistoryTaskStatusChoices.SUCCESSFUL,
+        )
+        self.task_repository = TaskRepository(Task, connection)
+        self.history_repository = HistoryRepository(History, connection)
+        self.client.login(username='batchuser', password='testpass123')
+
+    def test_batched_results_match_sequential(self):
+        """Тест совпадения результатов пакета с результатами отдельных запросов"""
+        expected_chart_data = self.task_repository.get_count_user_tasks_in_categories(self.user.id)
+        expected_tasks = self.task_repository.get_ordered_user_tasks_json(self.user.id)
+        with self.task_repository.batch():
+            chart_data = self.task_repository.get_count_user_tasks_in_categories(self.user.id)
+            tasks = self.task_repository.get_ordered_user_tasks_json(self.user.id)
+        self.assertEqual(chart_data.result, expected_chart_data)
+        self.assertEqual(tasks.result, expected_tasks)
+        self.assertEqual([task['name'] for task in tasks.result], ['Batch task 2', 'Batch task 1', 'Batch task 0'])
+
+    def test_history_today_statistics(self):
+        """Тест статистики истории на сегодня, собранной пакетом"""
+        statistics = HistoryService(self.history_repository).get_user_history_statistics_for_today(self.user.id)
+        self.assertEqual(
+            statistics['tasks'],
+            self.history_repository.get_user_tasks_for_today_json(self.user.id, date.today()),
+        )
+        self.assertEqual(
+            statistics['categories'],
+            self.history_repository.get_count_user_tasks_in_categories_for_today(self.user.id, date.today()),
+        )
+        self.assertEqual(len(statistics['tasks']), 1)
+
+    def test_views(self):
+        """Тест эндпоинтов, которые читают данные пакетом"""
+        response = self.client.get('/api/tasks/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['tasks']), 3)
+        response = self.client.get('/api/history/today-statistics/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_result_is_available_after_batch(self):
+        """Тест недоступности результата до синхронизации пакета"""
+        with self.task_repository.batch():
+            tasks = self.task_repository.get_ordered_user_tasks_json(self.user.id)
+            with self.assertRaises(RuntimeError):
+                tasks.result
+        self.assertEqual(len(tasks.result), 3)
+
+    def test_nested_batches_are_rejected(self):
+        """Тест запрета вложенных пакетов"""
+        with self.task_repository.batch():
+            with self.assertRaises(RuntimeError):
+                with self.history_repository.batch():
+                    pass
+        # после пакета репозиторий снова возвращает результаты сразу
+        self.assertEqual(len(self.task_repository.get_ordered_user_tasks_json(self.user.id)), 3)
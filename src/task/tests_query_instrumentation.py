@@ -0,0 +1,118 @@
+import json
+
+from django.test import TestCase, Client, override_settings
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+
+from core.instrumentation import RequestQueries, EndpointQueryMetrics, install_query_recorder, record_query
+from .models import Task
+from .infrastructure import TaskRepository
+
+User = get_user_model()
+
+
+@override_settings(SQL_INSTRUMENTATION=True, SLOW_REQUEST_THRESHOLD_MS=60 * 1000)
+class QueryInstrumentationTest(TestCase):
+    """Каждый запрос должен отдавать замеры SQL в Server-Timing и попадать в сводку по эндпоинтам"""
+
+    def setUp(self):
+        cache.clear()
+        EndpointQueryMetrics.reset()
+        self.user = User.objects.create_user(
+            username='instrumenteduser',
+            email='instrumented@example.com',
+            password='testpass123',
+        )
+        self.client.login(username='instrumenteduser', password='testpass123')
+        self.dates = {'from_date': '2024-01-01', 'to_date': '2024-01-31'}
+
+    def _get_server_timing(self, response) -> dict[str, dict[str, str]]:
+        metrics = {}
+        for metric in response['Server-Timing'].split(', '):
+            name, *params = metric.split(';')
+            metrics[name] = dict(param.split('=', 1) for param in params)
+        return metrics
+
+    def test_server_timing_header(self):
+        """Тест заголовка Server-Timing"""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/history/list/', self.dates)
+        self.assertEqual(response.status_code, 200)
+        server_timing = self._get_server_timing(response)
+        self.assertEqual(server_timing['db']['desc'], f'"{len(context.captured_queries)} queries"')
+        self.assertLessEqual(float(server_timing['db-slowest']['dur']), float(server_timing['db']['dur']))
+        self.assertLessEqual(float(server_timing['db']['dur']), float(server_timing['total']['dur']))
+
+    def test_async_view(self):
+        """Тест замеров асинхронного представления"""
+        response = self.client.get('/api/tasks/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(self._get_server_timing(response)['db']['desc'], '"0 queries"')
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_slow_request_log(self):
+        """Тест записи в лог запроса дольше порога"""
+        with self.assertLogs('core.instrumentation', 'WARNING') as logs:
+            self.client.get('/api/history/list/', self.dates)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['event'], 'slow_request')
+        self.assertEqual(record['endpoint'], 'GET /api/history/list/')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+        self.assertTrue(record['slowest_query'])
+
+    def test_fast_request_is_not_logged(self):
+        """Тест запроса быстрее порога"""
+        with self.assertNoLogs('core.instrumentation', 'WARNING'):
+            self.client.get('/api/history/list/', self.dates)
+
+    def test_endpoint_metrics(self):
+        """Тест сводки по эндпоинтам"""
+        self.client.get('/api/history/list/', self.dates)
+        self.client.get('/api/history/list/', {'from_date': '2024-02-01', 'to_date': '2024-02-28'})
+        metrics = EndpointQueryMetrics.snapshot_all()['GET /api/history/list/']
+        self.assertEqual(metrics['requests'], 2)
+        self.assertGreater(metrics['queries'], 0)
+        self.assertEqual(metrics['slow_requests'], 0)
+
+        self.assertEqual(self.client.get('/api/query-metrics/').status_code, 403)
+        User.objects.filter(id=self.user.id).update(is_staff=True)
+        response = self.client.get('/api/query-metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('GET /api/history/list/', response.json())
+
+    @override_settings(SQL_INSTRUMENTATION=False)
+    def test_disabled(self):
+        """Тест выключенных замеров"""
+        client = Client()
+        client.login(username='instrumenteduser', password='testpass123')
+        response = client.get('/api/history/list/', self.dates)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(EndpointQueryMetrics.snapshot_all(), {})
+
+    def test_record_query(self):
+        """Тест записи запросов асинхронных соединений"""
+        record_query('SELECT 1', 0.5)
+        with RequestQueries() as queries:
+            record_query('SELECT 1', 0.001)
+            record_query('SELECT 2', 0.002)
+        record_query('SELECT 3', 0.003)
+        self.assertEqual(queries.count, 2)
+        self.assertEqual(queries.slowest_sql, 'SELECT 2')
+        self.assertAlmostEqual(queries.duration, 0.003)
+
+    def test_query_batch_sync(self):
+        """Тест записи ожидания ответов пакета запросов при синхронизации пайплайна"""
+        install_query_recorder()
+        repository = TaskRepository(Task, connection)
+        with RequestQueries() as queries:
+            with repository.batch():
+                repository.get_count_user_tasks_in_categories(self.user.id)
+                repository.get_ordered_user_tasks_json(self.user.id)
+                sent_duration = queries.duration
+        self.assertEqual(queries.count, 2)
+        self.assertGreater(queries.duration, sent_duration)
+        self.assertTrue(queries.slowest_sql.startswith('-- pipeline sync, 2 queries'))
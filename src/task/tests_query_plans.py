@@ -0,0 +1,93 @@
+from datetime import date, timedelta
+
+from django.test import TestCase
+from django.db import connection
+from django.contrib.auth import get_user_model
+
+from core.testing import QueryPlanAssertionsMixin
+from .models import Task, Category
+from .infrastructure import TaskRepository, CategoryRepository
+
+User = get_user_model()
+
+
+class TaskQueryPlanTest(QueryPlanAssertionsMixin, TestCase):
+    """Запросы репозиториев задач и категорий должны идти по индексам"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(
+                username=f'planuser{index}',
+                email=f'plan{index}@example.com',
+                password='testpass123',
+            )
+            for index in range(5)
+        ]
+        cls.user = cls.users[0]
+        categories = Category.objects.bulk_create([
+            Category(
+                name=f'Category {index}',
+                color='rgba(255, 0, 0, 0.4)',
+                user=user,
+                is_custom=True,
+            )
+            for user in cls.users
+            for index in range(5)
+        ])
+        Task.objects.bulk_create([
+            Task(
+                name=f'Task {index}',
+                order=index,
+                category=categories[index % len(categories)],
+                user=cls.users[index % len(cls.users)],
+                deadline=date.today() + timedelta(days=index % 10) if index % 3 else None,
+                planned_time=timedelta(hours=1),
+            )
+            for index in range(2000)
+        ])
+        cls.task = Task.objects.filter(user=cls.user).first()
+        cls.category = Category.objects.filter(user=cls.user).first()
+
+    def setUp(self):
+        self.analyze_tables()
+        self.task_repository = TaskRepository(Task, connection)
+        self.category_repository = CategoryRepository(Category, connection)
+
+    def test_task_repository_reads(self):
+        """Тест планов запросов чтения задач"""
+        user_id = self.user.id
+        calls = {
+            'get_ordered_user_tasks_json': lambda: self.task_repository.get_ordered_user_tasks_json(user_id),
+            'get_ordered_user_tasks': lambda: self.task_repository.get_ordered_user_tasks(user_id),
+            'get_task_by_id': lambda: self.task_repository.get_task_by_id(self.task.id),
+            'get_count_user_tasks_in_categories': lambda: self.task_repository.get_count_user_tasks_in_categories(user_id),
+            'get_user_tasks_by_deadlines': lambda: self.task_repository.get_user_tasks_by_deadlines(user_id),
+            'get_next_task_order': lambda: self.task_repository.get_next_task_order(user_id),
+            'get_count_user_tasks_in_categories_for_today': lambda: self.task_repository.get_count_user_tasks_in_categories_for_today(user_id, date.today()),
+            'get_user_tasks_for_today_json': lambda: self.task_repository.get_user_tasks_for_today_json(user_id, date.today()),
+            'get_user_today_statistics_json': lambda: self.task_repository.get_user_today_statistics_json(user_id, date.today()),
+            'get_tasks_bulk': lambda: self.task_repository.get_tasks_bulk([self.task.id]),
+        }
+        for name, call in calls.items():
+            with self.subTest(method=name):
+                self.assertNoSequentialScans(call)
+
+    def test_task_repository_order_update(self):
+        """Тест плана запроса изменения порядка задач"""
+        task_ids = list(
+            Task.objects.filter(user=self.user).order_by('-order').values_list('id', flat=True)
+        )
+        self.assertNoSequentialScans(
+            lambda: self.task_repository.update_user_tasks_order(self.user.id, task_ids)
+        )
+
+    def test_category_repository_reads(self):
+        """Тест планов запросов чтения категорий"""
+        calls = {
+            'get_category_by_id': lambda: self.category_repository.get_category_by_id(self.category.id),
+            'get_ordered_user_categories_json': lambda: self.category_repository.get_ordered_user_categories_json(self.user.id),
+        }
+        for name, call in calls.items():
+            with self.subTest(method=name):
+                self.assertNoSequentialScans(call)
@@ -0,0 +1,121 @@
+import unittest
+from types import SimpleNamespace
+from uuid import uuid4
+
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.core.cache import cache
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+
+from core.cache import tasks_version
+from core.container import RequestContainer
+from core.routers import ReplicaRouter, recent_writes, get_read_alias
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICA='replica', REPLICA_STICKY_SECONDS=5)
+class ReplicaRouterTest(SimpleTestCase):
+    """Чтение с подсказкой replica_read должно уходить на реплику, кроме окна после записи пользователя"""
+
+    def setUp(self):
+        cache.clear()
+        self.router = ReplicaRouter()
+        self.user = SimpleNamespace(id=uuid4(), is_authenticated=True)
+
+    def test_reads_without_hint_use_primary(self):
+        """Тест запросов ORM без подсказки"""
+        self.assertIsNone(self.router.db_for_read(User))
+
+    def test_replica_read(self):
+        """Тест чтения с реплики"""
+        self.assertEqual(get_read_alias('default', self.user), 'replica')
+        self.assertEqual(get_read_alias('default'), 'replica')
+        self.assertEqual(get_read_alias('default', SimpleNamespace(is_authenticated=False)), 'replica')
+
+    def test_read_your_writes(self):
+        """Тест чтения с основной базы после записи пользователя"""
+        recent_writes.record(self.user.id)
+        self.assertEqual(get_read_alias('default', self.user), 'default')
+        other_user = SimpleNamespace(id=uuid4(), is_authenticated=True)
+        self.assertEqual(get_read_alias('default', other_user), 'replica')
+
+    @override_settings(REPLICA_STICKY_SECONDS=0)
+    def test_sticky_window_expires(self):
+        """Тест окончания окна после записи"""
+        recent_writes.record(self.user.id)
+        self.assertEqual(get_read_alias('default', self.user), 'replica')
+
+    @override_settings(DATABASE_REPLICA=None)
+    def test_without_replica(self):
+        """Тест чтения с основной базы без настроенной реплики"""
+        self.assertEqual(get_read_alias('default', self.user), 'default')
+
+    def test_no_migrations_on_replica(self):
+        """Тест запрета миграций на реплике"""
+        self.assertFalse(self.router.allow_migrate('replica', 'task'))
+        self.assertIsNone(self.router.allow_migrate('default', 'task'))
+
+    def test_container_read_connection(self):
+        """Тест выбора базы соединением чтения контейнера при первом обращении"""
+        container = RequestContainer(user=self.user)
+        self.assertEqual(container.connection.alias, 'default')
+        self.assertEqual(container.read_connection.alias, 'replica')
+        recent_writes.record(self.user.id)
+        self.assertEqual(RequestContainer(user=self.user).read_connection.alias, 'default')
+        # выбранная база не меняется до конца запроса
+        self.assertEqual(container.read_connection.alias, 'replica')
+
+
+class ReplicaTransactionTest(TestCase):
+    """Чтение внутри транзакции основной базы должно видеть ее записи"""
+
+    @override_settings(DATABASE_REPLICA='replica')
+    def test_atomic_block_uses_primary(self):
+        """Тест чтения с основной базы внутри транзакции"""
+        self.assertEqual(get_read_alias('default'), 'default')
+
+    def test_write_is_recorded_after_commit(self):
+        """Тест отметки о записи после фиксации транзакции"""
+        cache.clear()
+        user_id = uuid4()
+        with self.captureOnCommitCallbacks(execute=True):
+            tasks_version.bump(user_id)
+            self.assertFalse(recent_writes.contains(user_id))
+        self.assertTrue(recent_writes.contains(user_id))
+
+
+@unittest.skipUnless(settings.DATABASE_REPLICA, 'Реплика не настроена (POSTGRES_REPLICA_HOST)')
+class ReplicaRoutingIntegrationTest(TransactionTestCase):
+    """Представления чтения должны выполнять запросы на соединении реплики"""
+
+    serialized_rollback = True
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='replicauser',
+            email='replica@example.com',
+            password='testpass123',
+        )
+        self.client.login(username='replicauser', password='testpass123')
+
+    def _get_replica_queries(self, url: str, params: dict = None) -> int:
+        with CaptureQueriesContext(connections[settings.DATABASE_REPLICA]) as context:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_read_views_use_replica(self):
+        """Тест статистики, календаря и списков на реплике"""
+        dates = {'from_date': '2024-01-01', 'to_date': '2024-01-31'}
+        self.assertGreater(self._get_replica_queries('/api/history/list/', dates), 0)
+        self.assertGreater(self._get_replica_queries('/api/history/today-statistics/'), 0)
+
+    def test_reads_after_write_use_primary(self):
+        """Тест чтения своих записей с основной базы"""
+        tasks_version.bump(self.user.id)
+        self.assertEqual(self._get_replica_queries('/api/history/today-statistics/'), 0)
@@ -0,0 +1,364 @@
+import json
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from django.test import TestCase, TransactionTestCase
+from django.db import connection
+from django.contrib.auth import get_user_model
+
+from core.cache import VersionedUserCache, categories_version
+from history.models import History
+from history.constants.choices import HistoryTaskStatusChoices
+from .models import Task, Category
+from .domain import TaskEntity, CategoryEntity
+from .infrastructure import TaskRepository, CategoryRepository, CategoryDirectory
+from .services import TaskOrderUpdateUseCase, TaskMoveUseCase, DeadlinesUpdateUseCase, TaskUseCase
+
+User = get_user_model()
+
+
+class EntityHydrationTest(TestCase):
+    """Сборка сущностей из values_list не должна порождать запросов на каждую строку"""
+
+    TASKS_COUNT = 1000
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='hydration',
+            email='hydration@example.com',
+            password='testpass123',
+        )
+        self.category = Category.objects.create(
+            name='Hydration category',
+            color='rgba(255, 0, 0, 0.4)',
+            user=self.user,
+            is_custom=True,
+        )
+        Task.objects.bulk_create([
+            Task(
+                name=f'Task {index}',
+                order=index,
+                category=self.category,
+                user=self.user,
+                deadline=date.today() + timedelta(days=index % 30),
+                planned_time=timedelta(hours=1),
+            )
+            for index in range(1, self.TASKS_COUNT + 1)
+        ])
+        self.repository = TaskRepository(Task, connection)
+
+    def test_ordered_user_tasks_single_query(self):
+        """Тест получения всех задач пользователя одним запросом"""
+        with self.assertNumQueries(1):
+            tasks = self.repository.get_ordered_user_tasks(self.user.id)
+        self.assertEqual(len(tasks), self.TASKS_COUNT)
+        self.assertIsInstance(tasks[0], TaskEntity)
+        self.assertEqual([task.order for task in tasks], list(range(1, self.TASKS_COUNT + 1)))
+        self.assertEqual(tasks[0].user_id, self.user.id)
+        self.assertEqual(tasks[0].category_id, self.category.id)
+
+    def test_tasks_bulk_single_query(self):
+        """Тест получения задач по списку id одним запросом"""
+        task_ids = list(Task.objects.values_list('id', flat=True))
+        with self.assertNumQueries(1):
+            tasks = self.repository.get_tasks_bulk(task_ids)
+        self.assertEqual(len(tasks), self.TASKS_COUNT)
+
+    def test_order_update_query_count_does_not_depend_on_size(self):
+        """Тест количества запросов при изменении порядка задач"""
+        new_order = list(
+            Task.objects.filter(user=self.user).order_by('-order').values_list('id', flat=True)
+        )
+        use_case = TaskOrderUpdateUseCase(task_repository=self.repository)
+        with self.assertNumQueries(1):
+            use_case.execute(self.user.id, new_order)
+        self.assertEqual(Task.objects.get(id=new_order[0]).order, TaskEntity.ORDER_STEP)
+
+    def test_order_update_rejects_foreign_task(self):
+        """Тест отказа в изменении порядка, если среди задач есть чужая"""
+        other_user = User.objects.create_user(
+            username='hydrationother',
+            email='hydrationother@example.com',
+            password='testpass123',
+        )
+        other_task = Task.objects.create(
+            name='Other task',
+            order=1,
+            user=other_user,
+            planned_time=timedelta(hours=1),
+        )
+        new_order = list(
+            Task.objects.filter(user=self.user).order_by('-order').values_list('id', flat=True)
+        )
+        use_case = TaskOrderUpdateUseCase(task_repository=self.repository)
+        with self.assertRaises(PermissionError):
+            use_case.execute(self.user.id, [*new_order, other_task.id])
+        self.assertEqual(Task.objects.get(id=new_order[0]).order, self.TASKS_COUNT)
+        self.assertEqual(Task.objects.get(id=other_task.id).order, 1)
+
+    def test_category_and_history_hydration(self):
+        """Тест сборки категорий и истории без подгрузки связанных строк"""
+        History.objects.bulk_create([
+            History(
+                name=f'History {index}',
+                category=self.category,
+                user=self.user,
+                planned_time=timedelta(hours=1),
+                execution_time=timedelta(hours=2),
+                status=HistoryTaskStatusChoices.SUCCESSFUL,
+            )
+            for index in range(self.TASKS_COUNT)
+        ])
+        with self.assertNumQueries(1):
+            categories = Category.objects.filter(user=self.user).to_entity_list()
+        self.assertIsInstance(categories[0], CategoryEntity)
+        self.assertEqual(categories[0].user_id, self.user.id)
+
+        with self.assertNumQueries(1):
+            history = History.objects.filter(user=self.user).to_entity_list()
+        self.assertEqual(len(history), self.TASKS_COUNT)
+        self.assertEqual(history[0].category_id, self.category.id)
+
+
+class DeadlinesUpdateTest(TestCase):
+    """Перенос задач в календаре одним запросом с проверкой владельца"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='deadlines',
+            email='deadlines@example.com',
+            password='testpass123',
+        )
+        self.other_user = User.objects.create_user(
+            username='deadlinesother',
+            email='deadlinesother@example.com',
+            password='testpass123',
+        )
+        self.today = date.today()
+        self.tasks = Task.objects.bulk_create([
+            Task(
+                name=f'Deadline task {index}',
+                order=index,
+                user=self.user,
+                deadline=self.today,
+                planned_time=timedelta(hours=1),
+            )
+            for index in range(200)
+        ])
+        self.other_task = Task.objects.create(
+            name='Other user task',
+            order=1,
+            user=self.other_user,
+            deadline=self.today,
+            planned_time=timedelta(hours=1),
+        )
+        self.use_case = DeadlinesUpdateUseCase(
+            task_repository=TaskRepository(Task, connection)
+        )
+
+    def test_batch_update_single_query(self):
+        """Тест обновления только изменившихся задач одним запросом"""
+        tomorrow = self.today + timedelta(days=1)
+        new_deadlines = {
+            str(self.today): [{'id': task.id} for task in self.tasks[:50]],
+            str(tomorrow): [{'id': task.id} for task in self.tasks[50:]],
+        }
+        with self.assertNumQueries(1):
+            updated_count = self.use_case.execute(self.user.id, new_deadlines)
+        self.assertEqual(updated_count, 150)
+        self.assertEqual(Task.objects.filter(user=self.user, deadline=tomorrow).count(), 150)
+
+    def test_foreign_task_rejects_batch(self):
+        """Тест отказа в переносе всех задач, если одна из них чужая"""
+        tomorrow = str(self.today + timedelta(days=1))
+        new_deadlines = {
+            tomorrow: [{'id': self.tasks[0].id}, {'id': self.other_task.id}],
+        }
+        with self.assertRaises(PermissionError):
+            self.use_case.execute(self.user.id, new_deadlines)
+        self.assertFalse(Task.objects.filter(deadline=tomorrow).exists())
+
+    def test_view_responses(self):
+        """Тест ответов эндпоинта переноса задач"""
+        self.client.login(username='deadlines', password='testpass123')
+        tomorrow = str(self.today + timedelta(days=1))
+        response = self.client.post(
+            '/api/update-deadlines/',
+            json.dumps({'new_deadlines': {tomorrow: [{'id': self.tasks[0].id}]}}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.json(), {'updated_count': 1})
+        response = self.client.post(
+            '/api/update-deadlines/',
+            json.dumps({'new_deadlines': {tomorrow: [{'id': self.other_task.id}]}}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 403)
+        response = self.client.post(
+            '/api/update-deadlines/',
+            json.dumps({'new_deadlines': {'not a date': [{'id': self.tasks[0].id}]}}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class TaskMoveTest(TestCase):
+    """Перемещение одной задачи должно менять только ее строку"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='moveuser',
+            email='move@example.com',
+            password='testpass123',
+        )
+        self.tasks = Task.objects.bulk_create([
+            Task(
+                name=f'Move task {index}',
+                order=index * TaskEntity.ORDER_STEP,
+                user=self.user,
+                planned_time=timedelta(hours=1),
+            )
+            for index in range(1, 101)
+        ])
+        self.repository = TaskRepository(Task, connection)
+        self.use_case = TaskMoveUseCase(task_repository=self.repository)
+
+    def _get_orders(self) -> dict[int, int]:
+        return dict(Task.objects.filter(user=self.user).values_list('id', 'order'))
+
+    def _get_ids_in_order(self) -> list[int]:
+        return [task['id'] for task in self.repository.get_ordered_user_tasks_json(self.user.id)]
+
+    def test_move_updates_one_row(self):
+        """Тест перемещения задачи между соседями без изменения остальных"""
+        moved, before, after = self.tasks[90], self.tasks[4], self.tasks[5]
+        orders_before_move = self._get_orders()
+        self.use_case.execute(self.user.id, moved.id, before.id, after.id)
+        orders_after_move = self._get_orders()
+        changed = [task_id for task_id, order in orders_after_move.items() if orders_before_move[task_id] != order]
+        self.assertEqual(changed, [moved.id])
+
+        expected = [task.id for task in self.tasks if task.id != moved.id]
+        expected.insert(5, moved.id)
+        self.assertEqual(self._get_ids_in_order(), expected)
+
+    def test_move_to_start_and_end(self):
+        """Тест перемещения задачи в начало и в конец списка"""
+        self.use_case.execute(self.user.id, self.tasks[50].id, None, self.tasks[0].id)
+        self.assertEqual(self._get_ids_in_order()[0], self.tasks[50].id)
+        self.use_case.execute(self.user.id, self.tasks[0].id, self.tasks[-1].id, None)
+        self.assertEqual(self._get_ids_in_order()[-1], self.tasks[0].id)
+
+    def test_exhausted_gap_rebalances(self):
+        """Тест перенумерации задач, когда промежуток между соседями исчерпан"""
+        before, after = self.tasks[0], self.tasks[1]
+        moved_ids = [task.id for task in self.tasks[2:22]]
+        # каждая следующая задача встает сразу после первой, сужая промежуток
+        for moved_id in moved_ids:
+            self.use_case.execute(self.user.id, moved_id, before.id, after.id)
+            after = Task.objects.get(id=moved_id)
+        ids = self._get_ids_in_order()
+        self.assertEqual(ids[:22], [before.id, *reversed(moved_ids), self.tasks[1].id])
+        orders = sorted(self._get_orders().values())
+        self.assertEqual(len(set(orders)), len(orders))
+
+    def test_move_rejects_foreign_and_invalid_neighbours(self):
+        """Тест отказа при чужой задаче и неверном порядке соседей"""
+        other_user = User.objects.create_user(
+            username='moveother',
+            email='moveother@example.com',
+            password='testpass123',
+        )
+        other_task = Task.objects.create(
+            name='Other task',
+            order=TaskEntity.ORDER_STEP,
+            user=other_user,
+            planned_time=timedelta(hours=1),
+        )
+        with self.assertRaises(PermissionError):
+            self.use_case.execute(self.user.id, self.tasks[0].id, other_task.id, None)
+        with self.assertRaises(ValueError):
+            self.use_case.execute(self.user.id, self.tasks[0].id, self.tasks[5].id, self.tasks[4].id)
+
+    def test_view(self):
+        """Тест ответов эндпоинта перемещения задачи"""
+        self.client.login(username='moveuser', password='testpass123')
+        response = self.client.put(
+            '/api/move-task/',
+            json.dumps({'task_id': self.tasks[3].id, 'before_id': None, 'after_id': self.tasks[0].id}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'order': 0})
+        response = self.client.put(
+            '/api/move-task/',
+            json.dumps({'task_id': self.tasks[3].id}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class TaskOrderAllocationTest(TransactionTestCase):
+    """Параллельные создания задач одного пользователя получают разные порядки"""
+
+    THREADS_COUNT = 8
+    TASKS_PER_THREAD = 15
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='allocation',
+            email='allocation@example.com',
+            password='testpass123',
+        )
+        self.category = Category.objects.create(
+            name='Allocation category',
+            color='rgba(255, 0, 0, 0.4)',
+            user=self.user,
+            is_custom=True,
+        )
+        self.use_case = TaskUseCase(
+            task_repository=TaskRepository(Task, connection),
+            category_directory=CategoryDirectory(
+                CategoryRepository(Category, connection),
+                VersionedUserCache('category-directory', categories_version),
+            ),
+        )
+
+    def _create_tasks(self, thread_index: int) -> None:
+        try:
+            for index in range(self.TASKS_PER_THREAD):
+                self.use_case.create(self.user.id, {
+                    'name': f'Task {thread_index}-{index}',
+                    'category': self.category.id,
+                    'planned_time': '01:00:00',
+                })
+        finally:
+            connection.close()
+
+    def test_concurrent_creates_get_unique_orders(self):
+        """Тест уникальности порядков при создании задач из нескольких потоков"""
+        with ThreadPoolExecutor(max_workers=self.THREADS_COUNT) as executor:
+            list(executor.map(self._create_tasks, range(self.THREADS_COUNT)))
+        orders = list(Task.objects.filter(user=self.user).values_list('order', flat=True))
+        self.assertEqual(len(orders), self.THREADS_COUNT * self.TASKS_PER_THREAD)
+        self.assertEqual(len(set(orders)), len(orders))
+
+    def test_create_after_move_to_end(self):
+        """Тест создания задачи после перемещения другой задачи в конец списка"""
+        repository = TaskRepository(Task, connection)
+        for name in ('First', 'Second'):
+            self.use_case.create(self.user.id, {
+                'name': name,
+                'category': self.category.id,
+                'planned_time': '01:00:00',
+            })
+        first, second = Task.objects.filter(user=self.user).order_by('order')
+        TaskMoveUseCase(task_repository=repository).execute(self.user.id, first.id, second.id, None)
+        with self.assertNumQueries(2):
+            self.use_case.create(self.user.id, {
+                'name': 'Third',
+                'category': self.category.id,
+                'planned_time': '01:00:00',
+            })
+        names = [task['name'] for task in repository.get_ordered_user_tasks_json(self.user.id)]
+        self.assertEqual(names, ['Second', 'First', 'Third'])
@@ -0,0 +1,76 @@
+from unittest.mock import patch
+
+from django.test import TestCase, RequestFactory
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.contrib.auth import get_user_model
+
+from core.container import RequestContainer, RequestScoped
+from .infrastructure import TaskRepository
+from .services import TaskUseCase
+from .views import TaskView, task_repository, category_directory
+
+User = get_user_model()
+
+
+class RequestContainerTest(TestCase):
+    """Use case'ы и репозитории должны создаваться на каждый запрос и освобождаться после него"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='containeruser',
+            email='container@example.com',
+            password='testpass123',
+        )
+
+    def test_dependencies_are_shared_within_request(self):
+        """Тест одного экземпляра зависимости на запрос и разных экземпляров на разные запросы"""
+        container = RequestContainer()
+        use_case = TaskView.use_case.resolve(container)
+        self.assertIsInstance(use_case, TaskUseCase)
+        self.assertIs(TaskView.use_case.resolve(container), use_case)
+        self.assertIs(task_repository.resolve(container), use_case._task_repository)
+        self.assertIs(category_directory.resolve(container), use_case._category_directory)
+        self.assertIsNot(TaskView.use_case.resolve(RequestContainer()), use_case)
+
+    def test_repository_uses_request_connection(self):
+        """Тест соединения репозитория из контейнера запроса"""
+        container = RequestContainer()
+        repository = task_repository.resolve(container)
+        self.assertIsInstance(repository, TaskRepository)
+        self.assertIs(repository._connection, container.connection)
+        self.assertEqual(repository._connection.alias, 'default')
+
+    def test_close_releases_cursors_and_instances(self):
+        """Тест закрытия курсоров и сброса зависимостей при выходе из контейнера"""
+        with RequestContainer() as container:
+            repository = task_repository.resolve(container)
+            repository.get_ordered_user_tasks_json(self.user.id)
+            cursors = list(container.connection._cursors)
+            self.assertEqual(len(cursors), 1)
+        for cursor in cursors:
+            self.assertTrue(cursor.closed)
+        self.assertIsNot(task_repository.resolve(container), repository)
+
+    def test_background_cursors_are_not_closed(self):
+        """Тест курсоров, открытых вне контекста запроса, например в фоновом потоке"""
+        container = RequestContainer()
+        task_repository.resolve(container).get_ordered_user_tasks_json(self.user.id)
+        self.assertEqual(container.connection._cursors, [])
+
+    def test_middleware_closes_container(self):
+        """Тест закрытия контейнера после ответа"""
+        self.client.login(username='containeruser', password='testpass123')
+        with patch.object(RequestContainer, 'close', autospec=True, side_effect=RequestContainer.close) as close:
+            response = self.client.get('/api/tasks/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(close.call_count, 1)
+
+    def test_class_attribute_without_request(self):
+        """Тест доступа к зависимости через класс и без контейнера в запросе"""
+        self.assertIsInstance(TaskView.use_case, RequestScoped)
+        view = TaskView()
+        view.setup(RequestFactory().get('/api/task/1/'))
+        with self.assertRaises(ImproperlyConfigured):
+            view.use_case
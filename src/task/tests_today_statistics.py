@@ -0,0 +1,139 @@
+from datetime import date, timedelta
+
+from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.contrib.auth import get_user_model
+
+from history.models import History
+from history.infrastructure import HistoryRepository
+from history.constants.choices import HistoryTaskStatusChoices
+from .models import Task, Category
+from .domain import TaskEntity
+from .infrastructure import TaskRepository
+from .services import GetTodayStatisticsUseCase
+
+User = get_user_model()
+
+
+class TodayStatisticsTest(TestCase):
+    """Статистика на сегодня одним запросом должна совпадать с данными отдельных запросов"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='todayuser',
+            email='today@example.com',
+            password='testpass123',
+        )
+        self.categories = [
+            Category.objects.create(
+                name=f'Today category {index}',
+                color=f'rgba({index * 60}, 0, 0, 0.4)',
+                user=self.user,
+                is_custom=True,
+            )
+            for index in range(3)
+        ]
+        # категория 0 - только запланированные, 1 - обе таблицы, 2 - только выполненные
+        for index, category in enumerate([self.categories[0], self.categories[0], self.categories[1]]):
+            Task.objects.create(
+                name=f'Today task {index}',
+                order=(3 - index) * TaskEntity.ORDER_STEP,
+                category=category,
+                user=self.user,
+                deadline=date.today(),
+                planned_time=timedelta(hours=1),
+            )
+        Task.objects.create(
+            name='Tomorrow task',
+            order=TaskEntity.ORDER_STEP,
+            category=self.categories[0],
+            user=self.user,
+            deadline=date.today() + timedelta(days=1),
+            planned_time=timedelta(hours=1),
+        )
+        for category, status in [
+            (self.categories[1], HistoryTaskStatusChoices.SUCCESSFUL),
+            (self.categories[2], HistoryTaskStatusChoices.SUCCESSFUL),
+            (self.categories[2], HistoryTaskStatusChoices.SUCCESSFUL),
+            (self.categories[2], HistoryTaskStatusChoices.FAILED),
+        ]:
+            History.objects.create(
+                name=f'Today history {category.name}',
+                category=category,
+                user=self.user,
+                planned_time=timedelta(hours=1),
+                execution_time=timedelta(hours=1),
+                status=status,
+            )
+        self.task_repository = TaskRepository(Task, connection)
+        self.history_repository = HistoryRepository(History, connection)
+        self.use_case = GetTodayStatisticsUseCase(self.task_repository)
+
+    def _get_statistics_by_separate_queries(self) -> dict:
+        planned_tasks = self.task_repository.get_user_tasks_for_today_json(self.user.id, date.today())
+        completed_tasks = self.history_repository.get_user_tasks_for_today_json(self.user.id, date.today())
+        planned_categories = self.task_repository.get_count_user_tasks_in_categories_for_today(self.user.id, date.today())
+        completed_categories = self.history_repository.get_count_user_tasks_in_categories_for_today(self.user.id, date.today())
+        merged_categories = {}
+        for category in [*planned_categories, *completed_categories]:
+            if category['id'] in merged_categories:
+                merged_categories[category['id']]['taskCount'] += category['taskCount']
+            else:
+                merged_categories[category['id']] = dict(category)
+        return {
+            'tasks': {
+                'planned': [*planned_tasks, *completed_tasks],
+                'completed': completed_tasks,
+            },
+            'categories': {
+                'planned': list(merged_categories.values()),
+                'completed': completed_categories,
+            },
+        }
+
+    def _by_id(self, items: list[dict]) -> list[dict]:
+        return sorted(items, key=lambda item: item['id'])
+
+    def test_single_query_matches_separate_queries(self):
+        """Тест совпадения задач и количеств по категориям"""
+        expected = self._get_statistics_by_separate_queries()
+        with self.assertNumQueries(1):
+            actual = self.use_case.execute(self.user.id)
+
+        self.assertEqual(actual['tasks']['planned'][:3], expected['tasks']['planned'][:3])
+        self.assertEqual(self._by_id(actual['tasks']['planned']), self._by_id(expected['tasks']['planned']))
+        self.assertEqual(self._by_id(actual['tasks']['completed']), self._by_id(expected['tasks']['completed']))
+        for key in ['planned', 'completed']:
+            with self.subTest(categories=key):
+                self.assertEqual(
+                    self._by_id(actual['categories'][key]),
+                    self._by_id(expected['categories'][key])
+                )
+        self.assertEqual(
+            {category['name']: category['taskCount'] for category in actual['categories']['planned']},
+            {'Today category 0': 2, 'Today category 1': 2, 'Today category 2': 2},
+        )
+
+    def test_empty_day(self):
+        """Тест пустых списков для пользователя без задач на сегодня"""
+        other_user = User.objects.create_user(
+            username='todayempty',
+            email='todayempty@example.com',
+            password='testpass123',
+        )
+        self.assertEqual(
+            self.use_case.execute(other_user.id),
+            {
+                'tasks': {'planned': [], 'completed': []},
+                'categories': {'planned': [], 'completed': []},
+            }
+        )
+
+    def test_today_view(self):
+        """Тест ответа эндпоинта статистики на сегодня"""
+        self.client.login(username='todayuser', password='testpass123')
+        response = self.client.get('/api/today-statistics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), self.use_case.execute(self.user.id))
@@ -14,6 +14,10 @@ urlpatterns = [
     path('category/', views.CategoryView.as_view()), 
     path('categories/', views.CategoriesView.as_view(), name='categories'),
     path('update-order/', views.OrderUpdateView.as_view(), name='order_update'),
+    path('move-task/', views.TaskMoveView.as_view(), name='move_task'),
     path('today-statistics/', views.TodayTasksView.as_view(), name='today_tasks'),
+    path('cache-metrics/', views.CacheMetricsView.as_view(), name='cache_metrics'),
+    path('pool-metrics/', views.PoolMetricsView.as_view(), name='pool_metrics'),
+    path('query-metrics/', views.QueryMetricsView.as_view(), name='query_metrics'),
 ]
 
@@ -1,96 +1,178 @@
 import json
+from typing import Optional
 
 from django.forms import ValidationError
 from django.views.generic import View
 from django.core.exceptions import ObjectDoesNotExist
 from django.http import HttpResponseBadRequest, HttpResponseForbidden, HttpResponse, JsonResponse, HttpResponseNotFound
-from django.db import connection
-
-from core.http import FormJsonResponse
-from core.mixins import ApiLoginRequiredMixin
-from history.infrastructure import HistoryRepository
-from history.models import History
+from django.utils import timezone
+
+from core.cache import VersionedUserCache, CacheMetrics, tasks_version, categories_version, history_version
+from core.container import RequestScoped
+from core.pool import PoolMetrics
+from core.instrumentation import EndpointQueryMetrics
+from core.http import FormJsonResponse, RawJsonResponse
+from core.mixins import ApiLoginRequiredMixin, UserVersionETagMixin
 from .models import Task, Category
-from .services import CategoryService, CategoryUseCase, GetTodayStatisticsUseCase, TaskService, DeadlinesUpdateUseCase, TaskOrderUpdateUseCase, TaskUseCase
-from .infrastructure import TaskRepository, CategoryRepository
+from .services import CategoryService, CategoryUseCase, GetTodayStatisticsUseCase, TaskService, DeadlinesUpdateUseCase, TaskOrderUpdateUseCase, TaskMoveUseCase, TaskUseCase, TaskDashboardUseCase
+from .infrastructure import TaskRepository, AsyncTaskRepository, CategoryRepository, AsyncCategoryRepository, CategoryDirectory
+
+# кеши общие для всех запросов, репозитории создаются на каждый запрос.
+# Репозитории асинхронных представлений только читают и собираются на
+# соединениях чтения, которые могут уйти на реплику (см. core.routers)
+dashboard_cache = VersionedUserCache('task-dashboard', tasks_version)
+category_directory_cache = VersionedUserCache('category-directory', categories_version)
+
+task_repository = RequestScoped(
+    lambda container: TaskRepository(Task, container.connection)
+)
+async_task_json_repository = RequestScoped(
+    lambda container: AsyncTaskRepository(Task, container.async_read_connection, json_passthrough=True)
+)
+category_repository = RequestScoped(
+    lambda container: CategoryRepository(Category, container.connection)
+)
+category_directory = RequestScoped(
+    lambda container: CategoryDirectory(category_repository.resolve(container), category_directory_cache)
+)
+async_category_directory = RequestScoped(
+    lambda container: CategoryDirectory(
+        category_repository.resolve(container),
+        category_directory_cache,
+        AsyncCategoryRepository(Category, container.async_read_connection),
+    )
+)
 
 
 class TasksView(
         ApiLoginRequiredMixin, 
+        UserVersionETagMixin,
         View,
     ):
-    service = TaskService(
-        task_repository=TaskRepository(
-        Task, 
-        connection,
-        )
-    )
+    etag_versions = (tasks_version,)
+    use_case = RequestScoped(lambda container: TaskDashboardUseCase(
+        task_service=TaskService(
+            async_task_repository=async_task_json_repository.resolve(container),
+        ),
+        dashboard_cache=dashboard_cache,
+    ))
 
-    def get(self, request):
-        data = {}
-        data['chart_data'] = self.service.get_user_task_count_by_categories(
+    async def get(self, request):
+        data = await self.use_case.aexecute(
             self.request.user.id
         )
-        data['tasks'] = self.service.get_ordered_user_tasks(
-            self.request.user.id
-        )
-        return JsonResponse(data)
+        return RawJsonResponse(data)
 
 
-class TodayTasksView(
+class CacheMetricsView(
         ApiLoginRequiredMixin,
         View,
     ):
-    use_case = GetTodayStatisticsUseCase(
-        task_repository=TaskRepository(Task, connection),
-        history_repository=HistoryRepository(History, connection)
-    )
+    '''
+    Счетчики попаданий и промахов кешей ответов, только для персонала
+    '''
 
     def get(self, request):
-        data = {}
-        data = self.use_case.execute(
+        if not self.request.user.is_staff:
+            return HttpResponseForbidden()
+        return JsonResponse(CacheMetrics.snapshot_all())
+
+
+class PoolMetricsView(
+        ApiLoginRequiredMixin,
+        View,
+    ):
+    '''
+    Состояние пулов соединений с базой и ожидание соединений из них
+    в процессе, который обработал запрос, только для персонала
+    '''
+
+    def get(self, request):
+        if not self.request.user.is_staff:
+            return HttpResponseForbidden()
+        return JsonResponse(PoolMetrics.snapshot_all())
+
+
+class QueryMetricsView(
+        ApiLoginRequiredMixin,
+        View,
+    ):
+    '''
+    Сводка SQL-запросов по эндпоинтам в процессе, который обработал
+    запрос, только для персонала
+    '''
+
+    def get(self, request):
+        if not self.request.user.is_staff:
+            return HttpResponseForbidden()
+        return JsonResponse(EndpointQueryMetrics.snapshot_all())
+
+
+class TodayTasksView(
+        ApiLoginRequiredMixin,
+        UserVersionETagMixin,
+        View,
+    ):
+    etag_versions = (tasks_version, history_version)
+    use_case = RequestScoped(lambda container: GetTodayStatisticsUseCase(
+        async_task_repository=async_task_json_repository.resolve(container),
+    ))
+
+    def get_etag_extra(self) -> str:
+        return timezone.localdate().isoformat()
+
+    async def get(self, request):
+        data = await self.use_case.aexecute(
             self.request.user.id
         )
 
-        return JsonResponse(data)
+        return RawJsonResponse(data)
 
 
 class DeadlinesView(
         ApiLoginRequiredMixin,
+        UserVersionETagMixin,
         View,
     ):
+    etag_versions = (tasks_version,)
 
-    service = TaskService(
-    task_repository=TaskRepository(
-            Task, 
-            connection
-        )
-    )
+    service = RequestScoped(lambda container: TaskService(
+        async_task_repository=async_task_json_repository.resolve(container),
+    ))
 
-    def get(self, request):
+    async def get(self, request):
         data = {}
-        data['calendar_data'] = self.service.get_user_tasks_by_deadlines(
+        data['calendar_data'] = await self.service.aget_user_tasks_by_deadlines(
             self.request.user.id
         )
 
-        return JsonResponse(data)
+        return RawJsonResponse(data)
     
 
 class DeadlinesUpdateView(ApiLoginRequiredMixin, View):
-    use_case = DeadlinesUpdateUseCase(
-        task_repository=TaskRepository(
-            Task, 
-            connection
-        )
-    )
+    use_case = RequestScoped(lambda container: DeadlinesUpdateUseCase(
+        task_repository=task_repository.resolve(container),
+    ))
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except PermissionError:
+            return HttpResponseForbidden(
+                '<h1>403 Forbidden</h1><p>Вы пытаетесь изменить задачу другого пользователя</p>'
+            )
+        except (ValueError, KeyError, TypeError):
+            return HttpResponseBadRequest(
+                '<h1>400 Bad Request</h1><p>Некорректный формат данных</p>'
+            )
 
     def post(self, request):
         post_data = self.request.body.decode('utf-8')
         post_data_json = json.loads(post_data)
 
-        self.use_case.execute(self.request.user.id, post_data_json['new_deadlines'])
+        updated_count = self.use_case.execute(self.request.user.id, post_data_json['new_deadlines'])
 
-        return JsonResponse({})
+        return JsonResponse({'updated_count': updated_count})
 
 
 class TaskView(
@@ -108,14 +190,10 @@ class TaskView(
     При get запросе возвращает json с базовыми значениями формы
     '''
 
-    use_case = TaskUseCase(
-        task_repository=TaskRepository(
-            Task, connection
-        ),
-        category_repository=CategoryRepository(
-            Category, connection
-        )
-    )
+    use_case = RequestScoped(lambda container: TaskUseCase(
+        task_repository=task_repository.resolve(container),
+        category_directory=category_directory.resolve(container),
+    ))
 
     def dispatch(self, request, *args, **kwargs):
         try:
@@ -178,9 +256,9 @@ class CategoryView(
     ):
     response_class = FormJsonResponse
     model = Category
-    use_case = CategoryUseCase(
-        category_repository=CategoryRepository(Category, connection),
-    )
+    use_case = RequestScoped(lambda container: CategoryUseCase(
+        category_repository=category_repository.resolve(container),
+    ))
 
     def dispatch(self, request, *args, **kwargs):
         try:
@@ -235,15 +313,17 @@ class CategoryView(
 
 class CategoriesView(
             ApiLoginRequiredMixin, 
+            UserVersionETagMixin,
             View,
         ):
+    etag_versions = (categories_version,)
     template_name = 'task/categories.html'
-    service = CategoryService(
-        category_repository=CategoryRepository(Category, connection),
-    )
+    service = RequestScoped(lambda container: CategoryService(
+        category_directory=async_category_directory.resolve(container),
+    ))
 
-    def get(self, request):
-        categories = self.service.get_ordered_user_categories(
+    async def get(self, request):
+        categories = await self.service.aget_ordered_user_categories(
                 self.request.user.id
             )
         return JsonResponse({'categories': categories})
@@ -258,21 +338,53 @@ class OrderUpdateView(
     order: массив с id задач, отсортированных в том порядке, к котором они
     будут вставлены в БД
     '''
+    use_case = RequestScoped(lambda container: TaskOrderUpdateUseCase(
+        task_repository=task_repository.resolve(container),
+    ))
     
     def put(self, request):
         post_data = self.request.body.decode('utf-8')
         post_data_json = json.loads(post_data)
-        use_case = TaskOrderUpdateUseCase(
-            task_repository=TaskRepository(
-                    Task, 
-                    connection,
-            )
-        )
         try:
-            use_case.execute(
+            self.use_case.execute(
                 self.request.user.id, post_data_json['order']
             )
             return HttpResponse('OK')
         except PermissionError:
             return HttpResponseForbidden('Вы пытаетесь изменить задачу другого пользователя!')
-        
+        except (ValueError, KeyError, TypeError):
+            return HttpResponseBadRequest('Некорректный формат данных')
+
+
+class TaskMoveView(
+            ApiLoginRequiredMixin,
+            View,
+        ):
+    '''
+    Принимает put запрос с json, с полями:
+    task_id: id перемещаемой задачи
+    before_id: id задачи, которая окажется перед ней, или null для начала списка
+    after_id: id задачи, которая окажется после нее, или null для конца списка
+    '''
+
+    use_case = RequestScoped(lambda container: TaskMoveUseCase(
+        task_repository=task_repository.resolve(container),
+    ))
+
+    def put(self, request):
+        try:
+            put_data_json = json.loads(self.request.body.decode('utf-8'))
+            order = self.use_case.execute(
+                self.request.user.id,
+                int(put_data_json['task_id']),
+                self._get_optional_id(put_data_json.get('before_id')),
+                self._get_optional_id(put_data_json.get('after_id')),
+            )
+            return JsonResponse({'order': order})
+        except PermissionError:
+            return HttpResponseForbidden('Вы пытаетесь изменить задачу другого пользователя!')
+        except (ValueError, KeyError, TypeError) as e:
+            return HttpResponseBadRequest(f'Некорректный формат данных: {e}')
+
+    def _get_optional_id(self, value) -> Optional[int]:
+        return None if value is None else int(value)
@@ -12,6 +12,7 @@ class UserEntityProtocol(Protocol):
     last_login: datetime
     is_active: bool
     date_joined: datetime
+    timezone: str
 
 
 @dataclass
@@ -24,6 +25,7 @@ class UserEntity:
     last_login: datetime
     is_active: bool
     date_joined: datetime
+    timezone: str = 'UTC'
 
 
 @dataclass
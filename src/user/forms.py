@@ -2,7 +2,7 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm, PasswordChangeForm, PasswordResetForm, SetPasswordForm
 from django.contrib.auth import get_user_model
 
-from .validators import email_validator, password_reset_form_validator
+from .validators import email_validator, password_reset_form_validator, timezone_validator
 
 
 class UserRegistrationForm(UserCreationForm):
@@ -78,16 +78,30 @@ class UserProfileForm(forms.ModelForm):
     }))
 
 
+    timezone = forms.CharField(required=False, widget=forms.TextInput(attrs={
+        'name': 'timezone',
+        'id': 'timezone-id-for-label',
+        'placeholder': 'Часовой пояс, например Europe/Moscow',
+    }))
+
+
     def clean_email(self):
         email = self.cleaned_data.get('email')
         if self.instance.email == email:
             return email
         return email_validator(email)
 
+    def clean_timezone(self):
+        # старые клиенты не передают часовой пояс, тогда он не меняется
+        timezone = self.cleaned_data.get('timezone')
+        if not timezone:
+            return self.instance.timezone
+        return timezone_validator(timezone)
+
 
     class Meta:
         model = get_user_model()
-        fields = ['avatar', 'username', 'email']
+        fields = ['avatar', 'username', 'email', 'timezone']
 
 
 class UserPasswordChangeForm(PasswordChangeForm):
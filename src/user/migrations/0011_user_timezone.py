@@ -0,0 +1,19 @@
+# Generated by Django 4.2 on 2026-10-16 23:55
+
+from django.db import migrations, models
+import user.validators
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0010_user_is_staff_user_is_superuser'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='timezone',
+            field=models.CharField(default='UTC', max_length=64, validators=[user.validators.timezone_validator], verbose_name='Часовой пояс пользователя в формате IANA, по нему считается сегодняшний день'),
+        ),
+    ]
@@ -6,7 +6,7 @@ from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ObjectDoesNotExist
 
 from .domain.entities import UserEntity, IncompleteUserEntity
-from .validators import email_validator
+from .validators import email_validator, timezone_validator
 
 
 class User(AbstractUser):
@@ -24,6 +24,12 @@ class User(AbstractUser):
             upload_to='user_images', 
             default='user_images/default_avatar.png',
         )
+    timezone = models.CharField(
+            max_length=64,
+            default='UTC',
+            validators=[timezone_validator],
+            verbose_name='Часовой пояс пользователя в формате IANA, по нему считается сегодняшний день'
+        )
     first_name = None
     last_name = None
 
@@ -40,7 +46,8 @@ class User(AbstractUser):
             last_login=entity.last_login,
             is_active=entity.is_active,
             date_joined=entity.date_joined,
-            avatar=entity.avatar
+            avatar=entity.avatar,
+            timezone=entity.timezone
         )
     
     def to_domain(self) -> UserEntity:
@@ -52,7 +59,8 @@ class User(AbstractUser):
             last_login=self.last_login,
             is_active=self.is_active,
             date_joined=self.date_joined,
-            avatar=self.avatar
+            avatar=self.avatar,
+            timezone=self.timezone
         )
     
     def to_incomplete_domain(self) -> IncompleteUserEntity:
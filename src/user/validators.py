@@ -1,3 +1,5 @@
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
 from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ObjectDoesNotExist
@@ -19,3 +21,10 @@ def password_reset_form_validator(username: str, email: str):
     if user.email != email:
         raise ValidationError('Не удалось найти совпадения между указанным именем и адресом электронной почты!')
 
+
+def timezone_validator(timezone_name: str):
+    try:
+        ZoneInfo(timezone_name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValidationError('Неизвестный часовой пояс')
+    return timezone_name
@@ -26,6 +26,7 @@ def get_user_info_view(request):
         {
             'username': request.user.username,
             'avatar': request.user.avatar.url,
+            'timezone': request.user.timezone,
         }
     )
 